@@ -0,0 +1,227 @@
+"""
+End to end benchmark for guajillo against a synthetic salt-api.
+
+Each scenario runs in a fresh interpreter that starts the fake salt-api from
+fake_saltapi.py and drives ``App.run`` against it in the same event loop,
+then reports time to first output, time to final output, time spent
+rendering, peak RSS and how many requests of each kind reached the api.
+
+    python benchmarks/e2e.py [--sizes 10,100,1000,10000] [--states 10]
+        [--fun state.apply] [--arrival uniform] [--spread 2] [--stream]
+        [--output yaml] [--runs 3] [--json results.json]
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import resource
+import statistics
+import subprocess  # nosec B404
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+from fake_saltapi import FakeSaltAPI, fleet_args, fleet_from
+
+HERE = Path(__file__).parent
+
+CONFIG = """\
+cache_dir = "{cache}"
+
+[netapi]
+url = "{url}"
+username = "bench"
+password = "bench"
+auth = "pam"
+token_cache = false
+
+[logging]
+log_level = "ERROR"
+"""
+
+
+class TimedSink(io.StringIO):
+    """
+    stdout stand in that remembers when the first output showed up
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.first: float | None = None
+
+    def write(self, text: str) -> int:
+        if self.first is None and text.strip():
+            self.first = time.perf_counter()
+        return super().write(text)
+
+    def isatty(self) -> bool:
+        return False
+
+
+def peak_rss_mb() -> float:
+    # kilobytes on linux, bytes on macos
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+async def scenario(args: argparse.Namespace) -> dict[str, Any]:
+    from rich.console import Console
+
+    from guajillo.app import App
+
+    async with FakeSaltAPI(fleet_from(args)) as api:
+        with tempfile.TemporaryDirectory() as tmp:
+            config = Path(tmp, "config.toml")
+            config.write_text(CONFIG.format(cache=tmp, url=api.url))
+            cmd = ["-c", str(config), "--no-agent", "-t", str(args.timeout)]
+            if args.stream:
+                cmd.append("--stream")
+            if args.output:
+                cmd.extend(["-o", args.output])
+            sys.argv = ["guajillo", *cmd, "salt", "*", args.fun]
+
+            sink = TimedSink()
+            app = App()
+            app.console = Console(file=sink, width=160, force_terminal=args.terminal)
+            app.stderr = Console(file=io.StringIO())
+            app.setup()
+
+            rendering = 0.0
+            final, stream = app.outputs.final, app.outputs.stream_returns
+
+            async def timed_final(*a: Any) -> None:
+                nonlocal rendering
+                start = time.perf_counter()
+                await final(*a)
+                rendering += time.perf_counter() - start
+
+            async def timed_stream(*a: Any) -> bool:
+                nonlocal rendering
+                start = time.perf_counter()
+                done = await stream(*a)
+                rendering += time.perf_counter() - start
+                return done
+
+            app.outputs.final = timed_final
+            app.outputs.stream_returns = timed_stream
+            rss_before = peak_rss_mb()
+            start = time.perf_counter()
+            await app.run()
+            end = time.perf_counter()
+            app.outputs.cstatus.stop()
+
+    first = sink.first if sink.first is not None else end
+    return {
+        "minions": args.minions,
+        "states": args.states,
+        "fun": args.fun,
+        "first_output_s": first - start,
+        "final_s": end - start,
+        "render_s": rendering,
+        "peak_rss_mb": peak_rss_mb(),
+        "rss_growth_mb": peak_rss_mb() - rss_before,
+        "output_bytes": len(sink.getvalue()),
+        "requests": dict(api.requests),
+    }
+
+
+def worker(args: argparse.Namespace) -> int:
+    result = asyncio.run(scenario(args))
+    print(json.dumps(result))
+    return 0
+
+
+def spawn(args: argparse.Namespace, minions: int) -> dict[str, Any]:
+    cmd = [
+        sys.executable,
+        str(Path(__file__).resolve()),
+        "--worker",
+        "--minions",
+        str(minions),
+        "--states",
+        str(args.states),
+        "--spread",
+        str(args.spread),
+        "--arrival",
+        args.arrival,
+        "--missing",
+        str(args.missing),
+        "--seed",
+        str(args.seed),
+        "--fun",
+        args.fun,
+        "--timeout",
+        str(args.timeout),
+    ]
+    if args.stream:
+        cmd.append("--stream")
+    if args.terminal:
+        cmd.append("--terminal")
+    if args.output:
+        cmd.extend(["--output", args.output])
+    result = subprocess.run(  # nosec B603
+        cmd, capture_output=True, text=True, check=True, cwd=HERE
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def report(results: list[dict[str, Any]]) -> None:
+    print(
+        f"{'minions':>8} {'first s':>9} {'final s':>9} {'render s':>9} "
+        f"{'rss MB':>8} {'out KB':>8}  requests"
+    )
+    for result in results:
+        requests = ", ".join(f"{k}={v}" for k, v in sorted(result["requests"].items()))
+        print(
+            f"{result['minions']:>8} {result['first_output_s']:>9.3f} "
+            f"{result['final_s']:>9.3f} {result['render_s']:>9.3f} "
+            f"{result['peak_rss_mb']:>8.1f} {result['output_bytes'] / 1024:>8.1f}"
+            f"  {requests}"
+        )
+
+
+def median_of(runs: list[dict[str, Any]]) -> dict[str, Any]:
+    result = dict(runs[0])
+    for key, value in runs[0].items():
+        if isinstance(value, float):
+            result[key] = statistics.median(run[key] for run in runs)
+    return result
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    fleet_args(parser)
+    parser.add_argument("--fun", default="state.apply")
+    parser.add_argument("--output", default=None)
+    parser.add_argument("--stream", action="store_true")
+    parser.add_argument("--terminal", action="store_true")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--runs", type=int, default=1)
+    parser.add_argument("--json", dest="json_path", default=None)
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.set_defaults(minions=None)
+    parser.add_argument(
+        "--sizes",
+        default="10,100,1000,10000",
+        help="comma separated fleet sizes to run, ignored with --minions",
+    )
+    args = parser.parse_args()
+
+    if args.worker:
+        return worker(args)
+
+    sizes = [args.minions] if args.minions else [int(n) for n in args.sizes.split(",")]
+    results = [
+        median_of([spawn(args, minions) for _ in range(args.runs)]) for minions in sizes
+    ]
+    report(results)
+    if args.json_path:
+        Path(args.json_path).write_text(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
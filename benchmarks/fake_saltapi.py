@@ -0,0 +1,338 @@
+"""
+Synthetic salt-api stand-in for benchmarks.
+
+Serves just enough of rest_cherrypy for guajillo to run against it:
+``/login``, ``/`` (local_async and runner_async), ``/jobs/<jid>`` and the
+``/events`` server sent event stream. Every job is answered by a generated
+fleet, minions return on a configurable arrival distribution and every
+request is counted.
+
+It is a small HTTP/1.1 server on plain asyncio streams rather than an ASGI
+app, as the test transports buffer whole responses and would hide how the
+event stream behaves.
+
+    python benchmarks/fake_saltapi.py --minions 1000 --states 20 --spread 5
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any
+
+ARRIVALS = ["fixed", "uniform", "exponential", "lognormal"]
+STATUS = {200: "OK", 401: "Unauthorized", 404: "Not Found"}
+
+
+@dataclass
+class Fleet:
+    """
+    what the fake master pretends to manage and how it answers
+    """
+
+    minions: int = 100
+    states: int = 10
+    # seconds over which the returns come in
+    spread: float = 1.0
+    arrival: str = "uniform"
+    # fraction of minions that never return
+    missing: float = 0.0
+    # fraction of states that report changes, and that fail
+    changed: float = 0.1
+    failed: float = 0.01
+    seed: int = 0
+    rng: random.Random = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        if self.arrival not in ARRIVALS:
+            raise ValueError(f"arrival must be one of {', '.join(ARRIVALS)}")
+        self.rng = random.Random(self.seed)  # nosec B311
+
+    @property
+    def names(self) -> list[str]:
+        width = len(str(self.minions))
+        return [f"minion{i:0{width}d}" for i in range(self.minions)]
+
+    def delay(self) -> float:
+        if self.arrival == "fixed":
+            return self.spread
+        if self.arrival == "uniform":
+            return self.rng.uniform(0, self.spread)
+        if self.arrival == "exponential":
+            return min(self.rng.expovariate(3 / self.spread), self.spread)
+        # a long tail, most minions early and a few stragglers at the end
+        return min(self.rng.lognormvariate(0, 1) * self.spread / 8, self.spread)
+
+    def schedule(self, minions: list[str]) -> list[tuple[float, str]]:
+        """
+        (delay, minion) for every minion that will return, soonest first
+        """
+        returning = [m for m in minions if self.rng.random() >= self.missing]
+        return sorted((self.delay(), minion) for minion in returning)
+
+    def state_return(self) -> dict[str, Any]:
+        states = {}
+        for index in range(self.states):
+            failed = self.rng.random() < self.failed
+            changed = not failed and self.rng.random() < self.changed
+            states[f"file_|-state{index}_|-/etc/state{index}_|-managed"] = {
+                "result": not failed,
+                "comment": "failed" if failed else "File is in the correct state",
+                "name": f"/etc/state{index}",
+                "changes": {"diff": f"+line {index}"} if changed else {},
+                "duration": round(self.rng.uniform(0.1, 50), 3),
+                "__run_num__": index,
+                "__id__": f"state{index}",
+            }
+        return states
+
+    def minion_return(self, fun: str) -> Any:
+        if fun == "test.ping":
+            return True
+        if fun.startswith("state."):
+            return self.state_return()
+        return {f"key{index}": f"value{index}" for index in range(self.states)}
+
+
+@dataclass
+class FakeJob:
+    jid: str
+    fun: str
+    minions: list[str]
+    runner: bool = False
+    returns: dict[str, Any] = field(default_factory=dict)
+    done: bool = False
+
+
+class FakeSaltAPI:
+    """
+    the server, use ``async with FakeSaltAPI(fleet) as api`` and point
+    guajillo at ``api.url``
+    """
+
+    def __init__(self, fleet: Fleet, host: str = "127.0.0.1", port: int = 0) -> None:
+        self.fleet = fleet
+        self.host = host
+        self.port = port
+        self.jobs: dict[str, FakeJob] = {}
+        self.requests: Counter[str] = Counter()
+        self.listeners: list[asyncio.Queue[bytes]] = []
+        self.tasks: set[asyncio.Task] = set()
+        self.writers: set[asyncio.StreamWriter] = set()
+        self.jids = itertools.count(20240101000000000000)
+        self.server: asyncio.Server | None = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def __aenter__(self) -> "FakeSaltAPI":
+        self.server = await asyncio.start_server(self.handle, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        for task in self.tasks:
+            task.cancel()
+        if self.server is not None:
+            self.server.close()
+            for writer in self.writers:
+                writer.close()
+            await self.server.wait_closed()
+
+    def publish(self, tag: str, data: dict[str, Any]) -> None:
+        payload = json.dumps({"tag": tag, "data": data})
+        message = f"tag: {tag}\ndata: {payload}\n\n".encode()
+        for queue in self.listeners:
+            queue.put_nowait(message)
+
+    async def run_job(self, job: FakeJob) -> None:
+        start = time.monotonic()
+        if job.runner:
+            await asyncio.sleep(self.fleet.delay())
+            job.returns["master_master"] = self.fleet.minion_return(job.fun)
+            job.done = True
+            self.publish(
+                f"salt/run/{job.jid}/ret",
+                {
+                    "jid": job.jid,
+                    "fun": job.fun,
+                    "return": job.returns["master_master"],
+                },
+            )
+            return
+        for delay, minion in self.fleet.schedule(job.minions):
+            wait = start + delay - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            returned = self.fleet.minion_return(job.fun)
+            job.returns[minion] = returned
+            self.publish(
+                f"salt/job/{job.jid}/ret/{minion}",
+                {
+                    "jid": job.jid,
+                    "id": minion,
+                    "fun": job.fun,
+                    "return": returned,
+                    "retcode": 0,
+                    "success": True,
+                },
+            )
+        job.done = True
+
+    def start_job(self, lowstate: dict[str, Any]) -> dict[str, Any]:
+        jid = str(next(self.jids))
+        runner = lowstate.get("client") == "runner_async"
+        minions = self.fleet.names
+        if lowstate.get("tgt_type") == "list":
+            targets = lowstate.get("tgt", [])
+            if isinstance(targets, str):
+                targets = targets.split(",")
+            minions = [m for m in minions if m in targets]
+        job = FakeJob(jid, lowstate.get("fun", ""), minions, runner)
+        self.jobs[jid] = job
+        task = asyncio.create_task(self.run_job(job))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        if runner:
+            return {"tag": f"salt/run/{jid}", "jid": jid}
+        return {"jid": jid, "minions": job.minions}
+
+    def lookup(self, jid: str) -> tuple[int, Any]:
+        job = self.jobs.get(jid)
+        if job is None:
+            return 404, {"status": 404}
+        info: dict[str, Any] = {"jid": jid, "Function": job.fun}
+        if job.runner and not job.done:
+            info["Error"] = "Cannot contact returner or no job with this jid"
+            return 200, {"info": [info], "return": [{}]}
+        if not job.runner:
+            info["Minions"] = job.minions
+        info["Result"] = {
+            minion: {"return": returned, "retcode": 0, "success": True}
+            for minion, returned in job.returns.items()
+        }
+        return 200, {"info": [info], "return": [dict(job.returns)]}
+
+    def route(self, method: str, path: str, body: bytes) -> tuple[int, Any]:
+        if method == "POST" and path == "/login":
+            self.requests["login"] += 1
+            now = time.time()
+            token = {
+                "token": "fake-token",
+                "start": now,
+                "expire": now + 36000,
+                "user": "bench",
+                "eauth": "pam",
+                "perms": [".*"],
+            }
+            return 200, {"return": [token]}
+        if method == "POST" and path == "/":
+            self.requests["call"] += 1
+            lowstate = json.loads(body)
+            return 200, {"return": [self.start_job(chunk) for chunk in lowstate]}
+        if method == "GET" and path.startswith("/jobs/"):
+            self.requests["lookup"] += 1
+            return self.lookup(path.removeprefix("/jobs/"))
+        self.requests["other"] += 1
+        return 404, {"status": 404}
+
+    async def events(self, writer: asyncio.StreamWriter) -> None:
+        self.requests["events"] += 1
+        writer.write(
+            b"HTTP/1.1 200 OK\r\n"
+            b"Content-Type: text/event-stream\r\n"
+            b"Cache-Control: no-cache\r\n"
+            b"Transfer-Encoding: chunked\r\n\r\n"
+        )
+        queue: asyncio.Queue[bytes] = asyncio.Queue()
+        self.listeners.append(queue)
+        try:
+            message = b"retry: 400\n\n"
+            while True:
+                writer.write(b"%x\r\n%s\r\n" % (len(message), message))
+                await writer.drain()
+                message = await queue.get()
+                # send whatever else piled up in the same chunk
+                while not queue.empty():
+                    message += queue.get_nowait()
+        finally:
+            self.listeners.remove(queue)
+
+    async def handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        self.writers.add(writer)
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                lines = head.decode("latin-1").split("\r\n")
+                method, target, _ = lines[0].split(" ", 2)
+                headers = {}
+                for line in lines[1:]:
+                    if ":" in line:
+                        name, value = line.split(":", 1)
+                        headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                path = target.split("?", 1)[0]
+                if method == "GET" and path == "/events":
+                    await self.events(writer)
+                    return
+                status, payload = self.route(method, path, body)
+                data = json.dumps(payload).encode()
+                writer.write(
+                    f"HTTP/1.1 {status} {STATUS.get(status, '')}\r\n"
+                    "Content-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\n\r\n".encode()
+                    + data
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self.writers.discard(writer)
+            writer.close()
+
+
+def fleet_args(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--minions", type=int, default=100)
+    parser.add_argument("--states", type=int, default=10)
+    parser.add_argument("--spread", type=float, default=1.0)
+    parser.add_argument("--arrival", choices=ARRIVALS, default="uniform")
+    parser.add_argument("--missing", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def fleet_from(args: argparse.Namespace) -> Fleet:
+    return Fleet(
+        minions=args.minions,
+        states=args.states,
+        spread=args.spread,
+        arrival=args.arrival,
+        missing=args.missing,
+        seed=args.seed,
+    )
+
+
+async def serve(args: argparse.Namespace) -> None:
+    async with FakeSaltAPI(fleet_from(args), port=args.port) as api:
+        print(f"fake salt-api listening on {api.url}")
+        await asyncio.Event().wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--port", type=int, default=8000)
+    fleet_args(parser)
+    try:
+        asyncio.run(serve(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
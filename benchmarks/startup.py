@@ -0,0 +1,99 @@
+"""
+Cold start benchmark for the guajillo cli.
+
+Runs ``guajillo --help`` in fresh interpreters and reports the wall clock time
+and the ``-X importtime`` breakdown, then checks that the help path stays
+clear of modules it has no use for. Exits non zero when the budget is blown
+so it can run in CI.
+
+    python benchmarks/startup.py [--runs 10] [--budget-ms 250] [--top 15]
+"""
+
+import argparse
+import re
+import statistics
+import subprocess  # nosec B404
+import sys
+import time
+
+HELP = (
+    "import sys; sys.argv = ['guajillo', '--help']\n"
+    "from guajillo.main import main\n"
+    "try:\n"
+    "    main()\n"
+    "except SystemExit:\n"
+    "    pass\n"
+)
+REPORT = "\nprint(' '.join(sorted(sys.modules)), file=sys.stderr)\n"
+
+# modules --help must never import
+FORBIDDEN = ["httpx", "httpx_sse", "h2", "yaml", "guajillo.utils.conn"]
+
+IMPORTTIME = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s+)(\S+)")
+
+
+def run(code: str, *flags: str) -> tuple[float, str]:
+    start = time.perf_counter()
+    result = subprocess.run(  # nosec B603
+        [sys.executable, *flags, "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return time.perf_counter() - start, result.stderr
+
+
+def wall_clock(runs: int) -> list[float]:
+    run(HELP)  # warm the filesystem cache
+    return [run(HELP)[0] * 1000 for _ in range(runs)]
+
+
+def import_times(top: int) -> tuple[int, list[tuple[int, str]]]:
+    _, stderr = run(HELP, "-X", "importtime")
+    total = 0
+    modules = []
+    for match in IMPORTTIME.finditer(stderr):
+        cumulative, depth, name = int(match[2]), len(match[3]), match[4]
+        if depth == 1:
+            total += cumulative
+            modules.append((cumulative, name))
+    return total, sorted(modules, reverse=True)[:top]
+
+
+def loaded_modules() -> set[str]:
+    _, stderr = run(HELP + REPORT)
+    return set(stderr.strip().splitlines()[-1].split())
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--budget-ms", type=float, default=250.0)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    times = wall_clock(args.runs)
+    total, slowest = import_times(args.top)
+    loaded = loaded_modules()
+
+    print(f"guajillo --help over {args.runs} runs")
+    print(f"  median {statistics.median(times):8.1f} ms")
+    print(f"  min    {min(times):8.1f} ms")
+    print(f"  max    {max(times):8.1f} ms")
+    print(f"top level imports {total / 1000:8.1f} ms")
+    for cumulative, name in slowest:
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+    failed = False
+    leaked = [name for name in FORBIDDEN if name in loaded]
+    if leaked:
+        print(f"FAIL: --help imported {', '.join(leaked)}")
+        failed = True
+    if statistics.median(times) > args.budget_ms:
+        print(f"FAIL: median over budget of {args.budget_ms} ms")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
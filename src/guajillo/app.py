@@ -2,21 +2,21 @@
 Main app for cli program
 """
 
-import asyncio
 import logging
 import sys
 import tomllib
 from pathlib import Path
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
-from rich.logging import RichHandler
-from rich.traceback import install
-
-from guajillo.exceptions import TerminateTaskGroup
+from guajillo.exceptions import GuajilloException, TerminateTaskGroup
 from guajillo.utils.cli import CliParse
-from guajillo.utils.conn import Guajillo
 from guajillo.utils.console import console, stderr_console
-from guajillo.utils.outputs import Outputs
+
+# asyncio, httpx, the agent and the outputs spinner are imported where they
+# are first used so --help and config errors never pay for them.
+if TYPE_CHECKING:
+    from guajillo.utils.agent import AgentClient
+    from guajillo.utils.timings import Timings
 
 FORMAT = "%(asctime)s %(name)s %(taskName)s %(message)s"
 log = logging.getLogger(__name__)
@@ -27,7 +27,7 @@ class App:
         self.console = console
         self.stderr = stderr_console
         self.parsed = CliParse(self.stderr)
-        install(show_locals=False)
+        self.timings: "Timings | None" = None
         """
         FIX: This should not be a part of init. make a setup class. pass results into init
         """
@@ -37,7 +37,23 @@ class App:
         self._load_config()
         self._validate_config()
         self._setup_logging()
-        self._load_taskmans()
+        self.command = "agent" if self.parsed.salt_args[:1] == ["agent"] else "salt"
+        if self.parsed.salt_args[:1] == ["events"]:
+            # --jid filters the tail rather than looking a job up
+            self.command = "events"
+        elif self.parsed.parsed_args.jid is not None:
+            # agent included, a command given with --jid would be dropped
+            if self.parsed.commands:
+                raise GuajilloException("--jid looks up a job, it takes no command")
+            self.command = "jid"
+        if self.command == "agent":
+            from guajillo.utils.agent import Agent, socket_path
+
+            self.agent = Agent(
+                self.parsed, self.config, self.console, socket_path(self.config)
+            )
+        else:
+            self._load_taskmans()
 
     def _load_config(self) -> None:
         """
@@ -70,6 +86,7 @@ class App:
         Setup logging
         TODO: really? stop being lazy this needs its own thing and a lot more smarts
         """
+        from rich.logging import RichHandler
 
         logging.basicConfig(
             level=self.config["logging"]["log_level"],
@@ -105,34 +122,177 @@ class App:
         self.config = defaults
 
     def _load_taskmans(self):
-        self.client = Guajillo(
-            self.config["netapi"]["url"], self.parsed, self.config, console=self.console
+        from guajillo.exceptions import GuajilloException
+        from guajillo.utils.fanout import FanOut, expand_profiles
+        from guajillo.utils.outputs import Outputs
+        from guajillo.utils.results import result_cache
+        from guajillo.utils.timings import Timings
+
+        if self.parsed.parsed_args.timings is not None:
+            self.timings = Timings()
+        self.profiles = expand_profiles(self.config, self.parsed.parsed_args.profile)
+        batch = self.parsed.parsed_args.batch
+        if batch is not None and len(self.profiles) > 1:
+            raise GuajilloException("--batch works against a single profile")
+        watch = self.parsed.parsed_args.watch
+        if watch is not None and (len(self.profiles) > 1 or batch is not None):
+            raise GuajilloException("--watch works against a single profile")
+        if self.command == "events" and len(self.profiles) > 1:
+            raise GuajilloException("events tails a single profile")
+        if len(self.parsed.commands) > 1 and (
+            len(self.profiles) > 1 or batch is not None or watch is not None
+        ):
+            raise GuajilloException(
+                "several jobs work against a single profile, without --batch or --watch"
+            )
+        # a jid belongs to one master, it is only looked up on the first
+        if len(self.profiles) > 1 and self.command == "salt":
+            self.client = FanOut(
+                self.profiles,
+                self.parsed,
+                self.config,
+                self.console,
+                timings=self.timings,
+            )
+        elif self._wants_agent():
+            # built in run only when no agent answers
+            self.client = None
+        else:
+            self.client = self._direct_client()
+        if self.command == "events":
+            from guajillo.utils.events import EventTail
+
+            # the tail writes for itself, no outputs and no spinner
+            self.client = EventTail(
+                self.client,
+                self.console,
+                self.parsed.salt_args[1:],
+                jid=self.parsed.parsed_args.jid,
+                stderr=self.stderr,
+            )
+            return
+        self.results = result_cache(self.config)
+        self.outputs = Outputs(
+            self.console,
+            parser=self.parsed,
+            config=self.config,
+            timings=self.timings,
+            # a re-render has nothing new to keep
+            results=self.results if self.command == "salt" else None,
+        )
+        if watch is not None and self.command == "salt":
+            from guajillo.utils.watch import Watch
+
+            self.client = Watch(self.client, self.outputs, watch)
+
+    def _direct_client(self) -> Any:
+        """
+        a client of our own against the first profile, batched if asked
+        """
+        from guajillo.utils.batch import Batch
+        from guajillo.utils.conn import Guajillo
+        from guajillo.utils.fanout import profile_url
+
+        batch = self.parsed.parsed_args.batch
+        watch = self.parsed.parsed_args.watch
+        client: Any = Guajillo(
+            profile_url(self.config, self.profiles[0]),
+            self.parsed,
+            self.config,
+            console=self.console,
+            profile=self.profiles[0],
+            timings=self.timings,
         )
-        self.outputs = Outputs(self.console, parser=self.parsed, config=self.config)
+        # watch and batch need every return for the final result
+        client.streamed = (
+            self.parsed.parsed_args.stream and batch is None and watch is None
+        )
+        if batch is not None and self.command == "salt":
+            client = Batch(
+                client,
+                batch,
+                wait=self.parsed.parsed_args.batch_wait,
+                max_fail=self.parsed.parsed_args.batch_fail,
+            )
+        return client
+
+    def _wants_agent(self) -> bool:
+        """
+        whether a running agent could take this run
+        """
+        args = self.parsed.parsed_args
+        if not self.parsed.commands or args.no_agent:
+            return False
+        if self.command != "salt" or len(self.profiles) > 1:
+            return False
+        return args.batch is None and args.watch is None
+
+    async def _agent_client(self) -> "AgentClient | None":
+        """
+        connect to a running agent if there is one and we have a job for it
+        """
+        if not self._wants_agent():
+            return None
+        from guajillo.utils.agent import AgentClient, socket_path
+
+        agent = AgentClient(socket_path(self.config), self.stderr, self.config)
+        if not await agent.connect():
+            return None
+        log.info("Using guajillo agent")
+        return agent
 
     async def run(self):
         """
         Run the bloody thing
         """
+        import asyncio
+
+        from guajillo.utils.bus import EventBus
+
+        if self.command == "agent":
+            await self.agent.serve()
+            return
         try:
-            async_comms = {
-                "lock": asyncio.Lock(),
-                "update": asyncio.Event(),
-                "cond": asyncio.Condition(),
-                "events": [
-                    {
-                        "meta": {
-                            "output": None,
-                            "step": "startup",
-                        }
-                    }
-                ],
-                "done": False,
-            }
+            agent = await self._agent_client()
+            if agent is None and self.client is None:
+                self.client = self._direct_client()
+            bus = EventBus()
             log.info("Starting Tasks managers")
             async with asyncio.TaskGroup() as tg:
-                tg.create_task(self.client.taskMan(async_comms))
-                tg.create_task(self.outputs.taskMan(async_comms))
-                tg.create_task(self.client.streamMon())
+                if agent is not None:
+                    from guajillo.utils.conn import make_params
+
+                    request = {
+                        "profile": self.profiles[0],
+                        "lowstate": make_params(self.parsed.commands),
+                        "timeout": self.parsed.parsed_args.timeout,
+                        "output": self.parsed.parsed_args.output,
+                    }
+                    tg.create_task(agent.taskMan(bus, request))
+                elif self.command == "jid":
+                    tg.create_task(
+                        self.client.jidMan(
+                            bus, self.parsed.parsed_args.jid, self.results
+                        )
+                    )
+                else:
+                    tg.create_task(self.client.taskMan(bus))
+                    tg.create_task(self.client.streamMon())
+                # watch and events render for themselves
+                if self.parsed.parsed_args.watch is None and self.command != "events":
+                    tg.create_task(self.outputs.taskMan(bus))
         except* TerminateTaskGroup:
-            await self.client.close()
+            if self.client is not None:
+                await self.client.close()
+        finally:
+            self._report_timings()
+
+    def _report_timings(self) -> None:
+        if self.timings is None:
+            return
+        if self.parsed.parsed_args.timings == "json":
+            import json
+
+            self.stderr.print_json(json.dumps(self.timings.summary()))
+        else:
+            self.stderr.print(self.timings.table())
@@ -1,16 +1,33 @@
-import asyncio
+import sys
 
-from rich.traceback import install
 
-import guajillo.app as app
+def _excepthook(exc_type, exc_value, traceback) -> None:
+    """
+    rich tracebacks, without importing rich.traceback unless something breaks
+    """
+    from rich.traceback import Traceback
 
-install(show_locals=False)
+    from guajillo.utils.console import stderr_console
+
+    stderr_console.print(
+        Traceback.from_exception(exc_type, exc_value, traceback, show_locals=False)
+    )
 
 
 def main():
+    sys.excepthook = _excepthook
+    import guajillo.app as app
+
     theapp = app.App()
     theapp.setup()
-    asyncio.run(theapp.run())
+
+    import asyncio
+
+    try:
+        asyncio.run(theapp.run())
+    except KeyboardInterrupt:
+        # the way out of --watch and the agent, not an error worth a traceback
+        sys.exit(130)
 
 
 if __name__ == "__main__":
@@ -1,6 +1,116 @@
+"""
+Outputers are loaded on first use.
+
+Builtin outputers are the modules in this package, third party outputers are
+registered under the ``guajillo.outputs`` entry point group and point at an
+async ``render(event, console)`` function (or a module providing one).
+Accessing ``guajillo.outputs.<name>`` imports only that outputer.
+"""
+
 import importlib
 import pkgutil
+import sys
+from types import ModuleType
+from typing import Any, Callable
+
+ENTRY_POINT_GROUP = "guajillo.outputs"
+# fan-out keys merged results as <profile><SEPARATOR><minion>
+SEPARATOR = ":"
+
+# modules here that outputers share, never offered as an -o choice
+HELPERS = {"non_returns"}
+
+_builtin: list[str] | None = None
+_plugins: dict[str, Any] | None = None
+_modules: dict[str, ModuleType] = {}
+
+
+def names() -> list[str]:
+    """
+    builtin outputer names, found without importing any of them
+    """
+    global _builtin
+    if _builtin is None:
+        _builtin = sorted(
+            name
+            for _, name, is_pkg in pkgutil.iter_modules(__path__)
+            if not is_pkg and not name.startswith("_") and name not in HELPERS
+        )
+    return _builtin
+
+
+def plugins() -> dict[str, Any]:
+    """
+    outputers registered by other packages, keyed by name
+    """
+    global _plugins
+    if _plugins is None:
+        from importlib.metadata import entry_points
+
+        _plugins = {
+            ep.name: ep
+            for ep in entry_points(group=ENTRY_POINT_GROUP)
+            if ep.name not in names()
+        }
+    return _plugins
+
+
+def available() -> list[str]:
+    return names() + sorted(plugins())
+
+
+def exists(name: str) -> bool:
+    return name in names() or name in plugins()
+
+
+def load(name: str) -> Callable:
+    """
+    import an outputer and return its render function
+    """
+    # importing a submodule also binds it here, so only trust functions
+    cached = globals().get(name)
+    builtin = name in names() or name in HELPERS
+    if builtin and callable(cached) and not isinstance(cached, ModuleType):
+        return cached
+    if builtin:
+        loaded: Any = importlib.import_module(f"{__name__}.{name}")
+    elif name in plugins():
+        loaded = plugins()[name].load()
+    else:
+        raise AttributeError(f"Unknown outputer {name}")
+    if isinstance(loaded, ModuleType):
+        _modules[name] = loaded
+        render = getattr(loaded, "render")
+    else:
+        _modules[name] = sys.modules[loaded.__module__]
+        render = loaded
+    globals()[name] = render
+    return render
+
+
+def hook(name: str, attr: str) -> Any:
+    """
+    optional extra function or setting from an outputer's module, such as
+    render_minion for streaming or summary, None if the outputer does not
+    provide it
+    """
+    load(name)
+    if name not in _modules:
+        _modules[name] = importlib.import_module(f"{__name__}.{name}")
+    return getattr(_modules[name], attr, None)
+
+
+def minion_data(minion: str, data: dict[str, Any]) -> Any:
+    """
+    a runner's return data for a Result key, which fan-out prefixed with the
+    profile while the data inside still uses the bare minion
+    """
+    if minion in data:
+        return data[minion]
+    return data[minion.partition(SEPARATOR)[2]]
+
 
-for loader, module_name, is_pkg in pkgutil.walk_packages(__path__):
-    module = importlib.import_module(f"{__name__}.{module_name}")
-    globals()[module_name] = getattr(module, "render")
+def __getattr__(name: str) -> Callable:
+    if name.startswith("__"):
+        raise AttributeError(name)
+    return load(name)
@@ -0,0 +1,143 @@
+from typing import Any, Iterator
+
+from rich import box
+from rich.console import Console, ConsoleOptions, Group, RenderResult
+from rich.panel import Panel
+from rich.table import Table
+from rich.text import Text
+
+import guajillo.outputs
+from guajillo.outputs.highstate import HIGHSTATE, Highstate, unwrap
+
+# full panels are only drawn for this many changed or failed states
+DETAIL_LIMIT = 50
+# the states past DETAIL_LIMIT are listed one per line, this many per page
+PAGE_SIZE = 100
+
+STYLES = {"ok": "green", "changed": "yellow", "failed": "red"}
+
+
+def classify(lowstate: dict[str, Any]) -> str:
+    if not lowstate["result"]:
+        return "failed"
+    if lowstate.get("changes"):
+        return "changed"
+    return "ok"
+
+
+class CompactHighstate:
+    """
+    highstate output that scales with what changed instead of with the
+    number of states.
+
+    every minion is counted, but only minions with changed or failed states
+    get a row of their own and only the first DETAIL_LIMIT of those states
+    get a full panel. the rest are listed a page at a time. nothing is laid
+    out until rich asks for it.
+    """
+
+    def __init__(self, result: dict[str, Any]) -> None:
+        self.minions = 0
+        self.counts: dict[str, dict[str, int]] = {}
+        self.clean = 0
+        self.unknown: list[str] = []
+        # (minion, state id, lowstate) for every changed or failed state
+        self.interesting: list[tuple[str, str, dict[str, Any]]] = []
+        for minion, returned in result.items():
+            self.add_minion(minion, returned)
+        # failures first, then minion order
+        self.interesting.sort(key=lambda item: classify(item[2]) != "failed")
+
+    def add_minion(self, minion: str, returned: Any) -> None:
+        self.minions += 1
+        states = unwrap(minion, returned) if isinstance(returned, dict) else returned
+        if not isinstance(states, dict):
+            self.unknown.append(minion)
+            return
+        counts = {"ok": 0, "changed": 0, "failed": 0}
+        for id, lowstate in states.items():
+            if not isinstance(lowstate, dict) or "result" not in lowstate:
+                continue
+            kind = classify(lowstate)
+            counts[kind] += 1
+            if kind != "ok":
+                self.interesting.append((minion, id, lowstate))
+        if counts["changed"] or counts["failed"]:
+            self.counts[minion] = counts
+        else:
+            self.clean += 1
+
+    def summary(self) -> Table:
+        table = Table(box=box.SIMPLE_HEAD, title="Highstate Summary")
+        table.add_column("Minion")
+        for kind, style in STYLES.items():
+            table.add_column(kind, justify="right", style=style)
+        for minion, counts in sorted(
+            self.counts.items(), key=lambda item: -item[1]["failed"]
+        ):
+            table.add_row(minion, *(str(counts[kind]) for kind in STYLES))
+        if self.clean:
+            table.add_section()
+            table.add_row(Text(f"{self.clean} minions", style="green"), "all", "", "")
+        return table
+
+    def details(self) -> Iterator[Panel]:
+        core = Highstate({})
+        for minion, id, lowstate in self.interesting[:DETAIL_LIMIT]:
+            _, stateid, _, _ = id.split("_|-")
+            yield Panel(
+                core.build_lowstate_core(id, lowstate),
+                box=HIGHSTATE,
+                title=f"{minion}: {stateid}",
+                title_align="left",
+            )
+
+    def pages(self) -> Iterator[Table]:
+        rest = self.interesting[DETAIL_LIMIT:]
+        total = (len(rest) + PAGE_SIZE - 1) // PAGE_SIZE
+        for page in range(total):
+            table = Table(
+                box=box.SIMPLE, title=f"More changes, page {page + 1}/{total}"
+            )
+            table.add_column("Minion")
+            table.add_column("State")
+            table.add_column("Result")
+            for minion, id, lowstate in rest[page * PAGE_SIZE : (page + 1) * PAGE_SIZE]:
+                kind = classify(lowstate)
+                table.add_row(
+                    minion, id.split("_|-")[1], Text(kind, style=STYLES[kind])
+                )
+            yield table
+
+    def __rich_console__(
+        self, console: Console, options: ConsoleOptions
+    ) -> RenderResult:
+        yield self.summary()
+        if self.unknown:
+            yield Text(
+                f"Unreadable returns from {', '.join(self.unknown)}", style="red"
+            )
+        yield from self.details()
+        yield from self.pages()
+
+
+async def render(event: dict[str, Any], console: Console):
+    output = CompactHighstate(event["info"][0]["Result"])
+    nonreturns = await guajillo.outputs.non_returns(event, console)
+    return Group(output, nonreturns)
+
+
+async def render_minion(minion: str, returned: Any, console: Console):
+    output = CompactHighstate({minion: returned})
+    return Group(*output.details()) if output.counts else Text(f"{minion}: all ok")
+
+
+# the summary counts states out of every return, so with --stream the
+# returns are kept until the end
+SUMMARY_NEEDS_RETURNS = True
+
+
+async def summary(event: dict[str, Any], console: Console):
+    output = CompactHighstate(event["return"][0])
+    nonreturns = await guajillo.outputs.non_returns(event, console)
+    return Group(output.summary(), nonreturns)
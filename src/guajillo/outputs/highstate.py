@@ -1,7 +1,6 @@
 import logging
 from typing import Any
 
-import yaml
 from rich import box
 from rich.console import Console, Group, group
 from rich.panel import Panel
@@ -9,12 +8,30 @@ from rich.table import Table
 from rich.text import Text
 
 import guajillo.outputs
+from guajillo.outputs.yaml import dump
 
 log = logging.getLogger(__name__)
 
-HIGHSTATE: box.Box = box.Box(
-    " ── \n" "    \n" " ── \n" "    \n" " ── \n" " ── \n" "    \n" "    \n"
-)
+HIGHSTATE: box.Box = box.Box(" ── \n    \n ── \n    \n ── \n ── \n    \n    \n")
+
+# past this many minions the full table gets too big to lay out, a highstate
+# picked by function uses compact instead, see Guajillo.check_outputer
+COMPACT_OVER = 100
+LARGER = (COMPACT_OVER, "compact")
+
+
+def unwrap(minion: str, returned: Any) -> Any:
+    """
+    dig the state results out of a minion's return
+    """
+    # this is what happens because salt doesn't have standard returns.
+    if "return" in returned:
+        if "return" in returned["return"]:
+            return guajillo.outputs.minion_data(
+                minion, returned["return"]["return"]["data"]
+            )
+        return returned["return"]
+    return returned
 
 
 class Highstate:
@@ -27,7 +44,7 @@ class Highstate:
         self.mainTable.add_column("Highstate")
 
     def _yaml(self, renderable):
-        yaml_output = yaml.dump(renderable)
+        yaml_output = dump(renderable)
         return yaml_output
 
     @group()
@@ -67,15 +84,9 @@ class Highstate:
 
     def build_highstate(self):
         for minion, returned in self.event.items():
-            # this is what happens because salt doesn't have standard returns.
-            if "return" in returned:
-                if "return" in returned["return"]:
-                    vexed = returned["return"]["return"]["data"][minion]
-                else:
-                    vexed = returned["return"]
-            else:
-                vexed = returned
-            self.mainTable.add_row(minion, self.build_lowstate(vexed))
+            self.mainTable.add_row(
+                minion, self.build_lowstate(unwrap(minion, returned))
+            )
 
     def __rich__(self):
         return self.mainTable
@@ -86,3 +97,40 @@ async def render(event: dict[str, Any], console: Console):
     output.build_highstate()
     nonreturns = await guajillo.outputs.non_returns(event, console)
     return Group(output, nonreturns)
+
+
+async def render_minion(minion: str, returned: Any, console: Console):
+    output = Highstate({minion: returned})
+    output.build_highstate()
+    return output
+
+
+# the summary counts states out of every return, so with --stream the
+# returns are kept until the end
+SUMMARY_NEEDS_RETURNS = True
+
+
+async def summary(event: dict[str, Any], console: Console):
+    counts = {"ok": 0, "changed": 0, "failed": 0}
+    for returned in event["return"][0].values():
+        if not isinstance(returned, dict):
+            continue
+        for lowstate in returned.values():
+            if not isinstance(lowstate, dict) or "result" not in lowstate:
+                continue
+            if not lowstate["result"]:
+                counts["failed"] += 1
+            elif lowstate.get("changes"):
+                counts["changed"] += 1
+            else:
+                counts["ok"] += 1
+    totals = Text.assemble(
+        f"{len(event['return'][0])} minions: ",
+        (f"{counts['ok']} ok", "green"),
+        ", ",
+        (f"{counts['changed']} changed", "yellow"),
+        ", ",
+        (f"{counts['failed']} failed", "red"),
+    )
+    nonreturns = await guajillo.outputs.non_returns(event, console)
+    return Group(totals, nonreturns)
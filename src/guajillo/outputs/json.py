@@ -1,8 +1,26 @@
-import json
 from typing import Any
 
 from rich.json import JSON
 
+import guajillo.outputs
+from guajillo.utils.encode import dumps
 
-async def render(event: dict["str", Any], console) -> None:
-    return JSON(json.dumps(event))
+
+async def render(event: dict["str", Any], console) -> JSON | bytes:
+    # pipes get the raw bytes, highlighting is only for people
+    if not console.is_terminal:
+        return dumps(event) + b"\n"
+    return JSON.from_data(event)
+
+
+async def render_minion(minion: str, returned: Any, console) -> JSON | bytes:
+    if not console.is_terminal:
+        return dumps({minion: returned}) + b"\n"
+    return JSON.from_data({minion: returned})
+
+
+async def summary(event: dict[str, Any], console) -> Any:
+    if not console.is_terminal:
+        # the per minion lines already carry everything
+        return b""
+    return await guajillo.outputs.non_returns(event, console)
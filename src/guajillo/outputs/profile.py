@@ -1,3 +1,4 @@
+import logging
 from typing import Any
 
 from rich.console import Group
@@ -6,50 +7,72 @@ from rich.text import Text
 
 import guajillo.outputs
 
+log = logging.getLogger(__name__)
+
+# past this many minions a table each is unreadable, profile_stats aggregates
+STATS_OVER = 100
+
+
+def build_profile(minion: str, vexed: dict[str, Any]) -> Table:
+    state = Table(title=f"{minion}", width=120, highlight=True)
+    state.add_column("State", style="cyan")
+    state.add_column("name", style="cyan")
+    state.add_column("Function", style="cyan")
+    state.add_column("Result")
+    state.add_column("Duration", style="magenta")
+    total_duration = 0
+    good = 0
+    bad = 0
+    for id, results in vexed.items():
+        duration: str | Text = ""
+        module, id, name, fun = id.split("_|-")
+        if results["result"]:
+            result = Text("✔ ", style="green")
+            good += 1
+        else:
+            result = Text("✘", style="red")
+            bad += 1
+        if "duration" in results:
+            duration = Text(
+                f"{results['duration']} ms",
+                style="bold magenta",
+            )
+            total_duration += results["duration"]
+        state.add_row(id, name, f"{module}.{fun}", result, duration)
+    state.add_section()
+    state.add_row(
+        "Final Total",
+        "",
+        "",
+        f"[red]{bad}[/red]/[green]{good}[/green] ({bad + good})",
+        f"[bold magenta]{total_duration/1000:.4f} s[/bold magenta]",
+    )
+    return state
+
 
 async def render(event: dict[str, Any], console) -> None:
     output = event["info"][0]["Result"]
+    if len(output) > STATS_OVER:
+        log.info(f"{len(output)} minions, -o profile_stats aggregates them instead")
     isMinion = False
     if "Minions" in event["info"][0]:
         isMinion = True
+    tables = []
     for minion, returned in output.items():
-        state = Table(title=f"{minion}", width=120, highlight=True)
-        state.add_column("State", style="cyan")
-        state.add_column("name", style="cyan")
-        state.add_column("Function", style="cyan")
-        state.add_column("Result")
-        state.add_column("Duration", style="magenta")
-        total_duration = 0
-        good = 0
-        bad = 0
         if isMinion:
             vexed = returned["return"]
         else:
-            vexed = returned["return"]["return"]["data"][minion]
-
-        for id, results in vexed.items():
-            duration = ""
-            module, id, name, fun = id.split("_|-")
-            if results["result"]:
-                result = Text("✔ ", style="green")
-                good += 1
-            else:
-                result = Text("✘", style="red")
-                bad += 1
-            if "duration" in results:
-                duration = Text(
-                    f"{results['duration']} ms",
-                    style="bold magenta",
-                )
-                total_duration += results["duration"]
-            state.add_row(id, name, f"{module}.{fun}", result, duration)
-        state.add_section()
-        state.add_row(
-            "Final Total",
-            "",
-            "",
-            f"[red]{bad}[/red]/[green]{good}[/green] ({bad + good})",
-            f"[bold magenta]{total_duration/1000:.4f} s[/bold magenta]",
-        )
+            vexed = guajillo.outputs.minion_data(
+                minion, returned["return"]["return"]["data"]
+            )
+        tables.append(build_profile(minion, vexed))
     nonreturned = await guajillo.outputs.non_returns(event, console)
-    return Group(state, nonreturned)
+    return Group(*tables, nonreturned)
+
+
+async def render_minion(minion: str, returned: Any, console) -> Table:
+    return build_profile(minion, returned)
+
+
+async def summary(event: dict[str, Any], console) -> None:
+    return await guajillo.outputs.non_returns(event, console)
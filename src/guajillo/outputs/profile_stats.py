@@ -0,0 +1,163 @@
+from array import array
+from collections import defaultdict
+from typing import Any
+
+from rich import box
+from rich.console import Console, ConsoleOptions, Group, RenderResult
+from rich.table import Table
+from rich.text import Text
+
+import guajillo.outputs
+from guajillo.outputs.highstate import unwrap
+from guajillo.utils.timings import percentiles
+
+# rows shown for the slowest states and sls files
+TOP_STATES = 25
+# minions shown in the slowest minions table
+TOP_MINIONS = 10
+
+
+def duration_of(lowstate: Any) -> float | None:
+    """
+    a state's duration in ms, older salt sends it as "12.3 ms"
+    """
+    if not isinstance(lowstate, dict):
+        return None
+    duration = lowstate.get("duration")
+    if duration is None or isinstance(duration, float | int):
+        return duration
+    try:
+        return float(str(duration).split()[0])
+    except (ValueError, IndexError):
+        return None
+
+
+class ProfileStats:
+    """
+    state durations across every minion of a run.
+
+    every duration lands in a flat array per state, so the whole run costs
+    one pass over the returns and percentiles are only worked out for the
+    states that are shown.
+    """
+
+    def __init__(self, result: dict[str, Any]) -> None:
+        self.durations: dict[str, array] = defaultdict(lambda: array("d"))
+        self.minions: dict[str, float] = {}
+        self.sls: dict[str, float] = defaultdict(float)
+        self.unknown: list[str] = []
+        for minion, returned in result.items():
+            self.add_minion(minion, returned)
+
+    def add_minion(self, minion: str, returned: Any) -> None:
+        states = unwrap(minion, returned) if isinstance(returned, dict) else returned
+        if not isinstance(states, dict):
+            self.unknown.append(minion)
+            return
+        # this loop sees every state of every minion, keep it tight
+        durations = self.durations
+        sls = self.sls
+        total = 0.0
+        for id, lowstate in states.items():
+            try:
+                duration = lowstate["duration"]
+            except (KeyError, TypeError):
+                continue
+            if duration.__class__ is not float:
+                duration = duration_of(lowstate)
+                if duration is None:
+                    continue
+            durations[id].append(duration)
+            total += duration
+            source = lowstate.get("__sls__")
+            if source is not None:
+                sls[source] += duration
+        self.minions[minion] = total
+
+    @property
+    def points(self) -> int:
+        return sum(len(values) for values in self.durations.values())
+
+    def stats(self, id: str) -> dict[str, float]:
+        """
+        count, mean, p50, p95, p99 and max of one state's durations
+        """
+        values = self.durations[id]
+        p50, p95, p99 = percentiles(values, [50, 95, 99])
+        return {
+            "count": len(values),
+            "total": sum(values),
+            "mean": sum(values) / len(values) if values else 0.0,
+            "p50": p50,
+            "p95": p95,
+            "p99": p99,
+            "max": max(values, default=0.0),
+        }
+
+    def slowest_states(self, limit: int = TOP_STATES) -> list[tuple[str, dict]]:
+        totals = sorted(
+            self.durations, key=lambda id: sum(self.durations[id]), reverse=True
+        )
+        return [(id, self.stats(id)) for id in totals[:limit]]
+
+    def slowest_minions(self, limit: int = TOP_MINIONS) -> list[tuple[str, float]]:
+        return sorted(self.minions.items(), key=lambda item: -item[1])[:limit]
+
+    def states_table(self) -> Table:
+        table = Table(
+            box=box.SIMPLE_HEAD,
+            title=f"Slowest states, {self.points} durations from "
+            f"{len(self.minions)} minions",
+        )
+        table.add_column("State", style="cyan")
+        table.add_column("Function", style="cyan")
+        for column in ["Count", "Mean", "p50", "p95", "p99", "Max", "Total s"]:
+            table.add_column(column, justify="right", style="magenta")
+        for id, stats in self.slowest_states():
+            parts = id.split("_|-")
+            name = parts[1] if len(parts) == 4 else id
+            function = f"{parts[0]}.{parts[3]}" if len(parts) == 4 else ""
+            table.add_row(
+                name,
+                function,
+                str(stats["count"]),
+                *(f"{stats[key]:.1f}" for key in ["mean", "p50", "p95", "p99", "max"]),
+                f"{stats['total'] / 1000:.2f}",
+            )
+        return table
+
+    def minions_table(self) -> Table:
+        table = Table(box=box.SIMPLE_HEAD, title="Slowest minions")
+        table.add_column("Minion")
+        table.add_column("Total s", justify="right", style="magenta")
+        for minion, total in self.slowest_minions():
+            table.add_row(minion, f"{total / 1000:.2f}")
+        return table
+
+    def sls_table(self) -> Table:
+        table = Table(box=box.SIMPLE_HEAD, title="Time per sls, all minions")
+        table.add_column("SLS")
+        table.add_column("Total s", justify="right", style="magenta")
+        for sls, total in sorted(self.sls.items(), key=lambda item: -item[1])[
+            :TOP_STATES
+        ]:
+            table.add_row(sls, f"{total / 1000:.2f}")
+        return table
+
+    def __rich_console__(
+        self, console: Console, options: ConsoleOptions
+    ) -> RenderResult:
+        yield self.states_table()
+        yield self.minions_table()
+        if self.sls:
+            yield self.sls_table()
+        if self.unknown:
+            yield Text(
+                f"Unreadable returns from {', '.join(self.unknown)}", style="red"
+            )
+
+
+async def render(event: dict[str, Any], console: Console):
+    output = ProfileStats(event["info"][0]["Result"])
+    nonreturns = await guajillo.outputs.non_returns(event, console)
+    return Group(output, nonreturns)
@@ -1,9 +1,48 @@
-from typing import Any
+from typing import Any, Iterator
 
 import yaml
+from rich.console import Group
 from rich.syntax import Syntax
 
+import guajillo.outputs
 
-async def render(event: dict[str, Any], console) -> None:
-    yaml_output = yaml.dump(event["return"][0])
+# libyaml is several times faster, fall back to the pure python dumper
+Dumper = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
+
+def dump(data: Any) -> str:
+    return yaml.dump(data, Dumper=Dumper)
+
+
+def _stream(returns: dict[str, Any]) -> Iterator[bytes]:
+    for minion, returned in sorted(returns.items()):
+        yield dump({minion: returned}).encode()
+
+
+async def render(event: dict[str, Any], console) -> Any:
+    returns = event["return"][0]
+    if not isinstance(returns, dict):
+        yaml_output = dump(returns)
+        if not console.is_terminal:
+            return yaml_output.encode()
+        return Syntax(yaml_output, "yaml")
+    # one minion at a time, so the whole document is never held at once
+    if not console.is_terminal:
+        return _stream(returns)
+    return Group(
+        *(
+            Syntax(dump({minion: ret}), "yaml")
+            for minion, ret in sorted(returns.items())
+        )
+    )
+
+
+async def render_minion(minion: str, returned: Any, console) -> Any:
+    yaml_output = dump({minion: returned})
+    if not console.is_terminal:
+        return yaml_output.encode()
     return Syntax(yaml_output, "yaml")
+
+
+async def summary(event: dict[str, Any], console) -> None:
+    return await guajillo.outputs.non_returns(event, console)
@@ -0,0 +1,182 @@
+import asyncio
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any
+
+from rich.console import Console
+
+from guajillo.exceptions import GuajilloException, TerminateTaskGroup
+from guajillo.utils.bus import EventBus, job_event
+from guajillo.utils.cli import CliParse
+from guajillo.utils.conn import Guajillo
+from guajillo.utils.fanout import profile_url
+from guajillo.utils.tokens import DEFAULT_CACHE
+
+log = logging.getLogger(__name__)
+
+
+def socket_path(config: dict[str, Any]) -> Path:
+    """
+    where the agent listens, [agent] socket in config or the cache dir
+    """
+    default = f"{config.get('cache_dir', DEFAULT_CACHE)}/agent.sock"
+    return Path(config.get("agent", {}).get("socket", default)).expanduser()
+
+
+class Agent:
+    """
+    long lived process that holds a warm, logged in salt-api client and event
+    stream per profile, and runs lowstates handed to it over a unix socket.
+
+    config.toml is read once when the agent starts. profiles, credentials and
+    [http] settings changed after that need the agent restarted.
+    """
+
+    def __init__(
+        self,
+        parser: CliParse,
+        config: dict[str, Any],
+        console: Console,
+        path: Path,
+    ) -> None:
+        self.parser = parser
+        self.config = config
+        self.console = console
+        self.path = path
+        self.clients: dict[str, Guajillo] = {}
+        self.lock = asyncio.Lock()
+        self.streams: set[asyncio.Task] = set()
+
+    async def client_for(self, profile: str) -> Guajillo:
+        async with self.lock:
+            if profile in self.clients:
+                return self.clients[profile]
+            url = profile_url(self.config, profile)
+            log.info(f"starting client for profile {profile}")
+            client = Guajillo(
+                url,
+                self.parser,
+                self.config,
+                console=self.console,
+                profile=profile,
+            )
+            client.persistent = True
+            await client.login()
+            if not client.authed:
+                await client.close()
+                raise GuajilloException(f"Unable to authorize profile {profile}")
+            self.streams.add(asyncio.create_task(client.streamMon()))
+            self.clients[profile] = client
+            return client
+
+    async def handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """
+        one request per connection: a json line in, json event lines out
+        """
+
+        async def emit(
+            event: dict[str, Any],
+            output: str,
+            step: str,
+            render: str | None = None,
+            delta: bool = False,
+        ) -> None:
+            line = job_event(event, output, step, render, delta)
+            writer.write(json.dumps(line).encode() + b"\n")
+            await writer.drain()
+
+        try:
+            request = json.loads(await reader.readline())
+            client = await self.client_for(request["profile"])
+            await client.run_lowstate(
+                request["lowstate"],
+                emit,
+                timeout=request.get("timeout"),
+                output=request.get("output"),
+            )
+        except Exception as err:
+            log.error(f"agent request failed: {err}")
+            writer.write(json.dumps({"error": str(err)}).encode() + b"\n")
+        finally:
+            try:
+                await writer.drain()
+                writer.close()
+                await writer.wait_closed()
+            except ConnectionError as err:
+                log.debug(err)
+
+    async def _claim_socket(self) -> None:
+        self.path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+        if not self.path.exists():
+            return
+        try:
+            _, writer = await asyncio.open_unix_connection(str(self.path))
+        except OSError:
+            log.debug(f"removing stale socket {self.path}")
+            self.path.unlink()
+            return
+        writer.close()
+        raise GuajilloException(f"agent already listening on {self.path}")
+
+    async def serve(self) -> None:
+        await self._claim_socket()
+        server = await asyncio.start_unix_server(self.handle, path=str(self.path))
+        os.chmod(self.path, 0o600)
+        log.warning(f"agent listening on {self.path}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            for client in self.clients.values():
+                client.done.set()
+                await client.close()
+            for stream in self.streams:
+                stream.cancel()
+            self.path.unlink(missing_ok=True)
+
+
+class AgentClient:
+    """
+    cli side of the agent, stands in for Guajillo.taskMan when one is running
+    """
+
+    def __init__(self, path: Path, console: Console, config: dict[str, Any]) -> None:
+        self.path = path
+        self.console = console
+        self.config = config
+
+    async def connect(self) -> bool:
+        if not self.path.exists():
+            return False
+        try:
+            self.reader, self.writer = await asyncio.open_unix_connection(
+                str(self.path), limit=2**26
+            )
+        except OSError as err:
+            log.debug(f"agent not available: {err}")
+            return False
+        return True
+
+    async def taskMan(self, bus: EventBus, request: dict[str, Any]) -> None:
+        try:
+            log.info("Sending lowstate to agent")
+            self.writer.write(json.dumps(request).encode() + b"\n")
+            await self.writer.drain()
+            while True:
+                line = await self.reader.readline()
+                if not line:
+                    raise GuajilloException("agent closed the connection")
+                event = json.loads(line)
+                if "error" in event:
+                    raise GuajilloException(f"agent: {event['error']}")
+                await bus.put(event)
+                if event["meta"]["step"] == "final":
+                    break
+            self.writer.close()
+        except Exception:
+            self.console.print_exception(show_locals=self.config["debug"])
+            raise TerminateTaskGroup()
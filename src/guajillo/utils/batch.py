@@ -0,0 +1,155 @@
+import asyncio
+import logging
+import math
+from typing import Any
+
+from guajillo.exceptions import GuajilloException, TerminateTaskGroup
+from guajillo.utils.bus import EventBus
+from guajillo.utils.conn import Guajillo
+from guajillo.utils.jobs import Job
+
+log = logging.getLogger(__name__)
+
+
+def window_size(spec: str, total: int) -> int:
+    """
+    turn -b 10 or -b 25% into a number of minions
+    """
+    try:
+        if spec.endswith("%"):
+            size = math.ceil(total * float(spec[:-1]) / 100)
+        else:
+            size = int(spec)
+    except ValueError:
+        raise GuajilloException(f"Invalid batch size {spec}")
+    return max(size, 1)
+
+
+def failed(result: dict[str, Any] | None) -> bool:
+    if result is None:
+        return True
+    return result.get("retcode", 0) != 0 or result.get("success") is False
+
+
+class Batch:
+    """
+    client side batching. the target is resolved with a test.ping first, then
+    the job runs on one minion at a time with at most size minions in flight,
+    the next minion starting as soon as any running one returns.
+
+    returns stream out as they arrive and are merged into one result, so the
+    usual outputers see a single job.
+    """
+
+    def __init__(
+        self,
+        client: Guajillo,
+        size: str,
+        wait: float = 0.0,
+        max_fail: str | None = None,
+    ) -> None:
+        self.client = client
+        self.size = size
+        self.wait = wait
+        self.max_fail = max_fail
+        self.failures = 0
+
+    async def _resolve(self, params: dict[str, Any]) -> tuple[str, list[str]]:
+        """
+        the ping's jid and the minions matching the target that answered it
+        """
+        found: list[dict[str, Any]] = []
+
+        async def collect(event: dict[str, Any], output: str, step: str, *_, **__):
+            if step == "final":
+                found.append(event)
+
+        ping = dict(params, fun="test.ping", arg=[], kwarg={})
+        await self.client.run_lowstate([ping], emit=collect)
+        if not found or "info" not in found[0]:
+            return "", []
+        info = found[0]["info"][0]
+        missing = [m for m in info.get("Minions", []) if m not in info["Result"]]
+        if missing:
+            log.warning(f"not batching minions that did not answer: {missing}")
+        return info["jid"], [m for m in info.get("Minions", []) if m in info["Result"]]
+
+    async def _run_one(
+        self,
+        job: Job,
+        minion: str,
+        params: dict[str, Any],
+        window: asyncio.Semaphore,
+        limit: int | None,
+        render: str,
+    ) -> None:
+        async with window:
+            if limit is not None and self.failures >= limit:
+                log.info(f"failure limit reached, not starting {minion}")
+                return
+            finals: list[dict[str, Any]] = []
+
+            async def collect(event: dict[str, Any], output: str, step: str, *_, **__):
+                if step == "final":
+                    finals.append(event)
+
+            lowstate = dict(params, tgt=minion, tgt_type="list")
+            await self.client.run_lowstate([lowstate], emit=collect)
+            added = []
+            for event in finals:
+                if isinstance(event, dict) and "info" in event:
+                    added.extend(job.merge_lookup(event))
+            if failed(job.results.get(minion)):
+                self.failures += 1
+            if added:
+                await self.client._push_event(
+                    job.as_lookup(job.take_fresh()), "status", "normal", render, True
+                )
+            if self.wait:
+                await asyncio.sleep(self.wait)
+
+    async def taskMan(self, bus: EventBus) -> None:
+        """
+        resolve the target and work through it a window at a time
+        """
+        try:
+            log.info("Starting batch Task Manager")
+            client = self.client
+            client.bus = bus
+            with client.timings.phase("login"):
+                await client.login()
+            params = client._make_params()[0]
+            if params["client"] != "local_async":
+                raise GuajilloException("--batch only works with salt targets")
+            jid, minions = await self._resolve(params)
+            job = Job(f"batch:{jid}", "minion", fun=params["fun"], minions=minions)
+            size = window_size(self.size, len(minions))
+            limit = None
+            if self.max_fail is not None:
+                limit = window_size(self.max_fail, len(minions))
+            log.info(
+                f"running {params['fun']} on {len(minions)} minions, {size} at a time"
+            )
+            render = await client.check_outputer(params["fun"], minions=len(minions))
+            window = asyncio.Semaphore(size)
+            await asyncio.gather(
+                *(
+                    self._run_one(job, minion, params, window, limit, render)
+                    for minion in minions
+                )
+            )
+            if limit is not None and self.failures >= limit:
+                log.warning(f"stopped after {self.failures} minions failed")
+            await client._push_event(job.as_lookup(), render, "final")
+            await client.close()
+        except Exception:
+            self.client.console.print_exception(show_locals=self.client.config["debug"])
+            raise TerminateTaskGroup()
+        finally:
+            self.client.done.set()
+
+    async def streamMon(self) -> None:
+        await self.client.streamMon()
+
+    async def close(self) -> None:
+        await self.client.close()
@@ -0,0 +1,111 @@
+import asyncio
+import logging
+from typing import Any, NotRequired, TypedDict
+
+log = logging.getLogger(__name__)
+
+# a waiting delta is merged with newer ones up to this many minions, after
+# that it waits in the queue like everything else
+DELTA_MINIONS = 64
+
+
+class EventMeta(TypedDict):
+    output: str
+    step: str
+    # the outputer the final result will use, sent with status events so
+    # returns can be rendered as they arrive
+    render: NotRequired[str]
+    # the event only holds the minions that returned since the last one
+    delta: NotRequired[bool]
+
+
+class JobEvent(TypedDict):
+    meta: EventMeta
+    output: Any
+
+
+def job_event(
+    output: Any,
+    outputer: str,
+    step: str,
+    render: str | None = None,
+    delta: bool = False,
+) -> JobEvent:
+    event: JobEvent = {"meta": {"output": outputer, "step": step}, "output": output}
+    if render is not None:
+        event["meta"]["render"] = render
+    if delta:
+        event["meta"]["delta"] = True
+    return event
+
+
+def same_job(older: JobEvent, newer: JobEvent) -> bool:
+    old_info, new_info = older["output"]["info"][0], newer["output"]["info"][0]
+    return old_info.get("jid") == new_info.get("jid")
+
+
+def merge_delta(older: JobEvent, newer: JobEvent) -> None:
+    """
+    fold an older delta's returns into a newer one, so coalescing never
+    loses a minion
+    """
+    old_info, new_info = older["output"]["info"][0], newer["output"]["info"][0]
+    new_info["Result"] = old_info["Result"] | new_info["Result"]
+    newer["output"]["return"][0] = (
+        older["output"]["return"][0] | newer["output"]["return"][0]
+    )
+
+
+class EventBus:
+    """
+    bounded channel from the salt-api client to the outputs.
+
+    status events only ever hold the latest one, as a newer status replaces
+    an older one outright, deltas of the same job are merged instead. the
+    returns in a delta are never dropped, anything put after it is queued
+    behind it. everything else is queued in order and producers wait when
+    the queue is full, so memory stays flat on long jobs.
+    """
+
+    def __init__(self, maxsize: int = 64) -> None:
+        self.queue: asyncio.Queue[JobEvent] = asyncio.Queue(maxsize)
+        self.status: JobEvent | None = None
+        self.ready = asyncio.Event()
+
+    async def put(self, event: JobEvent) -> None:
+        pending = self.status
+        if pending is not None and pending["meta"].get("delta"):
+            if (
+                event["meta"].get("delta")
+                and same_job(pending, event)
+                and len(pending["output"]["return"][0]) < DELTA_MINIONS
+            ):
+                log.debug("coalescing status event")
+                merge_delta(pending, event)
+            else:
+                # returns that were not shown yet, another job's, a full
+                # delta or anything that is not a delta goes after them
+                self.status = None
+                await self.queue.put(pending)
+        if event["meta"]["output"] == "status":
+            self.status = event
+            self.ready.set()
+            return
+        await self.queue.put(event)
+        self.ready.set()
+
+    async def get(self) -> JobEvent:
+        """
+        next queued event, or the latest status once the queue is drained
+        """
+        while True:
+            if not self.queue.empty():
+                event = self.queue.get_nowait()
+                if event["meta"]["step"] == "final":
+                    self.status = None
+                return event
+            if self.status is not None:
+                event, self.status = self.status, None
+                return event
+            self.ready.clear()
+            await self.ready.wait()
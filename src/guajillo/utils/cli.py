@@ -1,14 +1,37 @@
 import argparse
-import operator
+import shlex
 import sys
-from inspect import getmembers, isfunction
 
 from rich.console import Console
-from rich.table import Table
 
 import guajillo.outputs
 from guajillo.utils.console import stderr_console
 
+# separates the commands when several jobs are given on the command line
+JOB_SEPARATOR = "--then"
+
+
+def split_commands(args: list[str]) -> list[list[str]]:
+    """
+    salt '*' test.ping --then salt-run jobs.active -> one list per command
+    """
+    commands: list[list[str]] = [[]]
+    for arg in args:
+        if arg == JOB_SEPARATOR:
+            commands.append([])
+        else:
+            commands[-1].append(arg)
+    return [command for command in commands if command]
+
+
+def read_commands(path: str) -> list[list[str]]:
+    """
+    one command per line, blank lines and # comments are skipped
+    """
+    with open(path) as fh:
+        lines = [line.strip() for line in fh]
+    return [shlex.split(line) for line in lines if line and not line.startswith("#")]
+
 
 class CliParse:
     def __init__(self, console: Console = stderr_console) -> None:
@@ -19,9 +42,7 @@ class CliParse:
             add_help=False,
         )
         self.console = console
-        self.outputs = list(
-            map(operator.itemgetter(0), getmembers(guajillo.outputs, isfunction))
-        )
+        self.outputs = guajillo.outputs.names()
 
     def build_args(self, args: list["str"]) -> None:
         """
@@ -38,17 +59,24 @@ class CliParse:
             "--profile",
             dest="profile",
             default="netapi",
-            help="profile from config to use for connection",
+            help="profile from config to use for connection, several can be given comma separated or as a [groups] name",
         )
         self.parser.add_argument(
             "-o",
             "--out",
             dest="output",
-            choices=self.outputs,
             help="Output method will auto detect if possable, use this to force or set to json for json output",
         )
         self.parser.add_argument(
-            "--output-file", dest="output_file", help="Output File"
+            "--output-file",
+            dest="output_file",
+            help="stream results to a json lines file, .zst to compress",
+        )
+        self.parser.add_argument(
+            "--stream",
+            dest="stream",
+            action="store_true",
+            help="render each minion as it returns, then a summary",
         )
         self.parser.add_argument(
             "-l",
@@ -60,20 +88,93 @@ class CliParse:
         self.parser.add_argument(
             "-t",
             "--timeout",
-            type=int,
+            type=float,
             default=30,
-            help="timeout for internal operations",
+            help="seconds to wait for a job to return",
+        )
+        self.parser.add_argument(
+            "-b",
+            "--batch",
+            dest="batch",
+            help="run on at most this many minions, or this percent, at a time",
+        )
+        self.parser.add_argument(
+            "--batch-wait",
+            dest="batch_wait",
+            type=float,
+            default=0.0,
+            help="seconds to wait after a minion returns before starting the next",
+        )
+        self.parser.add_argument(
+            "--batch-fail",
+            dest="batch_fail",
+            help="stop starting minions once this many, or this percent, failed",
+        )
+        self.parser.add_argument(
+            "--watch",
+            dest="watch",
+            type=float,
+            metavar="SECONDS",
+            help="run the command again every SECONDS and show what changed",
+        )
+        self.parser.add_argument(
+            "--no-agent",
+            dest="no_agent",
+            action="store_true",
+            help="do not hand the job to a running guajillo agent",
+        )
+        self.parser.add_argument(
+            "--timings",
+            dest="timings",
+            action="store_const",
+            const="table",
+            help="print where the time went on stderr at exit",
+        )
+        # a separate flag, --timings with an optional value would eat the
+        # salt command that follows it
+        self.parser.add_argument(
+            "--timings-json",
+            dest="timings",
+            action="store_const",
+            const="json",
+            help="as --timings, but as json",
+        )
+        self.parser.add_argument(
+            "--jobs",
+            dest="jobs",
+            help="file with one salt command per line, all sent in one call",
+        )
+        self.parser.add_argument(
+            "--jid",
+            dest="jid",
+            help="render a finished job again, from the local cache if possible",
         )
         self.parser.add_argument("-h", "--help", action="store_true")
 
         self.parsed_args, self.salt_args = self.parser.parse_known_args(args)
         if self.parsed_args.help:
             self.help()
+        self.commands = split_commands(self.salt_args)
+        if self.parsed_args.jobs is not None:
+            try:
+                self.commands += read_commands(self.parsed_args.jobs)
+            except (OSError, ValueError) as err:
+                self.parser.error(f"argument --jobs: {err}")
+        # checked here rather than with choices so plugins are only looked up
+        # when a non builtin outputer is asked for
+        output = self.parsed_args.output
+        if output is not None and not guajillo.outputs.exists(output):
+            self.parser.error(
+                f"argument -o/--out: invalid choice: '{output}' "
+                f"(choose from {', '.join(guajillo.outputs.available())})"
+            )
 
     def help(self, doexit: bool = True):
         """
         display help txt
         """
+        from rich.table import Table
+
         self.console.print(
             "[bold]usage[/bold]: guajillo [-h] [-c CONFIG] [-p PROFILE] [-o OUTPUT] [--out-list] [--output-file OUTPUT_FILE] [-L {[bold red]CRITICAL[/bold red],[red]ERROR[/red],[yellow]WARNING[/yellow],[blue]INFO[/blue],[green]DEBUG[/green]}] [SALT commands]"
         )
@@ -99,13 +200,13 @@ class CliParse:
             "-p",
             "--profile",
             "PROFILE",
-            "Profile from config file to use as login info",
+            "Profile from config file to use as login info, comma separate profiles or use a \\[groups] name to run against several masters",
             "netapi",
         )
         options.add_row(
             "-o",
             "--out",
-            f"{{ {', '.join(self.outputs)} }}",
+            f"{{ {', '.join(guajillo.outputs.available())} }}",
             "force output style through a known output",
             "auto",
         )
@@ -113,16 +214,86 @@ class CliParse:
             "",
             "--output-file",
             "OUTPUT_FILE",
-            "Not implimented, output file to dump output to",
+            "Stream each minion return to a json lines file, zstd compressed if it ends in .zst",
+            "",
+        )
+        options.add_row(
+            "",
+            "--stream",
+            "",
+            "Render each minion as it returns, then a summary",
             "",
         )
         options.add_row(
             "-t",
             "--timeout",
             "TIMEOUT",
-            "timeout for internal operations, loops to fetch",
+            "Seconds to wait for a job to return before showing what is there",
             "30",
         )
+        options.add_row(
+            "-b",
+            "--batch",
+            "BATCH",
+            "Run on at most this many minions (or N%) at a time, starting the next as soon as one returns",
+            "",
+        )
+        options.add_row(
+            "",
+            "--batch-wait",
+            "BATCH_WAIT",
+            "Seconds to wait after a minion returns before starting the next",
+            "0",
+        )
+        options.add_row(
+            "",
+            "--batch-fail",
+            "BATCH_FAIL",
+            "Stop starting new minions once this many (or N%) have failed",
+            "",
+        )
+        options.add_row(
+            "",
+            "--watch",
+            "SECONDS",
+            "Keep running the command every SECONDS, showing only what changed since the run before",
+            "",
+        )
+        options.add_row(
+            "",
+            "--no-agent",
+            "",
+            "Run directly even if a guajillo agent is listening",
+            "",
+        )
+        options.add_row(
+            "",
+            "--jobs",
+            "JOBS",
+            "File with one salt command per line, every command is sent in one call and rendered on its own. Commands can also be chained with --then",
+            "",
+        )
+        options.add_row(
+            "",
+            "--jid",
+            "JID",
+            "Render a finished job again, from the local result cache without touching the network when it is there",
+            "",
+        )
+        options.add_row(
+            "",
+            "--timings",
+            "",
+            "Print time per phase, request latency and render time on stderr at exit",
+            "",
+        )
+        options.add_row(
+            "",
+            "--timings-json",
+            "",
+            "Same as --timings, printed as json",
+            "",
+        )
         options.add_row(
             "-l",
             "--log",
@@ -132,6 +303,21 @@ class CliParse:
         )
         self.console.print(options)
 
+        events = Table(title="guajillo events \\[options], tail the event bus")
+        events.add_column("option name")
+        events.add_column("description")
+        events.add_column("default")
+        events.add_row("--tag GLOB", "Only events with a tag matching GLOB", "")
+        events.add_row("--regex RE", "Only events with a tag matching RE", "")
+        events.add_row("--minion ID", "Only events from or about minion ID", "")
+        events.add_row("--jid JID", "Only events of job JID", "")
+        events.add_row(
+            "--format",
+            "ndjson for one raw event per line, summary for live counters per tag",
+            "ndjson",
+        )
+        self.console.print(events)
+
         self.console.print("\n[bold]Copyright:copyright: 2024 Thomas Phipps[/bold]\n")
         if doexit:
             sys.exit()
@@ -1,17 +1,158 @@
 import asyncio
 import json
 import logging
-from typing import Any
+from typing import Any, Awaitable, Callable
 
-from httpx import URL, AsyncClient, Cookies, Headers, ReadError
-from httpx_sse import aconnect_sse
+from httpx import (
+    URL,
+    AsyncClient,
+    Cookies,
+    Headers,
+    Limits,
+    Request,
+    Response,
+    Timeout,
+    TransportError,
+)
+from httpx_sse import SSEError, aconnect_sse
 from rich.console import Console
 
+import guajillo.outputs
 from guajillo.exceptions import GuajilloException, TerminateTaskGroup
+from guajillo.utils.bus import EventBus, job_event
 from guajillo.utils.cli import CliParse
+from guajillo.utils.jobs import Job, parse_tag
+from guajillo.utils.lookup import iter_lookup
+from guajillo.utils.poll import PollScheduler, poll_settings
+from guajillo.utils.results import ResultCache
+from guajillo.utils.timings import Timings
+from guajillo.utils.tokens import DEFAULT_CACHE, TokenCache
 
 log = logging.getLogger(__name__)
 
+# with the event stream up, look the job up anyway after this much quiet
+FALLBACK_INTERVAL = 5.0
+STREAM_WAIT = 2.0
+RECONNECT_WAIT = 1.0
+
+# emit(event, output, step, render=None, delta=False)
+Emitter = Callable[..., Awaitable[None]]
+
+# per profile overrides live in a [<profile>.http] table in config.toml
+HTTP_DEFAULTS: dict[str, Any] = {
+    "http2": True,
+    "max_connections": 20,
+    "max_keepalive_connections": 10,
+    "keepalive_expiry": 30.0,
+    "timeout": 30.0,
+    "connect_timeout": 10.0,
+    "stream_timeout": 1024.0,
+}
+
+
+def client_settings(profile: dict[str, Any], stream: bool = False) -> dict[str, Any]:
+    """
+    AsyncClient arguments for a profile. the event stream gets a single
+    connection of its own with a long read timeout, so it never holds a
+    slot the /jobs lookups need.
+    """
+    http = HTTP_DEFAULTS | profile.get("http", {})
+    if stream:
+        return {
+            "http2": False,
+            "limits": Limits(max_connections=1, max_keepalive_connections=1),
+            "timeout": Timeout(http["stream_timeout"], connect=http["connect_timeout"]),
+        }
+    return {
+        "http2": http["http2"],
+        "limits": Limits(
+            max_connections=http["max_connections"],
+            max_keepalive_connections=http["max_keepalive_connections"],
+            keepalive_expiry=http["keepalive_expiry"],
+        ),
+        "timeout": Timeout(http["timeout"], connect=http["connect_timeout"]),
+    }
+
+
+def target_type(target_type_abbrv: str) -> str:
+    tgts = {
+        "-C": "compound",
+        "-E": "pcre",
+        "-P": "grain_pcre",
+        "-G": "grain",
+        "-L": "list",
+        "-I": "pillar",
+        "-J": "pillar_pcre",
+        "-S": "ipcidr",
+        "-R": "range",
+        "-N": "nodegroup",
+    }
+    if target_type_abbrv in tgts:
+        return tgts[target_type_abbrv]
+    raise GuajilloException("Unknown Target Type")
+
+
+def make_lowstate(command: list[str]) -> dict[str, Any]:
+    salt_args = list(command)
+    params: dict[str, Any] = {}
+    protocol = salt_args.pop(0)
+    if protocol.lower() in ["salt", "salt-call"]:
+        if salt_args[0].startswith("-"):
+            tgt_type = target_type(salt_args.pop(0))
+            target = salt_args.pop(0)
+        else:
+            tgt_type = "glob"
+            target = salt_args.pop(0)
+        params = {
+            "client": "local_async",
+            "tgt": target,
+            "tgt_type": tgt_type,
+        }
+
+    if protocol.lower() == "salt-run":
+        params = {"client": "runner_async"}
+
+    if protocol.lower() == "salt-wheel":
+        params = {"client": "wheel_async"}
+    if params == {}:
+        raise GuajilloException("Unknown salt protocol")
+
+    fun = salt_args.pop(0)
+    args = []
+    kwargs = {}
+    for index, value in enumerate(salt_args):
+        if "=" in value:
+            svalue = value.split("=")
+            try:
+                rendered = json.loads(svalue[1])
+            except ValueError:
+                log.debug("json rendering failed, useing str")
+                rendered = svalue[1]
+            kwargs.update({svalue[0]: rendered})
+        else:
+            try:
+                rendered = json.loads(value)
+            except ValueError:
+                rendered = value
+            args.append(rendered)
+
+    params.update(
+        {
+            "fun": fun,
+            "arg": args,
+            "kwarg": kwargs,
+        }
+    )
+    return params
+
+
+def make_params(commands: list[list[str]]) -> list[dict[str, Any]]:
+    """
+    one lowstate chunk per command given, salt-api takes them in one call.
+    needs no client, the cli builds it for the agent too
+    """
+    return [make_lowstate(command) for command in commands]
+
 
 class Guajillo:
     def __init__(
@@ -20,6 +161,8 @@ class Guajillo:
         parser: CliParse,
         config: dict["str", Any],
         console: Console,
+        profile: str | None = None,
+        timings: Timings | None = None,
     ) -> None:
         self.url: URL = URL(url)
         if self.url.scheme not in ["http", "https"]:
@@ -34,89 +177,70 @@ class Guajillo:
             }
         )
         self.cookies: Cookies = Cookies()
-        self.client: AsyncClient = AsyncClient(
-            headers=self.headers, cookies=self.cookies, timeout=20
-        )
         self.parser = parser
+        self.profile = profile or parser.parsed_args.profile
         self.config = config
+        self.timings = timings if timings is not None else Timings(enabled=False)
+        profile_config = config.get(self.profile, {})
+        self.client: AsyncClient = AsyncClient(
+            headers=self.headers,
+            cookies=self.cookies,
+            event_hooks=self.timings.hooks(),
+            **client_settings(profile_config),
+        )
+        self.stream_client: AsyncClient = AsyncClient(
+            headers=self.headers,
+            cookies=self.cookies,
+            **client_settings(profile_config, stream=True),
+        )
         self.console = console
         self.authed = False
+        self.cached_token = False
+        # the token /events last refused, None while the stream is accepted
+        self.stream_refused: str | None = None
+        self.tokens = TokenCache(config.get("cache_dir", DEFAULT_CACHE))
+        self.jobs: dict[str, Job] = {}
+        self.early_events: dict[str, list[tuple[str, dict[str, Any]]]] = {}
+        self.calling = 0
+        # the agent keeps one client per profile alive and needs the stream back
+        self.persistent = False
+        # the outputs render each minion as it returns, see _streams
+        self.streamed = False
+        # every raw event off /events goes here
+        self.on_event: Callable[[str], None] = self._route_event
+        self.auth_ready = asyncio.Event()
+        self.stream_ready = asyncio.Event()
+        self.stream_closed = asyncio.Event()
+        self.done = asyncio.Event()
 
-    def _get_target_type(self, target_type_abbrv: str) -> str:
-        tgts = {
-            "-C": "compound",
-            "-E": "pcre",
-            "-P": "grain_pcre",
-            "-G": "grain",
-            "-L": "list",
-            "-I": "pillar",
-            "-J": "pillar_pcre",
-            "-S": "ipcidr",
-            "-R": "range",
-            "-N": "nodegroup",
-        }
-        if target_type_abbrv in tgts:
-            return tgts[target_type_abbrv]
-        raise GuajilloException("Unknown Target Type")
-
-    def _make_params(self):
-        salt_args = self.parser.salt_args
-        params = {}
-        protocol = salt_args.pop(0)
-        if protocol.lower() in ["salt", "salt-call"]:
-            if salt_args[0].startswith("-"):
-                tgt_type = self._get_target_type(salt_args.pop(0))
-                target = salt_args.pop(0)
-            else:
-                tgt_type = "glob"
-                target = salt_args.pop(0)
-            params = {
-                "client": "local_async",
-                "tgt": target,
-                "tgt_type": tgt_type,
-            }
+    _get_target_type = staticmethod(target_type)
+    _make_lowstate = staticmethod(make_lowstate)
 
-        if protocol.lower() == "salt-run":
-            params = {"client": "runner_async"}
-
-        if protocol.lower() == "salt-wheel":
-            params = {"client": "wheel_async"}
-        if params == {}:
-            raise GuajilloException("Unknown salt protocol")
-
-        fun = salt_args.pop(0)
-        args = []
-        kwargs = {}
-        for index, value in enumerate(salt_args):
-            if "=" in value:
-                svalue = value.split("=")
-                try:
-                    rendered = json.loads(svalue[1])
-                except ValueError:
-                    log.debug("json rendering failed, useing str")
-                    rendered = svalue[1]
-                kwargs.update({svalue[0]: rendered})
-            else:
-                try:
-                    rendered = json.loads(value)
-                except ValueError:
-                    rendered = value
-                args.append(rendered)
+    def _make_params(self) -> list[dict[str, Any]]:
+        return make_params(self.parser.commands)
 
-        params.update(
-            {
-                "fun": fun,
-                "arg": args,
-                "kwarg": kwargs,
-            }
-        )
-        return [params]
+    def _set_token(self, token: str) -> None:
+        self.headers["X-Auth-Token"] = token
+        self.client.headers["X-Auth-Token"] = token
+        self.stream_client.headers["X-Auth-Token"] = token
 
-    async def login(self):
-        profile = self.config[self.parser.parsed_args.profile]
+    async def login(self, force: bool = False):
+        profile_name = self.profile
+        profile = self.config[profile_name]
+        use_cache = profile.get("token_cache", True)
         username = profile["username"]
-        password = profile["password"]
         auth = profile["auth"]
+        if use_cache and not force:
+            cached = self.tokens.load(profile_name, str(self.url), username, auth)
+            if cached is not None:
+                log.debug(f"using cached token for profile {profile_name}")
+                self._set_token(cached["token"])
+                self.cached_token = True
+                self.authed = True
+                self.auth_ready.set()
+                return {"return": [cached]}
+        self.cached_token = False
+        password = profile["password"]
         url = URL(f"{self.url}/login")
         params = {
             "username": username,
@@ -129,7 +253,6 @@ class Guajillo:
             headers=self.headers,
             cookies=self.cookies,
             json=params,
-            timeout=30,
         )
         response = await self.client.send(request)
         if response.status_code not in [200, 401]:
@@ -138,7 +261,28 @@ class Guajillo:
             self.authed = False
             return '{"Status": "Unable to authorize connection"}'
         self.authed = True
-        return response.json()
+        output = response.json()
+        login = output["return"][0]
+        if "token" in login:
+            self._set_token(login["token"])
+            if use_cache:
+                self.tokens.save(profile_name, str(self.url), login, username, auth)
+        self.auth_ready.set()
+        return output
+
+    async def _send(self, request: Request, stream: bool = False) -> Response:
+        """
+        send a request, logging in again once if our token was refused
+        """
+        response = await self.client.send(request, stream=stream)
+        if response.status_code == 401 and "X-Auth-Token" in self.headers:
+            log.debug("token refused, logging in again")
+            await response.aclose()
+            self.tokens.clear(self.profile)
+            await self.login(force=True)
+            request.headers["X-Auth-Token"] = self.headers.get("X-Auth-Token", "")
+            response = await self.client.send(request, stream=stream)
+        return response
 
     async def call(self, params=list[dict[str, str]]):
         request = self.client.build_request(
@@ -147,10 +291,9 @@ class Guajillo:
             headers=self.headers,
             cookies=self.cookies,
             json=params,
-            timeout=30,
         )
         log.debug(f"sending {params} to {self.url}")
-        response = await self.client.send(request)
+        response = await self._send(request)
         return response.json()
 
     async def job_lookup(self, jid: str):
@@ -160,104 +303,369 @@ class Guajillo:
             url,
             headers=self.headers,
             cookies=self.cookies,
-            timeout=30,
         )
-        response = await self.client.send(request)
+        response = await self._send(request)
         return response
 
-    async def check_outputer(self, fun: str) -> str:
+    async def stream_lookup(
+        self, job: Job, on_added: Callable[[], Awaitable[None]] | None = None
+    ) -> list[str]:
+        """
+        fold /jobs/<jid> into a minion job one minion at a time as the body
+        arrives, so it is never held whole. on_added is awaited after every
+        minion added, returns the minions it added
+        """
+        url = f"{self.url}/jobs/{job.jid}"
+        request = self.client.build_request(
+            "GET",
+            url,
+            headers=self.headers,
+            cookies=self.cookies,
+            extensions={"guajillo_stream": True},
+        )
+        response = await self._send(request, stream=True)
+        try:
+            response.raise_for_status()
+            return await job.merge_parts(iter_lookup(response.aiter_bytes()), on_added)
+        finally:
+            await response.aclose()
+
+    async def check_outputer(
+        self, fun: str | None, output: str | None = None, minions: int = 0
+    ) -> str:
+        """
+        the outputer for a job, -o wins over the one picked by function. an
+        outputer that does not scale to that many minions is swapped for the
+        one it names, only when it was picked here and not asked for by name
+        """
         defined_outputers = {
             "test.ping": "boolean",
             "state.sls": "highstate",
             "state.highstate": "highstate",
             "state.apply": "highstate",
         }
+        if output is not None:
+            return output
         if self.parser.parsed_args.output is not None:
             return self.parser.parsed_args.output
-        if fun in defined_outputers:
-            return defined_outputers[fun]
-        return "yaml"
+        if fun not in defined_outputers:
+            return "yaml"
+        outputer = defined_outputers[fun]
+        larger = guajillo.outputs.hook(outputer, "LARGER")
+        if larger is not None and minions > larger[0]:
+            log.debug(
+                f"{minions} minions is too many for {outputer}, using {larger[1]}"
+            )
+            return larger[1]
+        return outputer
 
-    async def taskMan(self, async_comms: dict["str", Any]) -> None:
+    async def _push_event(
+        self,
+        event: dict[str, Any],
+        output: str,
+        step: str,
+        render: str | None = None,
+        delta: bool = False,
+    ) -> None:
+        await self.bus.put(job_event(event, output, step, render, delta))
+
+    async def _wait_any(self, *events: asyncio.Event, timeout: float | None = None):
+        waiters = [asyncio.create_task(event.wait()) for event in events]
+        try:
+            await asyncio.wait(
+                waiters, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+            )
+        finally:
+            for waiter in waiters:
+                waiter.cancel()
+
+    def track_job(
+        self, jid: str, job_type: str, fun: str | None, minions: list[str] | None
+    ) -> Job:
+        """
+        register a jid so streamMon can route its returns to it
+        """
+        job = Job(jid, job_type, fun=fun, minions=minions)
+        self.jobs[jid] = job
+        for tag, data in self.early_events.pop(jid, []):
+            job.add_event(tag, data)
+        if not self.calling:
+            self.early_events.clear()
+        return job
+
+    def _lookup_complete(self, job: Job, event: dict[str, Any]) -> bool:
+        if job.job_type == "master":
+            return "Error" not in event["info"][0]
+        return len(event["info"][0]["Minions"]) <= len(event["return"][0])
+
+    def _streams(self, outputer: str) -> bool:
+        """
+        whether the outputs render every minion of a job as it returns, so a
+        return does not have to be kept for the final result once handed on
+        """
+        if not self.streamed:
+            return False
+        if guajillo.outputs.hook(outputer, "render_minion") is None:
+            return False
+        return not guajillo.outputs.hook(outputer, "SUMMARY_NEEDS_RETURNS")
+
+    async def _follow_job(
+        self,
+        job: Job,
+        emit: Emitter,
+        timeout: float,
+        forced: str | None = None,
+    ) -> None:
+        """
+        wait on a job to finish. returns are routed in by streamMon, /jobs/<jid>
+        is only used when the stream is down, has been quiet for a while, or
+        the job is a runner that has told us it finished.
+        """
+        poll = PollScheduler(timeout, **poll_settings(self.config))
+        lookup_due = False
+        render = await self.check_outputer(job.fun, forced, len(job.minions))
+        job.keep_returns = not self._streams(render)
+
+        async def hand_on() -> None:
+            fresh = job.take_fresh()
+            if fresh:
+                await emit(job.as_lookup(fresh), "status", "normal", render, delta=True)
+                job.release(fresh)
+
+        while True:
+            # cleared before anything can yield, so a return that lands while
+            # emitting below still wakes the wait at the bottom
+            job.updated.clear()
+            if job.job_type == "minion" and job.complete:
+                output = await self.check_outputer(job.fun, forced, len(job.minions))
+                await emit(job.as_lookup(), output, "final")
+                return
+            streaming = self.stream_ready.is_set()
+            if poll.expired or job.complete or not streaming or lookup_due:
+                lookup_due = False
+                log.debug(f"looking up jid: {job.jid}")
+                if job.job_type == "minion":
+                    # only the minions we had not seen are kept from the lookup
+                    if await self.stream_lookup(job, hand_on):
+                        poll.reset()
+                    if poll.expired or job.complete:
+                        output = await self.check_outputer(
+                            job.fun, forced, len(job.minions)
+                        )
+                        await emit(job.as_lookup(), output, "final")
+                        return
+                else:
+                    response = await self.job_lookup(job.jid)
+                    event = response.json()
+                    if poll.expired or self._lookup_complete(job, event):
+                        output = await self.check_outputer(
+                            event["info"][0].get("Function", job.fun), forced
+                        )
+                        await emit(event, output, "final")
+                        return
+                    await emit(event, "status", "normal", render)
+            await hand_on()
+            if streaming:
+                delay = min(FALLBACK_INTERVAL, poll.remaining)
+            else:
+                delay = poll.next_delay()
+            try:
+                await asyncio.wait_for(job.updated.wait(), timeout=delay)
+            except TimeoutError:
+                log.debug(f"waiting on jid: {job.jid}")
+                lookup_due = True
+                continue
+            poll.reset()
+
+    async def run_lowstate(
+        self,
+        params: list[dict[str, Any]],
+        emit: Emitter | None = None,
+        timeout: float | None = None,
+        output: str | None = None,
+    ) -> None:
+        """
+        submit a lowstate and emit events for every job in it until their
+        final results. every chunk of the lowstate is its own job, they are
+        all sent in one call and followed side by side. only the last job to
+        finish is emitted as step final, the ones before it as step job.
+        """
+        emit = emit or self._push_event
+        if timeout is None:
+            timeout = self.parser.parsed_args.timeout
+        # returns for fast jobs can beat the call response back, so make
+        # sure the event stream is listening before submitting.
+        await self._wait_any(self.stream_ready, self.stream_closed, timeout=STREAM_WAIT)
+        jobs: list[Job] = []
+        plain: list[dict[str, Any]] = []
+        self.calling += 1
+        try:
+            with self.timings.phase("call"):
+                returned = await self.call(params)
+            chunks = returned.get("return")
+            # anything but a list of chunks, an error string most likely,
+            # is emitted whole below
+            if not isinstance(chunks, list):
+                chunks = []
+            for lowstate, chunk in zip(params, chunks):
+                if not isinstance(chunk, dict):
+                    chunk = {}
+                if "tag" in chunk:
+                    jobs.append(
+                        self.track_job(chunk["jid"], "master", lowstate["fun"], None)
+                    )
+                elif "jid" in chunk:
+                    jobs.append(
+                        self.track_job(
+                            chunk["jid"],
+                            "minion",
+                            lowstate["fun"],
+                            chunk.get("minions"),
+                        )
+                    )
+                else:
+                    plain.append(returned if len(chunks) == 1 else {"return": [chunk]})
+            if not jobs and not plain:
+                plain.append(returned)
+        finally:
+            self.calling -= 1
+        if not self.calling:
+            self.early_events.clear()
+        remaining = len(jobs) + len(plain)
+
+        async def emit_job(
+            event: Any, outputer: str, step: str, *args: Any, **kwargs: Any
+        ) -> None:
+            nonlocal remaining
+            if step == "final":
+                remaining -= 1
+                if remaining:
+                    step = "job"
+            await emit(event, outputer, step, *args, **kwargs)
+
+        for event in plain:
+            await emit_job(event, "json", "final")
+        try:
+            with self.timings.phase("wait"):
+                await asyncio.gather(
+                    *(self._follow_job(job, emit_job, timeout, output) for job in jobs)
+                )
+        finally:
+            for job in jobs:
+                self.jobs.pop(job.jid, None)
+
+    async def taskMan(self, bus: EventBus) -> None:
         """
         async controller for salt-API client.
         """
-        # TODO: This methed is way to big. need to break it into smaller parts
         try:
             log.info("Starting Client Task Manager")
-            self.async_comms = async_comms
-            output = await self.login()
-            if len(self.parser.salt_args) > 0:
+            self.bus = bus
+            with self.timings.phase("login"):
+                output = await self.login()
+            if self.parser.commands:
                 params = self._make_params()
-                output = await self.call(params)
-
-                output_event = {
-                    "meta": {"output": "json", "step": "normal"},
-                    "output": output,
-                }
-                if "tag" in output["return"][0]:
-                    job_type = "master"
-                    jid = output["return"][0]["jid"]
-                elif "jid" in output["return"][0]:
-                    job_type = "minion"
-                    jid = output["return"][0]["jid"]
-                else:
-                    job_type = "error"
-                    output_event = {
-                        "meta": {
-                            "output": "json",
-                            "step": "final",
-                        },
-                        "output": output,
-                    }
-                    self.async_comms["events"].append(output_event)
-                    self.async_comms["update"].set()
+                await self.run_lowstate(params)
             else:
-                output_event = {
-                    "meta": {
-                        "output": "json",
-                        "step": "final",
-                    },
-                    "output": output,
-                }
-                self.async_comms["events"].append(output_event)
-                self.async_comms["update"].set()
-            ttl = self.parser.parsed_args.timeout
-            # TODO: This needs to be split into its own function
-            # TODO: use streamMon as a way to tell if we need to check the job
-            while output_event["meta"]["step"] != "final":
-                step = "normal"
-                output = "status"
-                if ttl == 0:
-                    step = "final"
-                    output = await self.check_outputer(
-                        output_event["output"]["info"][0]["Function"]
-                    )
-                response = await self.job_lookup(jid)
-                log.debug(f"waiting on jid: {jid}")
-                event = response.json()
-                if job_type == "master" and "Error" not in event["info"][0]:
-                    step = "final"
-                    output = await self.check_outputer(event["info"][0]["Function"])
-                elif job_type == "minion" and len(event["info"][0]["Minions"]) <= len(
-                    event["return"][0]
-                ):
-                    step = "final"
-                    output = await self.check_outputer(event["info"][0]["Function"])
-
-                output_event = {
-                    "meta": {"output": output, "step": step},
-                    "output": event,
-                }
-                self.async_comms["events"].append(output_event)
-                self.async_comms["update"].set()
-                ttl -= 1
-                await asyncio.sleep(0.5)
-
-            await self.client.aclose()
+                await self._push_event(output, "json", "final")
+
+            await self.close()
         except Exception:
             self.console.print_exception(show_locals=self.config["debug"])
             raise TerminateTaskGroup()
+        finally:
+            self.done.set()
+
+    async def jidMan(
+        self, bus: EventBus, jid: str, results: ResultCache | None = None
+    ) -> None:
+        """
+        render a finished job again, from the local result cache when it has
+        it and from /jobs/<jid> on the master when it does not
+        """
+        try:
+            self.bus = bus
+            cached = await results.load(jid) if results is not None else None
+            if cached is not None:
+                log.info(f"rendering jid {jid} from the result cache")
+                output = self.parser.parsed_args.output or cached["output"]
+                await self._push_event(cached["event"], output, "final")
+                return
+            log.info(f"jid {jid} is not cached, looking it up")
+            with self.timings.phase("login"):
+                await self.login()
+            response = await self.job_lookup(jid)
+            event = response.json()
+            info = event.get("info", [{}])[0]
+            if "Error" in info or "Function" not in info:
+                await self._push_event(event, "json", "final")
+                return
+            output = await self.check_outputer(
+                info["Function"], minions=len(info.get("Minions", []))
+            )
+            await self._push_event(event, output, "final")
+        except Exception:
+            self.console.print_exception(show_locals=self.config["debug"])
+            raise TerminateTaskGroup()
+        finally:
+            self.done.set()
+            await self.close()
+
+    def _route_event(self, raw: str) -> None:
+        """
+        hand a return event off the event bus to the job waiting on it
+        """
+        # every return tag has /ret in it, skip decoding everything else
+        if "/ret" not in raw:
+            return
+        try:
+            event = json.loads(raw)
+        except ValueError:
+            return
+        tag = event.get("tag", "")
+        parsed = parse_tag(tag)
+        if parsed is None:
+            return
+        jid = parsed[1]
+        if jid in self.jobs:
+            self.jobs[jid].add_event(tag, event.get("data", {}))
+        elif self.calling:
+            self.early_events.setdefault(jid, []).append((tag, event.get("data", {})))
+
+    async def _consume_events(self) -> None:
+        url = f"{self.url}/events"
+        self.stream_refused = None
+        try:
+            if not self.stream_client.is_closed:
+                async with aconnect_sse(self.stream_client, "GET", url) as event_source:
+                    self.stream_ready.set()
+                    async for sse in event_source.aiter_sse():
+                        log.debug(sse)
+                        self.on_event(sse.data)
+        # SSEError is a TransportError, catch it first
+        except SSEError as se:
+            log.debug(f"event stream refused: {se}")
+            self.stream_refused = self.stream_client.headers.get("X-Auth-Token", "")
+        except TransportError as te:
+            log.debug(te)
+        except RuntimeError as re:
+            log.debug(re)
+        finally:
+            self.stream_ready.clear()
+            self.stream_closed.set()
+
+    async def _stream_login(self) -> bool:
+        """
+        log in again when the event stream refused the token, cached or one
+        that expired while a persistent stream ran, True if that got a new one
+        """
+        refused = self.stream_refused
+        if refused is None or self.done.is_set():
+            return False
+        log.debug("token refused by the event stream, logging in again")
+        self.tokens.clear(self.profile)
+        await self.login(force=True)
+        return self.headers.get("X-Auth-Token", "") != refused
 
     async def streamMon(self) -> None:
         """
@@ -265,27 +673,32 @@ class Guajillo:
         """
         try:
             log.info("Starting Client Stream Monitor")
-            await asyncio.sleep(0.5)
-            while self.authed is False:
-                await asyncio.sleep(0.5)
-                log.debug("waiting for token")
-                continue
-            url = f"{self.url}/events"
+            await self._wait_any(self.auth_ready, self.done)
+            if self.done.is_set():
+                return
+            stream = asyncio.create_task(self._consume_events())
+            await self._wait_any(self.done, self.stream_closed)
+            if await self._stream_login():
+                # try once more rather than polling the whole job
+                self.stream_closed.clear()
+                stream = asyncio.create_task(self._consume_events())
+                await self._wait_any(self.done, self.stream_closed)
+            while self.persistent and not self.done.is_set():
+                log.debug("event stream closed, reconnecting")
+                await asyncio.sleep(RECONNECT_WAIT)
+                await self._stream_login()
+                self.stream_closed.clear()
+                stream = asyncio.create_task(self._consume_events())
+                await self._wait_any(self.done, self.stream_closed)
+            stream.cancel()
             try:
-                if not self.client.is_closed:
-                    async with aconnect_sse(
-                        self.client, "GET", url, timeout=1024
-                    ) as event_source:
-                        async for sse in event_source.aiter_sse():
-                            log.debug(sse)
-            except ReadError as re:
-                log.debug(re)
-            except RuntimeError as re:
-                log.debug(re)
-
+                await stream
+            except asyncio.CancelledError:
+                pass
         except Exception:
             self.console.print_exception(show_locals=self.config["debug"])
             raise TerminateTaskGroup()
 
     async def close(self):
         await self.client.aclose()
+        await self.stream_client.aclose()
@@ -0,0 +1,26 @@
+import json
+from typing import Any
+
+try:
+    import orjson
+
+    HAVE_ORJSON = True
+except ImportError:  # pragma: no cover - depends on what is installed
+    HAVE_ORJSON = False
+
+
+def dumps(obj: Any, indent: bool = False) -> bytes:
+    """
+    encode obj as utf-8 json, with orjson when it is installed
+    """
+    if HAVE_ORJSON:
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=str, option=option)
+    if indent:
+        return json.dumps(obj, default=str, indent=2, ensure_ascii=False).encode()
+    # the same bytes orjson would write
+    return json.dumps(
+        obj, default=str, separators=(",", ":"), ensure_ascii=False
+    ).encode()
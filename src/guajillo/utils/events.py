@@ -0,0 +1,225 @@
+import argparse
+import asyncio
+import fnmatch
+import json
+import logging
+import re
+import time
+from collections import Counter, deque
+from typing import Any, Pattern
+
+from rich.console import Console
+from rich.live import Live
+from rich.table import Table
+
+from guajillo.exceptions import GuajilloException, TerminateTaskGroup
+from guajillo.utils.conn import Guajillo
+
+log = logging.getLogger(__name__)
+
+# salt-api sends {"tag": "...", "data": {...}}, with the tag first
+TAG_START = '{"tag": "'
+# flush stdout after this many lines or this many seconds, whichever is first
+FLUSH_LINES = 512
+FLUSH_INTERVAL = 0.1
+# events per second are averaged over this many seconds
+RATE_WINDOW = 5
+
+
+def parse_args(args: list[str]) -> argparse.Namespace:
+    """
+    options that only mean something to guajillo events
+    """
+    parser = argparse.ArgumentParser(prog="guajillo events", add_help=False)
+    parser.add_argument("--tag", action="append", default=[])
+    parser.add_argument("--regex", action="append", default=[])
+    parser.add_argument("--minion", action="append", default=[])
+    parser.add_argument("--format", choices=["ndjson", "summary"], default="ndjson")
+    parsed, unknown = parser.parse_known_args(args)
+    if unknown:
+        raise GuajilloException(f"Unknown events options {' '.join(unknown)}")
+    return parsed
+
+
+def compile_filter(globs: list[str], regexes: list[str]) -> Pattern[str] | None:
+    """
+    every glob and regex as one compiled pattern, None to match everything
+    """
+    patterns = [fnmatch.translate(glob) for glob in globs]
+    patterns += [f"(?:{regex})" for regex in regexes]
+    if not patterns:
+        return None
+    try:
+        return re.compile("|".join(patterns))
+    except re.error as err:
+        raise GuajilloException(f"Invalid tag filter: {err}")
+
+
+def tag_of(raw: str) -> str | None:
+    """
+    pull the tag out of a raw event without decoding the json
+    """
+    if raw.startswith(TAG_START):
+        end = raw.find('"', len(TAG_START))
+        if end != -1 and "\\" not in raw[len(TAG_START) : end]:
+            return raw[len(TAG_START) : end]
+    try:
+        return json.loads(raw).get("tag")
+    except (ValueError, AttributeError):
+        return None
+
+
+def prefix(tag: str) -> str:
+    """
+    group tags for the counters, salt/job/<jid>/ret/<minion> -> salt/job/*/ret
+    """
+    parts = tag.split("/")
+    if len(parts) > 2 and parts[0] == "salt" and parts[1] in ["job", "run", "minion"]:
+        parts[2] = "*"
+    return "/".join(parts[:4])
+
+
+class EventTail:
+    """
+    tails the master event bus through /events.
+
+    the tag is sliced off the raw event and matched against the filters
+    before anything is decoded, ndjson output passes the raw event through
+    untouched and writes are batched, so this keeps up with a busy master.
+    """
+
+    def __init__(
+        self,
+        client: Guajillo,
+        console: Console,
+        args: list[str],
+        jid: str | None = None,
+        stderr: Console | None = None,
+    ) -> None:
+        options = parse_args(args)
+        self.client = client
+        self.console = console
+        self.stderr = stderr
+        self.format = options.format
+        self.pattern = compile_filter(options.tag, options.regex)
+        self.jid = jid
+        self.minions = set(options.minion)
+        self.buffer: list[str] = []
+        self.totals: Counter[str] = Counter()
+        self.seconds: deque[tuple[int, Counter[str]]] = deque(maxlen=RATE_WINDOW)
+        self.seen = 0
+
+    def _minion_matches(self, raw: str, tag: str) -> bool:
+        # cheap substring test first, only decode what might be a match
+        if not any(minion in raw for minion in self.minions):
+            return False
+        if tag.split("/")[-1] in self.minions:
+            return True
+        try:
+            data = json.loads(raw).get("data", {})
+        except ValueError:
+            return False
+        return data.get("id") in self.minions
+
+    def matches(self, raw: str) -> str | None:
+        """
+        the event's tag if it passes every filter, otherwise None
+        """
+        tag = tag_of(raw)
+        if tag is None:
+            return None
+        if self.pattern is not None and not self.pattern.match(tag):
+            return None
+        if self.jid is not None and self.jid not in tag:
+            return None
+        if self.minions and not self._minion_matches(raw, tag):
+            return None
+        return tag
+
+    def _count(self, tag: str) -> None:
+        now = int(time.monotonic())
+        if not self.seconds or self.seconds[-1][0] != now:
+            self.seconds.append((now, Counter()))
+        group = prefix(tag)
+        self.seconds[-1][1][group] += 1
+        self.totals[group] += 1
+
+    def handle(self, raw: str) -> None:
+        self.seen += 1
+        tag = self.matches(raw)
+        if tag is None:
+            return
+        self._count(tag)
+        if self.format == "ndjson":
+            self.buffer.append(raw)
+            if len(self.buffer) >= FLUSH_LINES:
+                self.flush()
+
+    def flush(self) -> None:
+        if not self.buffer:
+            return
+        lines, self.buffer = self.buffer, []
+        self.console.file.write("\n".join(lines) + "\n")
+        self.console.file.flush()
+
+    def rates(self) -> dict[str, float]:
+        if not self.seconds:
+            return {}
+        span = max(int(time.monotonic()) - self.seconds[0][0] + 1, 1)
+        window: Counter[str] = Counter()
+        for _, counts in self.seconds:
+            window.update(counts)
+        return {group: count / span for group, count in window.items()}
+
+    def table(self) -> Table:
+        table = Table(title=f"Events, {self.seen} seen")
+        table.add_column("Tag")
+        table.add_column("Total", justify="right")
+        table.add_column("Per second", justify="right")
+        rates = self.rates()
+        for group, total in self.totals.most_common():
+            table.add_row(group, str(total), f"{rates.get(group, 0.0):.1f}")
+        return table
+
+    async def _ticker(self, live: Live | None) -> None:
+        while True:
+            await asyncio.sleep(FLUSH_INTERVAL)
+            self.flush()
+            if live is not None:
+                live.update(self.table(), refresh=True)
+
+    async def taskMan(self, bus: Any = None) -> None:
+        """
+        log in, then print events until interrupted
+        """
+        client = self.client
+        try:
+            log.info("Starting event tail")
+            client.persistent = True
+            client.on_event = self.handle
+            await client.login()
+            if self.format == "summary":
+                with Live(
+                    self.table(), console=self.console, auto_refresh=False
+                ) as live:
+                    await self._ticker(live)
+            else:
+                await self._ticker(None)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self.console.print_exception(show_locals=client.config["debug"])
+            raise TerminateTaskGroup()
+        finally:
+            self.flush()
+            # the summary already had the counters on screen
+            if self.format == "ndjson" and self.stderr is not None and self.totals:
+                self.stderr.print(self.table())
+            client.persistent = False
+            client.done.set()
+
+    async def streamMon(self) -> None:
+        await self.client.streamMon()
+
+    async def close(self) -> None:
+        await self.client.close()
@@ -0,0 +1,189 @@
+import asyncio
+import logging
+from typing import Any
+
+from rich.console import Console
+
+from guajillo.exceptions import GuajilloException, TerminateTaskGroup
+from guajillo.outputs import SEPARATOR
+from guajillo.utils.bus import EventBus, job_event
+from guajillo.utils.cli import CliParse
+from guajillo.utils.conn import Guajillo
+from guajillo.utils.timings import Timings
+
+log = logging.getLogger(__name__)
+
+
+def profile_url(config: dict[str, Any], profile: str) -> str:
+    if profile not in config:
+        raise GuajilloException(f"Unknown profile {profile}")
+    return config[profile].get("url", config.get("netapi", {}).get("url"))
+
+
+def expand_profiles(config: dict[str, Any], profiles: str) -> list[str]:
+    """
+    turn -p eu,us or a [groups] entry from config into a list of profiles
+    """
+    groups = config.get("groups", {})
+    expanded: list[str] = []
+    for name in profiles.split(","):
+        name = name.strip()
+        for profile in groups.get(name, [name]):
+            if profile not in expanded:
+                expanded.append(profile)
+    return expanded
+
+
+def prefix(profile: str, items: dict[str, Any]) -> dict[str, Any]:
+    return {f"{profile}{SEPARATOR}{key}": value for key, value in items.items()}
+
+
+class FanOut:
+    """
+    runs the same lowstate against several salt-api profiles at once and
+    merges their returns into one result keyed by profile and minion.
+    """
+
+    def __init__(
+        self,
+        profiles: list[str],
+        parser: CliParse,
+        config: dict[str, Any],
+        console: Console,
+        timings: Timings | None = None,
+    ) -> None:
+        self.parser = parser
+        self.config = config
+        self.console = console
+        self.clients = {
+            profile: Guajillo(
+                profile_url(config, profile),
+                parser,
+                config,
+                console=console,
+                profile=profile,
+                timings=timings,
+            )
+            for profile in profiles
+        }
+        self.jids: dict[str, str] = {}
+        self.minions: dict[str, list[str]] = {}
+        self.returned: dict[str, int] = {}
+        self.finals: dict[str, tuple[dict[str, Any], str]] = {}
+
+    def _info(self) -> dict[str, Any]:
+        return {
+            "jid": ",".join(f"{p}{SEPARATOR}{jid}" for p, jid in self.jids.items()),
+            "Minions": [
+                f"{profile}{SEPARATOR}{minion}"
+                for profile, minions in self.minions.items()
+                for minion in minions
+            ],
+            "Returned": sum(self.returned.values()),
+        }
+
+    def _track(self, profile: str, event: dict[str, Any]) -> None:
+        if not isinstance(event, dict) or "info" not in event:
+            return
+        info = event["info"][0]
+        if "jid" in info:
+            self.jids[profile] = info["jid"]
+        if "Minions" in info:
+            self.minions[profile] = info["Minions"]
+        if "Returned" in info:
+            self.returned[profile] = info["Returned"]
+
+    def _emitter(self, profile: str):
+        async def emit(
+            event: dict[str, Any],
+            output: str,
+            step: str,
+            render: str | None = None,
+            delta: bool = False,
+        ) -> None:
+            self._track(profile, event)
+            if step == "final":
+                self.finals[profile] = (event, output)
+                return
+            if not delta:
+                return
+            info = self._info()
+            info["Function"] = event["info"][0].get("Function")
+            info["Result"] = prefix(profile, event["info"][0]["Result"])
+            merged = {"info": [info], "return": [prefix(profile, event["return"][0])]}
+            await self.bus.put(job_event(merged, output, step, render, delta))
+
+        return emit
+
+    def _merge_finals(
+        self,
+    ) -> tuple[dict[str, Any], str, dict[str, Any]]:
+        outputs = set()
+        result: dict[str, Any] = {}
+        returns: dict[str, Any] = {}
+        failed: dict[str, Any] = {}
+        function = None
+        for profile, (event, outputer) in self.finals.items():
+            if not isinstance(event, dict) or "info" not in event:
+                # a failed call or a login, nothing per minion to merge
+                failed[profile] = event
+                continue
+            outputs.add(outputer)
+            info = event["info"][0]
+            function = function or info.get("Function")
+            result.update(prefix(profile, info.get("Result", {})))
+            returns.update(prefix(profile, event["return"][0]))
+            if "Minions" in info:
+                self.minions[profile] = info["Minions"]
+        if not outputs:
+            return {"return": [failed]}, "json", {}
+        info = self._info()
+        info.update({"Function": function, "Result": result})
+        # profiles only disagree when one of them switched to a compact outputer
+        output = outputs.pop() if len(outputs) == 1 else "json"
+        return {"info": [info], "return": [returns]}, output, failed
+
+    async def _run(self, profile: str, params: list[dict[str, Any]] | None) -> None:
+        client = self.clients[profile]
+        try:
+            with client.timings.phase("login"):
+                output = await client.login()
+            if params is None:
+                self.finals[profile] = (output, "json")
+            else:
+                await client.run_lowstate(params, self._emitter(profile))
+        except Exception as err:
+            log.error(f"profile {profile} failed: {err}")
+            self.finals[profile] = ({"error": str(err)}, "json")
+        finally:
+            client.done.set()
+            await client.close()
+
+    async def taskMan(self, bus: EventBus) -> None:
+        """
+        fan the lowstate out to every profile and publish the merged result
+        """
+        try:
+            log.info(f"Fanning out to {', '.join(self.clients)}")
+            self.bus = bus
+            params = None
+            if self.parser.commands:
+                params = next(iter(self.clients.values()))._make_params()
+            await asyncio.gather(
+                *(self._run(profile, params) for profile in self.clients)
+            )
+            merged, output, failed = self._merge_finals()
+            for profile, error in failed.items():
+                # on its own, so the profiles that ran keep their outputer
+                await bus.put(job_event({"return": [{profile: error}]}, "json", "job"))
+            await bus.put(job_event(merged, output, "final"))
+        except Exception:
+            self.console.print_exception(show_locals=self.config["debug"])
+            raise TerminateTaskGroup()
+
+    async def streamMon(self) -> None:
+        await asyncio.gather(*(client.streamMon() for client in self.clients.values()))
+
+    async def close(self) -> None:
+        for client in self.clients.values():
+            await client.close()
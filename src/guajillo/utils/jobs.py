@@ -0,0 +1,184 @@
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Awaitable, Callable
+
+from guajillo.utils.lookup import Part
+
+log = logging.getLogger(__name__)
+
+
+def parse_tag(tag: str) -> tuple[str, str, str | None] | None:
+    """
+    split a salt return tag into (job_type, jid, minion)
+
+    salt/job/<jid>/ret/<minion> -> ("minion", jid, minion)
+    salt/run/<jid>/ret          -> ("master", jid, None)
+    anything else returns None
+    """
+    parts = tag.split("/")
+    if len(parts) < 4 or parts[0] != "salt" or parts[3] != "ret":
+        return None
+    if parts[1] == "job" and len(parts) >= 5:
+        return "minion", parts[2], "/".join(parts[4:])
+    if parts[1] == "run" and len(parts) == 4:
+        return "master", parts[2], None
+    return None
+
+
+class Job:
+    """
+    tracks the returns of a single jid, merged into one result per minion.
+
+    returns come off the event bus or out of /jobs/<jid> lookups, either way
+    only one copy of each minion's return is kept and the minions seen since
+    the last take_fresh() are handed on as a delta. with keep_returns off a
+    return is let go once it was handed on, see release().
+    """
+
+    def __init__(
+        self,
+        jid: str,
+        job_type: str,
+        fun: str | None = None,
+        minions: list[str] | None = None,
+    ) -> None:
+        self.jid = jid
+        self.job_type = job_type
+        self.fun = fun
+        self.minions: list[str] = []
+        self.expected: set[str] = set()
+        self.results: dict[str, dict[str, Any]] = {}
+        self.fresh: list[str] = []
+        self.master_return: dict[str, Any] | None = None
+        self.keep_returns = True
+        self.updated = asyncio.Event()
+        for minion in minions or []:
+            self._expect(minion)
+
+    def _expect(self, minion: str) -> None:
+        if minion not in self.expected:
+            self.expected.add(minion)
+            self.minions.append(minion)
+
+    def _add_result(self, minion: str, result: dict[str, Any]) -> bool:
+        if minion in self.results:
+            return False
+        self._expect(minion)
+        self.results[minion] = result
+        self.fresh.append(minion)
+        return True
+
+    @property
+    def complete(self) -> bool:
+        if self.job_type == "master":
+            return self.master_return is not None
+        # every result is also an expected minion
+        return len(self.results) >= len(self.minions)
+
+    def add_event(self, tag: str, data: dict[str, Any]) -> bool:
+        """
+        add a return event to the job, returns True if it was new
+        """
+        parsed = parse_tag(tag)
+        if parsed is None or parsed[1] != self.jid:
+            return False
+        job_type, _, minion = parsed
+        if job_type == "master":
+            self.master_return = data
+        elif minion is None or not self._add_result(
+            minion,
+            {
+                "return": data.get("return"),
+                "retcode": data.get("retcode", 0),
+                "success": data.get("success", True),
+            },
+        ):
+            return False
+        if self.fun is None:
+            self.fun = data.get("fun")
+        self.updated.set()
+        return True
+
+    def merge_lookup(self, event: dict[str, Any]) -> list[str]:
+        """
+        fold a /jobs/<jid> response in, covering anything the stream missed.
+        returns the minions it added, the response itself is not kept.
+        """
+        info = event["info"][0]
+        if self.fun is None:
+            self.fun = info.get("Function")
+        for minion in info.get("Minions", []):
+            self._expect(minion)
+        if self.job_type != "minion":
+            return []
+        added = []
+        for minion, result in info.get("Result", {}).items():
+            if self._add_result(minion, result):
+                added.append(minion)
+        return added
+
+    async def merge_parts(
+        self,
+        parts: AsyncIterator[Part],
+        on_added: Callable[[], Awaitable[None]] | None = None,
+    ) -> list[str]:
+        """
+        merge_lookup for a /jobs/<jid> body parsed as it arrives, see
+        lookup.iter_lookup. each minion is folded in as soon as it is read
+        and on_added is awaited, so it can be handed on before the next one.
+        """
+        added = []
+        async for section, key, value in parts:
+            if section == "info" and key == "Function" and self.fun is None:
+                self.fun = value
+            elif section == "info" and key == "Minions":
+                for minion in value:
+                    self._expect(minion)
+            elif section == "result" and self.job_type == "minion" and key is not None:
+                if self._add_result(key, value):
+                    added.append(key)
+                    if on_added is not None:
+                        await on_added()
+        return added
+
+    def take_fresh(self) -> list[str]:
+        """
+        minions that returned since the last call
+        """
+        fresh, self.fresh = self.fresh, []
+        return fresh
+
+    def release(self, minions: list[str]) -> None:
+        """
+        let go of returns that were handed on, only what the final result
+        needs to count the minion is kept. does nothing with keep_returns on.
+        """
+        if self.keep_returns:
+            return
+        for minion in minions:
+            result = self.results[minion]
+            # a new dict, the delta that was handed on still holds the old one
+            self.results[minion] = {k: v for k, v in result.items() if k != "return"}
+
+    def as_lookup(self, only: list[str] | None = None) -> dict[str, Any]:
+        """
+        build a result in the same shape as /jobs/<jid> so outputers
+        do not care where the returns came from. with only, Result and return
+        are limited to those minions, Returned still counts all of them. a
+        released minion has no return left.
+        """
+        minions = self.results if only is None else only
+        return {
+            "info": [
+                {
+                    "jid": self.jid,
+                    "Function": self.fun,
+                    "Minions": list(self.minions) if only is None else self.minions,
+                    "Returned": len(self.results),
+                    "Result": {minion: self.results[minion] for minion in minions},
+                }
+            ],
+            "return": [
+                {minion: self.results[minion].get("return") for minion in minions}
+            ],
+        }
@@ -0,0 +1,153 @@
+import codecs
+import json
+import logging
+import re
+from typing import Any, AsyncIterator
+
+log = logging.getLogger(__name__)
+
+NON_WHITESPACE = re.compile(r"[^ \t\n\r]")
+# what can follow a complete number, anything else means it was cut off
+AFTER_NUMBER = frozenset(",]} \t\n\r")
+
+# (section, key, value), see iter_lookup
+Part = tuple[str, str | None, Any]
+
+
+class _Reader:
+    """
+    json text off an async iterator of byte chunks, parsed a value at a time.
+
+    only what has not been parsed yet is kept. a value that is cut off by
+    the end of the buffer is tried again once the buffer has doubled, so a
+    large value is parsed a handful of times rather than once per chunk.
+    """
+
+    def __init__(self, chunks: AsyncIterator[bytes]) -> None:
+        self.chunks = chunks
+        self.decoder = codecs.getincrementaldecoder("utf-8")()
+        self.scan = json.JSONDecoder().raw_decode
+        self.text = ""
+        self.pos = 0
+        self.done = False
+
+    async def _fill(self, want: int) -> None:
+        """
+        read until at least want characters are waiting, or the body ends
+        """
+        pending = [self.text[self.pos :]]
+        size = len(pending[0])
+        while size < want and not self.done:
+            try:
+                chunk = await anext(self.chunks)
+            except StopAsyncIteration:
+                self.done = True
+                chunk = b""
+            text = self.decoder.decode(chunk, final=self.done)
+            pending.append(text)
+            size += len(text)
+        self.text = "".join(pending)
+        self.pos = 0
+
+    async def peek(self) -> str:
+        while True:
+            found = NON_WHITESPACE.search(self.text, self.pos)
+            self.pos = found.start() if found is not None else len(self.text)
+            if self.pos < len(self.text):
+                return self.text[self.pos]
+            if self.done:
+                raise ValueError("unexpected end of json")
+            await self._fill(1)
+
+    async def expect(self, char: str) -> None:
+        found = await self.peek()
+        if found != char:
+            raise ValueError(f"expected {char!r} at {self.pos}, found {found!r}")
+        self.pos += 1
+
+    async def value(self) -> Any:
+        await self.peek()
+        while True:
+            try:
+                value, end = self.scan(self.text, self.pos)
+                # a number cut off by the end of the buffer still parses
+                if (
+                    self.done
+                    or self.text[end - 1] in '"]}'
+                    or (end < len(self.text) and self.text[end] in AFTER_NUMBER)
+                ):
+                    self.pos = end
+                    return value
+            except ValueError:
+                if self.done:
+                    raise
+            waiting = len(self.text) - self.pos
+            await self._fill(max(waiting * 2, waiting + 1))
+
+    async def members(self) -> AsyncIterator[str]:
+        """
+        the keys of an object, the caller reads each value before the next
+        """
+        await self.expect("{")
+        if await self.peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            key = await self.value()
+            await self.expect(":")
+            yield key
+            if await self.peek() == "}":
+                self.pos += 1
+                return
+            await self.expect(",")
+
+    async def items(self) -> AsyncIterator[int]:
+        """
+        the positions of an array, the caller reads each value before the next
+        """
+        await self.expect("[")
+        if await self.peek() == "]":
+            self.pos += 1
+            return
+        index = 0
+        while True:
+            yield index
+            index += 1
+            if await self.peek() == "]":
+                self.pos += 1
+                return
+            await self.expect(",")
+
+
+async def iter_lookup(chunks: AsyncIterator[bytes]) -> AsyncIterator[Part]:
+    """
+    walk a /jobs/<jid> body as it arrives, one minion at a time.
+
+    yields ("info", key, value) for every key of info[0] but Result,
+    ("result", minion, result) for every minion under info[0].Result and
+    ("return", minion, returned) for every minion under return[0]. a
+    return[0] that is not keyed by minion comes whole as ("return", None, ...)
+    and anything else in the body is skipped.
+    """
+    reader = _Reader(chunks)
+    async for section in reader.members():
+        if section not in ["info", "return"] or await reader.peek() != "[":
+            await reader.value()
+            continue
+        async for index in reader.items():
+            if index or await reader.peek() != "{":
+                if section == "return" and not index:
+                    yield "return", None, await reader.value()
+                else:
+                    await reader.value()
+                continue
+            if section == "return":
+                async for minion in reader.members():
+                    yield "return", minion, await reader.value()
+                continue
+            async for key in reader.members():
+                if key == "Result" and await reader.peek() == "{":
+                    async for minion in reader.members():
+                        yield "result", minion, await reader.value()
+                else:
+                    yield "info", key, await reader.value()
@@ -1,5 +1,5 @@
-import asyncio
 import logging
+from types import GeneratorType
 from typing import Any
 
 from rich.console import Console
@@ -7,21 +7,43 @@ from rich.status import Status
 
 import guajillo.outputs
 from guajillo.exceptions import TerminateTaskGroup
+from guajillo.utils.bus import EventBus
+from guajillo.utils.render import Renderer
+from guajillo.utils.results import ResultCache
+from guajillo.utils.timings import Timings
+from guajillo.utils.writer import NDJSONWriter
 
 log = logging.getLogger(__name__)
 
 
 class Outputs:
-    def __init__(self, console: Console, parser=None, config=None) -> None:
+    def __init__(
+        self,
+        console: Console,
+        parser=None,
+        config=None,
+        timings: Timings | None = None,
+        results: ResultCache | None = None,
+    ) -> None:
         self.config = config
+        self.results = results
+        self.timings = timings if timings is not None else Timings(enabled=False)
         self.parser = parser
         self.console = console
+        self.stream = parser is not None and parser.parsed_args.stream
+        # (jid, minion), a run can hold several jobs for the same minions
+        self.rendered: set[tuple[str, str]] = set()
+        self.writer = None
+        if parser is not None and parser.parsed_args.output_file is not None:
+            self.writer = NDJSONWriter(parser.parsed_args.output_file)
+        self.renderer = Renderer()
         self.cstatus = Status("Waiting ...", console=self.console)
         self.cstatus.start()
 
     async def status(self, event: dict[str, Any]) -> None:
         if "Minions" in event["info"][0]:
-            queued = f"{len(list(event['return'][0].keys()))}/{len(event["info"][0]["Minions"])}"
+            returned = event["info"][0].get("Returned", len(event["return"][0]))
+            queued = f"{returned}/{len(event['info'][0]['Minions'])}"
             msg = f"{queued} returned from jid: {event['info'][0]['jid']}"
         if "Error" in event["info"][0]:
             msg = f"waiting on master for jid: {event['info'][0]['jid']}"
@@ -30,33 +52,123 @@ class Outputs:
     async def string(self, output: str) -> None:
         self.console.print(output)
 
-    async def taskMan(self, async_comms: dict[str, Any]) -> None:
+    def emit(self, output: Any) -> None:
+        """
+        print a rendered result, outputers hand back bytes, or a generator of
+        them, when they already have exactly what should land on stdout
+        """
+        if isinstance(output, GeneratorType):
+            for chunk in output:
+                self.console.file.write(chunk.decode())
+            self.console.file.flush()
+            return
+        if isinstance(output, bytes):
+            if output:
+                self.console.file.write(output.decode())
+                self.console.file.flush()
+            return
+        self.console.print(output)
+
+    async def stream_returns(self, event: dict[str, Any], outputer: str) -> bool:
+        """
+        render each minion once, the first time its return shows up. returns
+        False if the outputer can not render a single minion.
+        """
+        return await self.renderer.run(self._stream_returns, event, outputer)
+
+    def _stream_returns(self, event: dict[str, Any], outputer: str) -> bool:
+        render_minion = guajillo.outputs.hook(outputer, "render_minion")
+        if render_minion is None:
+            return False
+        returns = event["return"][0]
+        if not isinstance(returns, dict):
+            return False
+        jid = event.get("info", [{}])[0].get("jid", "")
+        fresh = {
+            minion: returned
+            for minion, returned in returns.items()
+            if (jid, minion) not in self.rendered
+        }
+        self.rendered.update((jid, minion) for minion in fresh)
+        if self.renderer.parallel(len(fresh)):
+            with self.timings.render(outputer):
+                for chunk in self.renderer.render_minions(
+                    outputer, fresh, self.console
+                ):
+                    self.emit(chunk)
+            return True
+        for minion, returned in fresh.items():
+            with self.timings.render(outputer):
+                complete = self.renderer.complete
+                self.emit(complete(render_minion(minion, returned, self.console)))
+        return True
+
+    async def final(self, event: dict[str, Any], outputer: str) -> None:
+        await self.renderer.run(self._final, event, outputer)
+
+    def _final(self, event: dict[str, Any], outputer: str) -> None:
+        complete = self.renderer.complete
+        if self.stream and self._stream_returns(event, outputer):
+            summary = guajillo.outputs.hook(outputer, "summary")
+            if summary is not None:
+                with self.timings.render(outputer):
+                    self.emit(complete(summary(event, self.console)))
+            return
+        with self.timings.render(outputer):
+            render = guajillo.outputs.load(outputer)
+            self.emit(complete(render(event, self.console)))
+
+    async def remember(self, event: dict[str, Any], outputer: str) -> None:
+        """
+        keep a finished job's result around for --jid
+        """
+        if self.results is None or not isinstance(event, dict) or "info" not in event:
+            return
+        info = event["info"][0]
+        if any(
+            isinstance(result, dict) and "return" not in result
+            for result in info.get("Result", {}).values()
+        ):
+            # --stream let go of returns as they were shown, see Job.release
+            log.debug(f"not caching jid {info.get('jid')}, its returns were streamed")
+            return
+        jid = info.get("jid")
+        if jid:
+            await self.results.save(jid, event, outputer)
+
+    async def taskMan(self, bus: EventBus) -> None:
         try:
             log.info("Starting output Task Manager")
-            self.async_comms = async_comms
-            event = self.async_comms["events"].pop()
-            while event["meta"]["step"] != "final":
+            step = "startup"
+            while step != "final":
                 log.debug("awaiting Event update")
+                event = await bus.get()
                 log.debug("received event update")
-                if len(self.async_comms["events"]) > 0:
-                    event = self.async_comms["events"].pop()
-                    if event["meta"]["step"] == "final":
-                        self.cstatus.stop()
-                    log.debug(f"calling outputer {event["meta"]["output"]}")
-                    if (
-                        not event["output"]["return"][0]
-                        and "info" not in event["output"]
-                    ):
-                        await self.string("No known minions matched target")
-                    if event["meta"]["output"] == "status":
-                        await self.status(event["output"])
-                    else:
-                        output = await getattr(
-                            guajillo.outputs, event["meta"]["output"]
-                        )(event["output"], self.console)
-                        self.console.print(output)
-                await asyncio.sleep(0.5)
-            self.async_comms["one"] = True
+                step = event["meta"]["step"]
+                if self.writer is not None:
+                    await self.writer.write_event(event)
+                # job is the final result of one of several jobs in the run
+                if step in ["final", "job"]:
+                    self.cstatus.stop()
+                log.debug(f"calling outputer {event['meta']['output']}")
+                if not event["output"]["return"][0] and "info" not in event["output"]:
+                    await self.string("No known minions matched target")
+                if event["meta"]["output"] == "status":
+                    await self.status(event["output"])
+                    if self.stream and "render" in event["meta"]:
+                        await self.stream_returns(
+                            event["output"], event["meta"]["render"]
+                        )
+                else:
+                    await self.final(event["output"], event["meta"]["output"])
+                    if step in ["final", "job"]:
+                        await self.remember(event["output"], event["meta"]["output"])
+                if step == "job":
+                    self.cstatus.start()
         except Exception:
             self.console.print_exception(show_locals=self.config["debug"])
             raise TerminateTaskGroup()
+        finally:
+            await self.renderer.close()
+            if self.writer is not None:
+                await self.writer.close()
@@ -0,0 +1,65 @@
+import logging
+import random
+import time
+from typing import Any, Callable
+
+log = logging.getLogger(__name__)
+
+# what a [poll] table in config.toml may set
+SETTINGS = ("initial", "maximum", "factor", "jitter")
+
+
+def poll_settings(config: dict[str, Any]) -> dict[str, Any]:
+    """
+    the known [poll] settings from config, anything else is logged and left out
+    """
+    poll = config.get("poll", {})
+    for key in poll:
+        if key not in SETTINGS:
+            log.warning(f"ignoring unknown [poll] setting {key}")
+    return {key: poll[key] for key in SETTINGS if key in poll}
+
+
+class PollScheduler:
+    """
+    decides how long to wait between /jobs lookups.
+
+    starts fast so short jobs finish quickly, backs off exponentially with
+    jitter for long ones, goes back to fast when new returns show up, and
+    never waits past a real monotonic deadline.
+    """
+
+    def __init__(
+        self,
+        timeout: float,
+        initial: float = 0.05,
+        maximum: float = 5.0,
+        factor: float = 2.0,
+        jitter: float = 0.2,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.initial = initial
+        self.maximum = maximum
+        self.factor = factor
+        self.jitter = jitter
+        self.clock = clock
+        self.deadline = clock() + timeout
+        self.current = initial
+
+    @property
+    def remaining(self) -> float:
+        return max(self.deadline - self.clock(), 0.0)
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining <= 0
+
+    def next_delay(self) -> float:
+        # jitter keeps many clients from lining up on the master
+        spread = random.uniform(1 - self.jitter, 1 + self.jitter)  # nosec B311
+        delay = min(self.current * spread, self.remaining)
+        self.current = min(self.current * self.factor, self.maximum)
+        return delay
+
+    def reset(self) -> None:
+        self.current = self.initial
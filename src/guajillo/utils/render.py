@@ -0,0 +1,132 @@
+import asyncio
+import io
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import repeat
+from types import GeneratorType
+from typing import Any, Callable, Coroutine, Iterator, TypeVar
+
+from rich.console import Console
+
+log = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# fewer minions than this are rendered on the worker thread, starting the
+# render processes costs more than they would save
+PARALLEL_OVER = 32
+
+
+def console_options(console: Console) -> dict[str, Any]:
+    """
+    what a console in another process needs to lay out text like this one
+    """
+    return {
+        "width": console.width,
+        "color_system": console.color_system,
+        "force_terminal": console.is_terminal,
+        "no_color": console.no_color,
+    }
+
+
+def render_minion(
+    outputer: str, minion: str, returned: Any, options: dict[str, Any]
+) -> bytes:
+    """
+    render one minion to the exact bytes that should land on stdout, runs in
+    a render process
+    """
+    import guajillo.outputs
+
+    text = io.StringIO()
+    console = Console(file=text, **options)
+    render = guajillo.outputs.hook(outputer, "render_minion")
+    if render is None:
+        raise AttributeError(f"{outputer} can not render a single minion")
+    output = asyncio.run(render(minion, returned, console))
+    if isinstance(output, GeneratorType):
+        return b"".join(output)
+    if isinstance(output, bytes):
+        return output
+    console.print(output)
+    return text.getvalue().encode()
+
+
+class Renderer:
+    """
+    a worker thread for outputers, and render processes for many minions.
+
+    building rich tables and laying them out is all cpu work, on the event
+    loop it stalls the event stream, the polling and the spinner for as long
+    as it takes. a single worker keeps everything printed in order, rich
+    already locks the console against the spinner's own refresh thread.
+    when many minions are rendered one at a time each one is turned into
+    ansi text in a pool of processes sized to the machine, and the worker
+    writes them out in order.
+    """
+
+    def __init__(self) -> None:
+        self.pool = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="guajillo-render"
+        )
+        # outputers are coroutines, the worker has its own loop to run them.
+        # only ever touched from the worker thread.
+        self.runner: asyncio.Runner | None = None
+        # started on the first large render, only touched from the worker
+        self.processes: ProcessPoolExecutor | None = None
+        self.cpus = os.cpu_count() or 1
+
+    def complete(self, coro: Coroutine[Any, Any, T]) -> T:
+        """
+        run an outputer to the end, only call this from the worker
+        """
+        if self.runner is None:
+            self.runner = asyncio.Runner()
+        return self.runner.run(coro)
+
+    def parallel(self, count: int) -> bool:
+        """
+        whether count minions are worth handing to the render processes
+        """
+        return self.cpus > 1 and count > PARALLEL_OVER
+
+    def render_minions(
+        self, outputer: str, returns: dict[str, Any], console: Console
+    ) -> Iterator[bytes]:
+        """
+        every minion rendered in the render processes, in order. only call
+        this from the worker
+        """
+        if self.processes is None:
+            # spawn, forking a process that runs threads is not safe
+            self.processes = ProcessPoolExecutor(
+                max_workers=self.cpus, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self.processes.map(
+            render_minion,
+            repeat(outputer),
+            returns.keys(),
+            returns.values(),
+            repeat(console_options(console)),
+            chunksize=max(1, len(returns) // (self.cpus * 4)),
+        )
+
+    async def run(self, func: Callable[..., T], *args: Any) -> T:
+        """
+        call func on the worker and wait for it without blocking the loop
+        """
+        return await asyncio.get_running_loop().run_in_executor(self.pool, func, *args)
+
+    def _close(self) -> None:
+        if self.runner is not None:
+            self.runner.close()
+            self.runner = None
+        if self.processes is not None:
+            self.processes.shutdown(cancel_futures=True)
+            self.processes = None
+
+    async def close(self) -> None:
+        await self.run(self._close)
+        self.pool.shutdown(wait=False)
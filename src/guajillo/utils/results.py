@@ -0,0 +1,93 @@
+import asyncio
+import gzip
+import json
+import logging
+import os
+import re
+from pathlib import Path
+from typing import Any
+
+from guajillo.utils.encode import dumps
+from guajillo.utils.tokens import DEFAULT_CACHE
+
+log = logging.getLogger(__name__)
+
+DEFAULT_MAX_MB = 256
+
+
+def result_cache(config: dict[str, Any] | None) -> "ResultCache | None":
+    """
+    the result cache configured under [results], None when it is turned off
+    """
+    config = config or {}
+    settings = config.get("results", {})
+    if not settings.get("cache", True):
+        return None
+    path = Path(config.get("cache_dir", DEFAULT_CACHE)) / "jobs"
+    return ResultCache(path, settings.get("max_mb", DEFAULT_MAX_MB) * 1024 * 1024)
+
+
+class ResultCache:
+    """
+    gzipped final results of finished jobs, one file per jid.
+
+    loading a result marks it as recently used, when the store grows past
+    max_bytes the least recently used results are removed first.
+    """
+
+    def __init__(self, path: str | Path, max_bytes: int) -> None:
+        self.path = Path(path).expanduser()
+        self.max_bytes = max_bytes
+
+    def _file(self, jid: str) -> Path:
+        # fan out jids look like eu:123,us:456
+        return self.path / f"{re.sub(r'[^\w.,-]', '_', jid)}.json.gz"
+
+    def _load(self, jid: str) -> dict[str, Any] | None:
+        path = self._file(jid)
+        try:
+            with gzip.open(path, "rb") as fh:
+                cached = json.load(fh)
+            os.utime(path)
+        except (OSError, ValueError, EOFError):
+            return None
+        return cached
+
+    def _save(self, jid: str, event: dict[str, Any], output: str) -> None:
+        data = gzip.compress(dumps({"output": output, "event": event}))
+        try:
+            self.path.mkdir(mode=0o700, parents=True, exist_ok=True)
+            path = self._file(jid)
+            tmp = path.with_suffix(".tmp")
+            fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "wb") as fh:
+                fh.write(data)
+            os.replace(tmp, path)
+            self._evict()
+        except OSError as err:
+            log.debug(f"unable to cache result for {jid}: {err}")
+
+    def _evict(self) -> None:
+        entries = []
+        for path in self.path.glob("*.json.gz"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            log.debug(f"evicting cached result {path.name}")
+            path.unlink(missing_ok=True)
+            total -= size
+
+    async def load(self, jid: str) -> dict[str, Any] | None:
+        """
+        {"output": outputer, "event": final event} for a jid, or None
+        """
+        return await asyncio.to_thread(self._load, jid)
+
+    async def save(self, jid: str, event: dict[str, Any], output: str) -> None:
+        await asyncio.to_thread(self._save, jid, event, output)
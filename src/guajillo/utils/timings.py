@@ -0,0 +1,150 @@
+import logging
+import math
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any, Iterable, Iterator
+
+if TYPE_CHECKING:
+    from httpx import Request, Response
+
+log = logging.getLogger(__name__)
+
+
+def percentiles(values: Iterable[float], pcts: Iterable[float]) -> list[float]:
+    """
+    nearest rank percentiles, sorting the values only once. 0.0 for no values
+    """
+    ordered = sorted(values)
+    if not ordered:
+        return [0.0 for _ in pcts]
+    return [ordered[max(math.ceil(pct / 100 * len(ordered)), 1) - 1] for pct in pcts]
+
+
+def percentile(values: Iterable[float], pct: float) -> float:
+    """
+    nearest rank percentile, 0.0 for no values
+    """
+    return percentiles(values, [pct])[0]
+
+
+def request_kind(request: "Request") -> str:
+    path = request.url.path
+    if path.endswith("/login"):
+        return "login"
+    if "/jobs/" in path:
+        return "lookup"
+    if path.endswith("/events"):
+        return "events"
+    return "call"
+
+
+class Timings:
+    """
+    wall time per phase of a run, every salt-api request and render time per
+    outputer, for --timings. a disabled Timings records nothing.
+    """
+
+    def __init__(self, enabled: bool = True) -> None:
+        self.enabled = enabled
+        self.start = time.perf_counter()
+        self.phases: dict[str, float] = defaultdict(float)
+        self.renders: dict[str, float] = defaultdict(float)
+        self.requests: list[dict[str, Any]] = []
+
+    @contextmanager
+    def _timed(self, bucket: dict[str, float], name: str) -> Iterator[None]:
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            bucket[name] += time.perf_counter() - start
+
+    def phase(self, name: str):
+        return self._timed(self.phases, name)
+
+    def render(self, outputer: str):
+        return self._timed(self.renders, outputer)
+
+    async def _on_request(self, request: "Request") -> None:
+        request.extensions["guajillo_start"] = time.perf_counter()
+
+    async def _on_response(self, response: "Response") -> None:
+        request = response.request
+        kind = request_kind(request)
+        if kind == "events":
+            # reading the body here would wait for the stream to end
+            return
+        if request.extensions.get("guajillo_stream"):
+            # parsed as it is read, only the time to the headers is known here
+            size = int(response.headers.get("content-length", 0))
+        else:
+            # the body is always read straight after, reading it here only
+            # moves the time into the request where it belongs
+            await response.aread()
+            size = len(response.content)
+        started = request.extensions.get("guajillo_start", time.perf_counter())
+        self.requests.append(
+            {
+                "kind": kind,
+                "method": request.method,
+                "status": response.status_code,
+                "bytes": size,
+                "duration": time.perf_counter() - started,
+            }
+        )
+
+    def hooks(self) -> dict[str, list]:
+        """
+        httpx event hooks that record every request
+        """
+        if not self.enabled:
+            return {}
+        return {"request": [self._on_request], "response": [self._on_response]}
+
+    def summary(self) -> dict[str, Any]:
+        requests: dict[str, dict[str, Any]] = {}
+        for kind in sorted({r["kind"] for r in self.requests}):
+            durations = [r["duration"] for r in self.requests if r["kind"] == kind]
+            requests[kind] = {
+                "count": len(durations),
+                "bytes": sum(r["bytes"] for r in self.requests if r["kind"] == kind),
+                "total": sum(durations),
+                "p50": percentile(durations, 50),
+                "p99": percentile(durations, 99),
+            }
+        return {
+            "total": time.perf_counter() - self.start,
+            "phases": dict(self.phases),
+            "requests": requests,
+            "render": dict(self.renders),
+        }
+
+    def table(self) -> Any:
+        from rich.table import Table
+
+        summary = self.summary()
+        table = Table(title="Timings", show_header=True)
+        table.add_column("What")
+        table.add_column("Count", justify="right")
+        table.add_column("Total s", justify="right")
+        table.add_column("p50 ms", justify="right")
+        table.add_column("p99 ms", justify="right")
+        for name, seconds in summary["phases"].items():
+            table.add_row(f"phase {name}", "", f"{seconds:.3f}", "", "")
+        for kind, stats in summary["requests"].items():
+            table.add_row(
+                f"request {kind}",
+                str(stats["count"]),
+                f"{stats['total']:.3f}",
+                f"{stats['p50'] * 1000:.1f}",
+                f"{stats['p99'] * 1000:.1f}",
+            )
+        for outputer, seconds in summary["render"].items():
+            table.add_row(f"render {outputer}", "", f"{seconds:.3f}", "", "")
+        table.add_section()
+        table.add_row("total", "", f"{summary['total']:.3f}", "", "")
+        return table
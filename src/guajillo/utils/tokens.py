@@ -0,0 +1,88 @@
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Any
+
+log = logging.getLogger(__name__)
+
+DEFAULT_CACHE = "~/.cache/guajillo"
+# treat tokens this close to their expire time as already gone
+EXPIRE_MARGIN = 60
+
+
+class TokenCache:
+    """
+    per profile cache of salt-api tokens, so we don't eauth on every run
+    """
+
+    def __init__(self, path: str | Path = DEFAULT_CACHE) -> None:
+        self.path = Path(path).expanduser()
+
+    def _file(self, profile: str) -> Path:
+        return self.path / f"{profile}.token"
+
+    def load(
+        self,
+        profile: str,
+        url: str,
+        user: str | None = None,
+        eauth: str | None = None,
+    ) -> dict[str, Any] | None:
+        """
+        return the cached login return for a profile if it is still good, and
+        was for the same url, user and eauth
+        """
+        path = self._file(profile)
+        try:
+            with open(path, "r") as fd:
+                cached = json.load(fd)
+        except (OSError, ValueError):
+            return None
+        if cached.get("url") != url:
+            log.debug(f"cached token for {profile} is for {cached.get('url')}")
+            return None
+        for key, want in [("user", user), ("eauth", eauth)]:
+            if want is not None and cached.get(key) != want:
+                log.debug(f"cached token for {profile} is for another {key}")
+                return None
+        if cached.get("expire", 0) - EXPIRE_MARGIN <= time.time():
+            log.debug(f"cached token for {profile} has expired")
+            self.clear(profile)
+            return None
+        return cached
+
+    def save(
+        self,
+        profile: str,
+        url: str,
+        login: dict[str, Any],
+        user: str | None = None,
+        eauth: str | None = None,
+    ) -> None:
+        if "token" not in login or "expire" not in login:
+            return
+        cached = {
+            "url": url,
+            "token": login["token"],
+            "expire": login["expire"],
+            "user": user or login.get("user"),
+            "eauth": eauth or login.get("eauth"),
+        }
+        try:
+            self.path.mkdir(mode=0o700, parents=True, exist_ok=True)
+            path = self._file(profile)
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w") as fh:
+                json.dump(cached, fh)
+            # O_CREAT mode is ignored on an existing file
+            os.chmod(path, 0o600)
+        except OSError as err:
+            log.debug(f"unable to cache token: {err}")
+
+    def clear(self, profile: str) -> None:
+        try:
+            self._file(profile).unlink()
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,177 @@
+import asyncio
+import logging
+import time
+from typing import Any
+
+from rich.console import Group
+from rich.live import Live
+from rich.table import Table
+from rich.text import Text
+
+from guajillo.exceptions import GuajilloException, TerminateTaskGroup
+from guajillo.utils.conn import Guajillo
+from guajillo.utils.outputs import Outputs
+
+log = logging.getLogger(__name__)
+
+# how many of the latest changes the live view keeps on screen
+HISTORY = 50
+
+Entries = dict[tuple[str, str], Any]
+
+
+def _is_state(value: Any) -> bool:
+    return isinstance(value, dict) and "result" in value and "changes" in value
+
+
+def flatten(event: dict[str, Any]) -> Entries:
+    """
+    one entry per minion and state id, or per minion and top level key for
+    anything that is not a highstate, so runs can be compared entry by entry
+    """
+    entries: Entries = {}
+    if not isinstance(event, dict) or "info" not in event:
+        return entries
+    results = event["info"][0].get("Result", {})
+    for minion in event["info"][0].get("Minions", []):
+        if minion not in results:
+            # one marker instead of every state of the minion going away
+            entries[(minion, "")] = None
+    for minion, returned in results.items():
+        if isinstance(returned, dict) and "return" in returned:
+            returned = returned["return"]
+        if isinstance(returned, dict) and returned:
+            for key, value in returned.items():
+                if _is_state(value):
+                    value = {
+                        "result": value["result"],
+                        "changes": value["changes"],
+                        "comment": value.get("comment", ""),
+                    }
+                entries[(minion, key)] = value
+        else:
+            entries[(minion, "")] = returned
+    return entries
+
+
+def diff(old: Entries, new: Entries) -> list[tuple[str, tuple[str, str], Any]]:
+    """
+    (kind, key, value) for every entry that appeared, changed or went away
+    """
+    changes = []
+    silent = {minion for (minion, entry), value in new.items() if value is None}
+    for key, value in new.items():
+        if key not in old:
+            changes.append(("new", key, value))
+        elif old[key] != value:
+            changes.append(("changed", key, value))
+    for key in old:
+        if key not in new and key[0] not in silent:
+            changes.append(("gone", key, None))
+    return changes
+
+
+def describe(value: Any) -> Text:
+    if _is_state(value):
+        mark = Text("✔ ", style="green") if value["result"] else Text("✘ ", style="red")
+        comment = str(value["comment"]).splitlines()[:1]
+        return mark + Text(comment[0] if comment else "")
+    if value is None:
+        return Text("no return", style="red")
+    return Text(str(value)[:200])
+
+
+class Watch:
+    """
+    keeps one logged in client and re-runs the same lowstate every interval.
+
+    the first result is rendered in full with the usual outputer, after that
+    only the entries that changed between two runs are shown, in a live view
+    that is only repainted when something did change.
+    """
+
+    def __init__(self, client: Guajillo, outputs: Outputs, interval: float) -> None:
+        self.client = client
+        self.outputs = outputs
+        self.interval = interval
+        self.runs = 0
+        self.history: list[tuple[str, str, tuple[str, str], Any]] = []
+        self.unchanged = 0
+
+    async def _run_once(self, params: list[dict[str, Any]]) -> tuple[Any, str]:
+        finals: list[tuple[Any, str]] = []
+
+        async def collect(event: Any, output: str, step: str, *_, **__) -> None:
+            if step == "final":
+                finals.append((event, output))
+
+        await self.client.run_lowstate(params, emit=collect)
+        self.runs += 1
+        return finals[-1] if finals else ({}, "json")
+
+    def view(self) -> Group:
+        header = Text(
+            f"run {self.runs} at {time.strftime('%X')}, every {self.interval:g}s, "
+            f"{self.unchanged} entries unchanged",
+            style="bold",
+        )
+        table = Table(show_header=True, expand=True)
+        table.add_column("When")
+        table.add_column("Minion")
+        table.add_column("Entry")
+        table.add_column("Change")
+        table.add_column("Now")
+        for when, kind, (minion, entry), value in self.history:
+            style = {"new": "cyan", "changed": "yellow", "gone": "red"}[kind]
+            entry = entry.split("_|-")[1] if "_|-" in entry else entry
+            table.add_row(when, minion, entry, Text(kind, style=style), describe(value))
+        return Group(header, table)
+
+    async def taskMan(self, bus: Any = None) -> None:
+        """
+        run, compare, repaint what changed, sleep, forever
+        """
+        client = self.client
+        try:
+            log.info("Starting watch")
+            client.persistent = True
+            with client.timings.phase("login"):
+                await client.login()
+            if not client.parser.commands:
+                raise GuajilloException("--watch needs a salt command to run")
+            params = client._make_params()
+            event, outputer = await self._run_once(params)
+            self.outputs.cstatus.stop()
+            await self.outputs.final(event, outputer)
+            previous = flatten(event)
+            with Live(
+                self.view(), console=self.outputs.console, auto_refresh=False
+            ) as live:
+                while True:
+                    await asyncio.sleep(self.interval)
+                    event, _ = await self._run_once(params)
+                    current = flatten(event)
+                    changes = diff(previous, current)
+                    self.unchanged = len(current) - sum(
+                        1 for kind, _, _ in changes if kind != "gone"
+                    )
+                    when = time.strftime("%X")
+                    for kind, key, value in changes:
+                        self.history.insert(0, (when, kind, key, value))
+                    del self.history[HISTORY:]
+                    # repaint only when there is something new to show
+                    live.update(self.view(), refresh=bool(changes))
+                    previous = current
+        except Exception:
+            client.console.print_exception(show_locals=client.config["debug"])
+            raise TerminateTaskGroup()
+        finally:
+            await self.outputs.renderer.close()
+            client.persistent = False
+            client.done.set()
+
+    async def streamMon(self) -> None:
+        await self.client.streamMon()
+
+    async def close(self) -> None:
+        await self.client.close()
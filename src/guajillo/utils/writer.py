@@ -0,0 +1,113 @@
+import asyncio
+import logging
+from pathlib import Path
+from typing import IO, Any
+
+from guajillo.exceptions import GuajilloException
+from guajillo.utils.bus import JobEvent
+from guajillo.utils.encode import dumps
+
+log = logging.getLogger(__name__)
+
+ZSTD_SUFFIXES = [".zst", ".zstd"]
+
+
+class NDJSONWriter:
+    """
+    streams results to a file as json lines while the job is still running.
+
+    every minion return is written once, as soon as it shows up, followed by
+    a line describing the final state of the job. lines are buffered and both
+    the encoding and the writes happen in a worker thread.
+    """
+
+    def __init__(self, path: str | Path, buffer_lines: int = 256) -> None:
+        self.path = Path(path).expanduser()
+        self.compress = self.path.suffix in ZSTD_SUFFIXES
+        self.buffer_lines = buffer_lines
+        self.buffer: list[dict[str, Any]] = []
+        # (jid, minion), a run can hold several jobs for the same minions
+        self.seen: set[tuple[str, str]] = set()
+        self.fh: IO[bytes] | None = None
+        self.raw: IO[bytes] | None = None
+
+    def _open(self) -> None:
+        self.raw = open(self.path, "wb")
+        if self.compress:
+            try:
+                import zstandard
+            except ImportError:
+                self.raw.close()
+                raise GuajilloException("zstandard is needed to write .zst files")
+            self.fh = zstandard.ZstdCompressor().stream_writer(self.raw)
+        else:
+            self.fh = self.raw
+
+    def _write(self, lines: list[dict[str, Any]]) -> None:
+        if self.fh is None:
+            self._open()
+        data = b"".join(dumps(line) + b"\n" for line in lines)
+        self.fh.write(data)  # type: ignore[union-attr]
+
+    def _close(self) -> None:
+        if self.fh is not None:
+            self.fh.close()
+        if self.raw is not None and not self.raw.closed:
+            self.raw.close()
+
+    def _lines(self, event: JobEvent) -> list[dict[str, Any]]:
+        output = event["output"]
+        # job is the final result of one of several jobs in the run
+        final = event["meta"]["step"] in ["final", "job"]
+        if not isinstance(output, dict) or "info" not in output:
+            if not final:
+                return []
+            return [{"type": "event", "output": output}]
+        info = output["info"][0]
+        jid = info.get("jid")
+        lines = []
+        returns = output.get("return", [{}])[0]
+        if isinstance(returns, dict) and "Minions" in info:
+            results = info.get("Result", {})
+            for minion, returned in returns.items():
+                if (jid, minion) in self.seen:
+                    continue
+                self.seen.add((jid, minion))
+                line = {"type": "return", "jid": jid, "minion": minion}
+                line["return"] = returned
+                if isinstance(results.get(minion), dict):
+                    for key in ["retcode", "success"]:
+                        if key in results[minion]:
+                            line[key] = results[minion][key]
+                lines.append(line)
+        if final:
+            if "Minions" in info:
+                missing = [m for m in info["Minions"] if (jid, m) not in self.seen]
+                lines.append(
+                    {
+                        "type": "final",
+                        "jid": jid,
+                        "function": info.get("Function"),
+                        "minions": info["Minions"],
+                        "missing": missing,
+                    }
+                )
+            else:
+                lines.append({"type": "final", "jid": jid, "output": output})
+        return lines
+
+    async def write_event(self, event: JobEvent) -> None:
+        self.buffer.extend(self._lines(event))
+        if len(self.buffer) >= self.buffer_lines or event["meta"]["step"] == "final":
+            await self.flush()
+
+    async def flush(self) -> None:
+        if not self.buffer:
+            return
+        lines, self.buffer = self.buffer, []
+        await asyncio.to_thread(self._write, lines)
+
+    async def close(self) -> None:
+        await self.flush()
+        await asyncio.to_thread(self._close)
+        log.info(f"results written to {self.path}")
@@ -0,0 +1,61 @@
+import sys
+
+import pytest
+from rich.status import Status
+
+from guajillo.app import App
+from guajillo.exceptions import GuajilloException
+from guajillo.utils.conn import Guajillo
+from guajillo.utils.events import EventTail
+
+
+def _config(tmp_path):
+    config = tmp_path / "config.toml"
+    config.write_text(
+        f'cache_dir = "{tmp_path}"\n'
+        "[netapi]\n"
+        'url = "http://127.0.0.1:8000"\n'
+        'username = "a"\npassword = "b"\nauth = "pam"\n'
+    )
+    return config
+
+
+def test_events_starts_no_spinner(monkeypatch, tmp_path):
+    config = _config(tmp_path)
+    started = []
+    monkeypatch.setattr(Status, "start", lambda self: started.append(self))
+    monkeypatch.setattr(
+        sys, "argv", ["guajillo", "-c", str(config), "events", "--format", "summary"]
+    )
+    app = App()
+    app.setup()
+    assert isinstance(app.client, EventTail)
+    assert app.client.format == "summary"
+    assert not hasattr(app, "outputs")
+    assert started == []
+
+
+@pytest.mark.parametrize("no_agent", [False, True])
+def test_agent_run_builds_no_client(monkeypatch, tmp_path, no_agent):
+    config = _config(tmp_path)
+    argv = ["guajillo", "-c", str(config), "salt", "*", "test.ping"]
+    if no_agent:
+        argv.insert(3, "--no-agent")
+    monkeypatch.setattr(sys, "argv", argv)
+    app = App()
+    app.setup()
+    # with an agent possible the direct client waits until run finds none
+    if no_agent:
+        assert isinstance(app.client, Guajillo)
+    else:
+        assert app.client is None
+
+
+@pytest.mark.parametrize("command", [["agent"], ["salt", "*", "test.ping"]])
+def test_jid_takes_no_command(monkeypatch, tmp_path, command):
+    config = _config(tmp_path)
+    argv = ["guajillo", "-c", str(config), "--jid", "123", *command]
+    monkeypatch.setattr(sys, "argv", argv)
+    app = App()
+    with pytest.raises(GuajilloException, match="--jid"):
+        app.setup()
@@ -0,0 +1,23 @@
+import subprocess  # nosec B404
+import sys
+
+HELP = """
+import sys
+sys.argv = ["guajillo", "--help"]
+from guajillo.main import main
+try:
+    main()
+except SystemExit:
+    pass
+print(" ".join(sorted(sys.modules)), file=sys.stderr)
+"""
+
+
+def test_help_skips_heavy_imports():
+    result = subprocess.run(  # nosec B603
+        [sys.executable, "-c", HELP], capture_output=True, text=True, check=True
+    )
+    loaded = set(result.stderr.strip().splitlines()[-1].split())
+    for module in ["httpx", "httpx_sse", "yaml", "asyncio", "rich.traceback"]:
+        assert module not in loaded
+    assert "usage" in result.stderr
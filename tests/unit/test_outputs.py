@@ -0,0 +1,121 @@
+import io
+import sys
+
+import pytest
+from rich.console import Console
+
+import guajillo.outputs
+
+
+def test_names_without_import():
+    for name in ["highstate", "yaml", "profile"]:
+        sys.modules.pop(f"guajillo.outputs.{name}", None)
+    names = guajillo.outputs.names()
+    assert names == sorted(names)
+    assert {"boolean", "highstate", "json", "yaml"} <= set(names)
+    assert "non_returns" not in names
+    assert not guajillo.outputs.exists("non_returns")
+    assert "guajillo.outputs.highstate" not in sys.modules
+
+
+def test_load():
+    render = guajillo.outputs.load("json")
+    assert callable(render)
+    assert guajillo.outputs.json is render
+    assert getattr(guajillo.outputs, "json") is render
+    with pytest.raises(AttributeError):
+        guajillo.outputs.load("nope")
+    assert not guajillo.outputs.exists("nope")
+
+
+def _states(minion, failed=False, changed=False):
+    return {
+        "file_|-motd_|-/etc/motd_|-managed": {
+            "result": not failed,
+            "comment": "boom" if failed else "ok",
+            "changes": {"diff": "new"} if changed else {},
+        },
+        "pkg_|-vim_|-vim_|-installed": {"result": True, "comment": "", "changes": {}},
+    }
+
+
+def test_unwrap_fanned_out_runner():
+    from guajillo.outputs.highstate import unwrap
+
+    states = _states("master")
+    returned = {"return": {"return": {"data": {"master": states}}}}
+    assert unwrap("master", returned) == states
+    assert unwrap("eu:master", returned) == states
+
+
+@pytest.mark.asyncio
+async def test_compact_highstate():
+    from guajillo.outputs.compact import DETAIL_LIMIT, PAGE_SIZE, CompactHighstate
+
+    count = guajillo.outputs.highstate.COMPACT_OVER + DETAIL_LIMIT + PAGE_SIZE
+    result = {
+        f"m{i}": {"return": _states(f"m{i}", failed=i == 7, changed=i != 1)}
+        for i in range(count)
+    }
+    compact = CompactHighstate(result)
+    assert compact.minions == count
+    assert compact.interesting[0][0] == "m7"
+    assert compact.counts["m7"] == {"ok": 1, "changed": 0, "failed": 1}
+    assert "m1" not in compact.counts
+    assert compact.clean == count - len(compact.counts)
+    assert len(list(compact.details())) == DETAIL_LIMIT
+    assert len(list(compact.pages())) == 2
+
+    console = Console(file=io.StringIO(), width=120)
+    event = {
+        "info": [{"Minions": list(result), "Result": result}],
+        "return": [result],
+    }
+    console.print(await guajillo.outputs.load("compact")(event, console))
+    text = console.file.getvalue()
+    assert "Highstate Summary" in text
+    assert "m7: motd" in text
+    assert "page 2/2" in text
+
+
+@pytest.mark.asyncio
+async def test_profile_stats():
+    from guajillo.outputs.profile import STATS_OVER
+    from guajillo.outputs.profile_stats import ProfileStats
+
+    def states(i):
+        return {
+            "pkg_|-vim_|-vim_|-installed": {
+                "result": True,
+                "duration": float(i),
+                "__sls__": "editors",
+            },
+            "file_|-motd_|-/etc/motd_|-managed": {
+                "result": True,
+                "duration": "2.5 ms",
+                "__sls__": "motd",
+            },
+        }
+
+    count = STATS_OVER + 1
+    result = {f"m{i}": {"return": states(i)} for i in range(1, count + 1)}
+    result["broken"] = {"return": "not a state run"}
+    stats = ProfileStats(result)
+    assert stats.points == 2 * count
+    assert stats.unknown == ["broken"]
+    vim = stats.stats("pkg_|-vim_|-vim_|-installed")
+    assert vim["count"] == count
+    assert vim["p50"] == 51.0
+    assert vim["p99"] == 100.0
+    assert vim["max"] == 101.0
+    assert stats.slowest_states()[0][0] == "pkg_|-vim_|-vim_|-installed"
+    assert stats.slowest_minions(1) == [("m101", 103.5)]
+    assert stats.sls["motd"] == 2.5 * count
+
+    console = Console(file=io.StringIO(), width=120)
+    event = {"info": [{"Minions": list(result), "Result": result}], "return": [{}]}
+    console.print(await guajillo.outputs.load("profile_stats")(event, console))
+    text = console.file.getvalue()
+    assert "Slowest states, 202 durations from 101 minions" in text
+    assert "Slowest minions" in text
+    assert "editors" in text
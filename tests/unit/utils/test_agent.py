@@ -0,0 +1,65 @@
+import asyncio
+
+import pytest
+from rich.console import Console
+
+from guajillo.exceptions import GuajilloException
+from guajillo.utils.agent import Agent, AgentClient, socket_path
+from guajillo.utils.bus import EventBus
+from guajillo.utils.cli import CliParse
+
+
+class FakeClient:
+    async def run_lowstate(self, params, emit, timeout=None, output=None):
+        await emit({"return": [{"jid": "123"}]}, "json", "normal")
+        await emit({"return": [params]}, output, "final")
+
+
+def test_socket_path():
+    assert str(socket_path({"agent": {"socket": "/tmp/a.sock"}})) == "/tmp/a.sock"
+    assert str(socket_path({"cache_dir": "/tmp/cache"})) == "/tmp/cache/agent.sock"
+
+
+@pytest.mark.asyncio
+async def test_agent_round_trip(tmp_path):
+    cli = CliParse()
+    cli.build_args(["agent"])
+    config = {"debug": False}
+    path = tmp_path / "agent.sock"
+    agent = Agent(cli, config, Console(), path)
+
+    async def client_for(profile):
+        return FakeClient()
+
+    agent.client_for = client_for
+    server = asyncio.create_task(agent.serve())
+    while not path.exists():
+        await asyncio.sleep(0.01)
+
+    client = AgentClient(path, Console(), config)
+    assert await client.connect()
+    bus = EventBus()
+    lowstate = [{"client": "local_async", "tgt": "*", "fun": "test.ping"}]
+    await client.taskMan(
+        bus, {"profile": "netapi", "lowstate": lowstate, "output": "json"}
+    )
+    assert (await bus.get())["meta"]["step"] == "normal"
+    final = await bus.get()
+    assert final["output"]["return"][0] == lowstate
+    assert final["meta"] == {"output": "json", "step": "final"}
+
+    server.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await server
+    assert not path.exists()
+    assert not await AgentClient(path, Console(), config).connect()
+
+
+@pytest.mark.asyncio
+async def test_agent_unknown_profile(tmp_path):
+    cli = CliParse()
+    cli.build_args(["agent"])
+    config = {"debug": False, "netapi": {"url": "http://test.com:8000"}}
+    agent = Agent(cli, config, Console(), tmp_path / "agent.sock")
+    with pytest.raises(GuajilloException, match="Unknown profile eu"):
+        await agent.client_for("eu")
@@ -0,0 +1,95 @@
+import json
+
+import httpx
+import pytest
+from rich.console import Console
+
+from guajillo.exceptions import GuajilloException
+from guajillo.utils.batch import Batch, failed, window_size
+from guajillo.utils.bus import EventBus
+from guajillo.utils.cli import CliParse
+from guajillo.utils.conn import Guajillo
+
+RETCODES = {"m1": 0, "m2": 1, "m3": 0}
+
+
+def test_window_size():
+    assert window_size("3", 100) == 3
+    assert window_size("25%", 10) == 3
+    assert window_size("1%", 10) == 1
+    with pytest.raises(GuajilloException):
+        window_size("lots", 10)
+
+
+def test_failed():
+    assert failed(None)
+    assert failed({"retcode": 2})
+    assert failed({"retcode": 0, "success": False})
+    assert not failed({"retcode": 0, "success": True})
+
+
+def fake_api(started):
+    def respond(request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        if path == "/login":
+            return httpx.Response(200, json={"return": [{"token": "abc"}]})
+        if path == "/":
+            lowstate = json.loads(request.content)[0]
+            if lowstate["fun"] == "test.ping":
+                return httpx.Response(
+                    200, json={"return": [{"jid": "ping", "minions": list(RETCODES)}]}
+                )
+            started.append(lowstate["tgt"])
+            jid = f"run-{lowstate['tgt']}"
+            return httpx.Response(
+                200, json={"return": [{"jid": jid, "minions": [lowstate["tgt"]]}]}
+            )
+        jid = path.removeprefix("/jobs/")
+        minions = list(RETCODES) if jid == "ping" else [jid.removeprefix("run-")]
+        result = {m: {"return": True, "retcode": RETCODES[m]} for m in minions}
+        if jid == "ping":
+            result = {m: {"return": True, "retcode": 0} for m in minions}
+        return httpx.Response(
+            200,
+            json={
+                "info": [
+                    {
+                        "jid": jid,
+                        "Function": "cmd.run",
+                        "Minions": minions,
+                        "Result": result,
+                    }
+                ],
+                "return": [{m: True for m in minions}],
+            },
+        )
+
+    return respond
+
+
+@pytest.mark.asyncio
+async def test_batch_stops_at_failure_limit(httpx_mock, tmp_path):
+    started = []
+    httpx_mock.add_callback(fake_api(started), is_reusable=True)
+    cli = CliParse()
+    cli.build_args(["-b", "1", "--batch-fail", "1", "salt", "*", "cmd.run", "ls"])
+    config = {
+        "netapi": {"username": "u", "password": "p", "auth": "pam"},
+        "cache_dir": str(tmp_path),
+        "debug": False,
+    }
+    conn = Guajillo("http://test.com:8000", cli, config, console=Console())
+    # no event stream here, every job is followed with lookups
+    conn.stream_closed.set()
+    batch = Batch(conn, "1", max_fail="1")
+    bus = EventBus(maxsize=16)
+    await batch.taskMan(bus)
+    assert started == ["m1", "m2"]
+    event = await bus.get()
+    while event["meta"]["step"] != "final":
+        event = await bus.get()
+    info = event["output"]["info"][0]
+    assert info["jid"] == "batch:ping"
+    assert info["Minions"] == ["m1", "m2", "m3"]
+    assert list(info["Result"]) == ["m1", "m2"]
+    assert batch.failures == 1
@@ -0,0 +1,100 @@
+import asyncio
+
+import pytest
+
+from guajillo.utils.bus import EventBus, job_event
+
+
+@pytest.mark.asyncio
+async def test_status_coalescing():
+    bus = EventBus()
+    for count in range(5):
+        await bus.put(job_event({"count": count}, "status", "normal"))
+    event = await bus.get()
+    assert event["output"] == {"count": 4}
+    assert bus.status is None
+
+
+@pytest.mark.asyncio
+async def test_final_drops_stale_status():
+    bus = EventBus()
+    await bus.put(job_event({"return": [{}]}, "json", "final"))
+    await bus.put(job_event({"count": 1}, "status", "normal"))
+    assert (await bus.get())["meta"]["step"] == "final"
+    assert bus.status is None
+
+
+@pytest.mark.asyncio
+async def test_consumer_wakes_on_put():
+    bus = EventBus()
+    getter = asyncio.create_task(bus.get())
+    await asyncio.sleep(0)
+    assert not getter.done()
+    await bus.put(job_event({"return": [{}]}, "yaml", "final"))
+    event = await asyncio.wait_for(getter, timeout=1)
+    assert event["meta"]["output"] == "yaml"
+
+
+@pytest.mark.asyncio
+async def test_backpressure():
+    bus = EventBus(maxsize=1)
+    await bus.put(job_event({}, "json", "normal"))
+    putter = asyncio.create_task(bus.put(job_event({}, "json", "final")))
+    await asyncio.sleep(0)
+    assert not putter.done()
+    assert (await bus.get())["meta"]["step"] == "normal"
+    await asyncio.wait_for(putter, timeout=1)
+    assert (await bus.get())["meta"]["step"] == "final"
+
+
+@pytest.mark.asyncio
+async def test_delta_coalescing_keeps_returns():
+    bus = EventBus()
+    for minion in ["m1", "m2"]:
+        delta = {
+            "info": [{"Minions": ["m1", "m2"], "Result": {minion: {"return": 1}}}],
+            "return": [{minion: 1}],
+        }
+        await bus.put(job_event(delta, "status", "normal", "yaml", delta=True))
+    event = await bus.get()
+    assert event["output"]["return"][0] == {"m1": 1, "m2": 1}
+    assert set(event["output"]["info"][0]["Result"]) == {"m1", "m2"}
+
+
+@pytest.mark.asyncio
+async def test_delta_from_another_job_is_kept():
+    bus = EventBus()
+    for jid in ["1", "2"]:
+        delta = {
+            "info": [{"jid": jid, "Minions": ["m1"], "Result": {"m1": {"return": 1}}}],
+            "return": [{"m1": 1}],
+        }
+        await bus.put(job_event(delta, "status", "normal", "yaml", delta=True))
+    first, second = await bus.get(), await bus.get()
+    assert first["output"]["info"][0]["jid"] == "1"
+    assert second["output"]["info"][0]["jid"] == "2"
+
+
+@pytest.mark.asyncio
+async def test_delta_is_not_dropped_by_final():
+    bus = EventBus()
+    delta = {"info": [{"jid": "1", "Result": {"m1": {}}}], "return": [{"m1": 1}]}
+    await bus.put(job_event(delta, "status", "normal", "yaml", delta=True))
+    await bus.put(job_event({"return": [{}]}, "yaml", "final"))
+    assert (await bus.get())["meta"]["delta"]
+    assert (await bus.get())["meta"]["step"] == "final"
+
+
+@pytest.mark.asyncio
+async def test_delta_merging_is_bounded(monkeypatch):
+    monkeypatch.setattr("guajillo.utils.bus.DELTA_MINIONS", 2)
+    bus = EventBus()
+    for minion in ["m1", "m2", "m3"]:
+        delta = {
+            "info": [{"jid": "1", "Result": {minion: {}}}],
+            "return": [{minion: 1}],
+        }
+        await bus.put(job_event(delta, "status", "normal", "yaml", delta=True))
+    first, second = await bus.get(), await bus.get()
+    assert first["output"]["return"][0] == {"m1": 1, "m2": 1}
+    assert second["output"]["return"][0] == {"m3": 1}
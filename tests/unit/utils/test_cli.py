@@ -56,6 +56,13 @@ def test_cli_output_file_fail():
     assert excinfo.value.code == 2
 
 
+def test_cli_out_unknown():
+    testing = CliParse()
+    with pytest.raises(SystemExit) as excinfo:
+        testing.build_args(["-o", "nope"])
+    assert excinfo.value.code == 2
+
+
 def test_cli_log():
     testing = CliParse()
     testing.build_args(["-l", "DEBUG"])
@@ -69,6 +76,43 @@ def test_cli_log_fail():
     assert excinfo.value.code == 2
 
 
+def test_cli_commands(tmp_path):
+    jobs = tmp_path / "jobs"
+    jobs.write_text("# pre-flight\nsalt '*' disk.usage\n\nsalt-run jobs.active\n")
+    testing = CliParse()
+    testing.build_args(
+        ["salt", "*", "test.ping", "--then", "salt", "-G", "os:x", "pkg.list_upgrades"]
+        + ["--jobs", str(jobs)]
+    )
+    assert testing.commands == [
+        ["salt", "*", "test.ping"],
+        ["salt", "-G", "os:x", "pkg.list_upgrades"],
+        ["salt", "*", "disk.usage"],
+        ["salt-run", "jobs.active"],
+    ]
+
+
+def test_cli_jobs_fail(tmp_path):
+    testing = CliParse()
+    with pytest.raises(SystemExit) as excinfo:
+        testing.build_args(["--jobs", str(tmp_path / "missing")])
+    assert excinfo.value.code == 2
+
+
+def test_cli_timings():
+    testing = CliParse()
+    testing.build_args(["--timings", "salt", "*", "test.ping"])
+    assert testing.parsed_args.timings == "table"
+    assert testing.salt_args == ["salt", "*", "test.ping"]
+
+
+def test_cli_timings_json():
+    testing = CliParse()
+    testing.build_args(["--timings-json", "salt", "*", "test.ping"])
+    assert testing.parsed_args.timings == "json"
+    assert testing.salt_args == ["salt", "*", "test.ping"]
+
+
 def test_help():
     output = Console()
     with output.capture() as capture:
@@ -81,30 +125,111 @@ commands]
 A CLI program for interacting with the salt-api with better output
 
                                     Options                                     
-┏━━━━━━━┳━━━━━━━━━━━━━━━┳━━━━━━━━━━━━━━━━━┳━━━━━━━━━━━━━━━━━━┳━━━━━━━━━━━━━━━━━┓
-┃ Short ┃ Long          ┃ option name     ┃ description      ┃ default         ┃
-┡━━━━━━━╇━━━━━━━━━━━━━━━╇━━━━━━━━━━━━━━━━━╇━━━━━━━━━━━━━━━━━━╇━━━━━━━━━━━━━━━━━┩
-│ -h    │ --help        │                 │ Show this help   │                 │
-│       │               │                 │ and exit         │                 │
-│ -c    │ --config      │ CONFIG          │ Config file      │ ~/.config/guaj… │
-│       │               │                 │ location         │                 │
-│ -p    │ --profile     │ PROFILE         │ Profile from     │ netapi          │
-│       │               │                 │ config file to   │                 │
-│       │               │                 │ use as login     │                 │
-│       │               │                 │ info             │                 │
-│ -o    │ --out         │ {json, yaml,    │ force output     │ auto            │
-│       │               │ boolean,        │ style through a  │                 │
-│       │               │ highstate}      │ known output     │                 │
-│       │ --output-file │ OUTPUT_FILE     │ Not implimented, │                 │
-│       │               │                 │ output file to   │                 │
-│       │               │                 │ dump output to   │                 │
-│ -t    │ --timeout     │ TIMEOUT         │ timeout for      │ 30              │
-│       │               │                 │ internal         │                 │
-│       │               │                 │ operations,      │                 │
-│       │               │                 │ loops to fetch   │                 │
-│ -l    │ --log         │ {CRITICAL,ERRO… │ console log      │ WARNING         │
-│       │               │                 │ level            │                 │
-└───────┴───────────────┴─────────────────┴──────────────────┴─────────────────┘
+┏━━━━━━━┳━━━━━━━━━━━━━━━━┳━━━━━━━━━━━━━━━━━┳━━━━━━━━━━━━━━━━━┳━━━━━━━━━━━━━━━━━┓
+┃ Short ┃ Long           ┃ option name     ┃ description     ┃ default         ┃
+┡━━━━━━━╇━━━━━━━━━━━━━━━━╇━━━━━━━━━━━━━━━━━╇━━━━━━━━━━━━━━━━━╇━━━━━━━━━━━━━━━━━┩
+│ -h    │ --help         │                 │ Show this help  │                 │
+│       │                │                 │ and exit        │                 │
+│ -c    │ --config       │ CONFIG          │ Config file     │ ~/.config/guaj… │
+│       │                │                 │ location        │                 │
+│ -p    │ --profile      │ PROFILE         │ Profile from    │ netapi          │
+│       │                │                 │ config file to  │                 │
+│       │                │                 │ use as login    │                 │
+│       │                │                 │ info, comma     │                 │
+│       │                │                 │ separate        │                 │
+│       │                │                 │ profiles or use │                 │
+│       │                │                 │ a [groups] name │                 │
+│       │                │                 │ to run against  │                 │
+│       │                │                 │ several masters │                 │
+│ -o    │ --out          │ { boolean,      │ force output    │ auto            │
+│       │                │ compact,        │ style through a │                 │
+│       │                │ highstate,      │ known output    │                 │
+│       │                │ json, profile,  │                 │                 │
+│       │                │ profile_stats,  │                 │                 │
+│       │                │ yaml }          │                 │                 │
+│       │ --output-file  │ OUTPUT_FILE     │ Stream each     │                 │
+│       │                │                 │ minion return   │                 │
+│       │                │                 │ to a json lines │                 │
+│       │                │                 │ file, zstd      │                 │
+│       │                │                 │ compressed if   │                 │
+│       │                │                 │ it ends in .zst │                 │
+│       │ --stream       │                 │ Render each     │                 │
+│       │                │                 │ minion as it    │                 │
+│       │                │                 │ returns, then a │                 │
+│       │                │                 │ summary         │                 │
+│ -t    │ --timeout      │ TIMEOUT         │ Seconds to wait │ 30              │
+│       │                │                 │ for a job to    │                 │
+│       │                │                 │ return before   │                 │
+│       │                │                 │ showing what is │                 │
+│       │                │                 │ there           │                 │
+│ -b    │ --batch        │ BATCH           │ Run on at most  │                 │
+│       │                │                 │ this many       │                 │
+│       │                │                 │ minions (or N%) │                 │
+│       │                │                 │ at a time,      │                 │
+│       │                │                 │ starting the    │                 │
+│       │                │                 │ next as soon as │                 │
+│       │                │                 │ one returns     │                 │
+│       │ --batch-wait   │ BATCH_WAIT      │ Seconds to wait │ 0               │
+│       │                │                 │ after a minion  │                 │
+│       │                │                 │ returns before  │                 │
+│       │                │                 │ starting the    │                 │
+│       │                │                 │ next            │                 │
+│       │ --batch-fail   │ BATCH_FAIL      │ Stop starting   │                 │
+│       │                │                 │ new minions     │                 │
+│       │                │                 │ once this many  │                 │
+│       │                │                 │ (or N%) have    │                 │
+│       │                │                 │ failed          │                 │
+│       │ --watch        │ SECONDS         │ Keep running    │                 │
+│       │                │                 │ the command     │                 │
+│       │                │                 │ every SECONDS,  │                 │
+│       │                │                 │ showing only    │                 │
+│       │                │                 │ what changed    │                 │
+│       │                │                 │ since the run   │                 │
+│       │                │                 │ before          │                 │
+│       │ --no-agent     │                 │ Run directly    │                 │
+│       │                │                 │ even if a       │                 │
+│       │                │                 │ guajillo agent  │                 │
+│       │                │                 │ is listening    │                 │
+│       │ --jobs         │ JOBS            │ File with one   │                 │
+│       │                │                 │ salt command    │                 │
+│       │                │                 │ per line, every │                 │
+│       │                │                 │ command is sent │                 │
+│       │                │                 │ in one call and │                 │
+│       │                │                 │ rendered on its │                 │
+│       │                │                 │ own. Commands   │                 │
+│       │                │                 │ can also be     │                 │
+│       │                │                 │ chained with    │                 │
+│       │                │                 │ --then          │                 │
+│       │ --jid          │ JID             │ Render a        │                 │
+│       │                │                 │ finished job    │                 │
+│       │                │                 │ again, from the │                 │
+│       │                │                 │ local result    │                 │
+│       │                │                 │ cache without   │                 │
+│       │                │                 │ touching the    │                 │
+│       │                │                 │ network when it │                 │
+│       │                │                 │ is there        │                 │
+│       │ --timings      │                 │ Print time per  │                 │
+│       │                │                 │ phase, request  │                 │
+│       │                │                 │ latency and     │                 │
+│       │                │                 │ render time on  │                 │
+│       │                │                 │ stderr at exit  │                 │
+│       │ --timings-json │                 │ Same as         │                 │
+│       │                │                 │ --timings,      │                 │
+│       │                │                 │ printed as json │                 │
+│ -l    │ --log          │ {CRITICAL,ERRO… │ console log     │ WARNING         │
+│       │                │                 │ level           │                 │
+└───────┴────────────────┴─────────────────┴─────────────────┴─────────────────┘
+                 guajillo events [options], tail the event bus                  
+┏━━━━━━━━━━━━━┳━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━┳━━━━━━━━━┓
+┃ option name ┃ description                                          ┃ default ┃
+┡━━━━━━━━━━━━━╇━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━╇━━━━━━━━━┩
+│ --tag GLOB  │ Only events with a tag matching GLOB                 │         │
+│ --regex RE  │ Only events with a tag matching RE                   │         │
+│ --minion ID │ Only events from or about minion ID                  │         │
+│ --jid JID   │ Only events of job JID                               │         │
+│ --format    │ ndjson for one raw event per line, summary for live  │ ndjson  │
+│             │ counters per tag                                     │         │
+└─────────────┴──────────────────────────────────────────────────────┴─────────┘
 
 Copyright© 2024 Thomas Phipps
 
@@ -1,16 +1,20 @@
+import asyncio
+import json
 import re
+import time
 
 import httpx
 import pytest
 from rich.console import Console
 
 from guajillo.exceptions import GuajilloException
+from guajillo.utils.bus import EventBus
 from guajillo.utils.cli import CliParse
-from guajillo.utils.conn import Guajillo
+from guajillo.utils.conn import Guajillo, client_settings
 
 
 @pytest.fixture
-def build_conn(request):
+def build_conn(request, tmp_path):
     cli = CliParse()
     marker = request.node.get_closest_marker("buildargs_data")
     if marker is None:
@@ -21,7 +25,10 @@ def build_conn(request):
     print(data)
 
     cli.build_args(data)
-    config = {"netapi": {"username": "testUser", "password": "testPass", "auth": "pam"}}
+    config = {
+        "netapi": {"username": "testUser", "password": "testPass", "auth": "pam"},
+        "cache_dir": str(tmp_path),
+    }
     testClass = Guajillo(
         url="http://test.com:8000", parser=cli, config=config, console=Console()
     )
@@ -29,7 +36,7 @@ def build_conn(request):
 
 
 @pytest.fixture(scope="module", params=[0, 1, 2, 3])
-def build_conn_parm(request):
+def build_conn_parm(request, tmp_path_factory):
     cli = CliParse()
     param = request.param
     testing = [
@@ -92,7 +99,10 @@ def build_conn_parm(request):
     ][param]
 
     cli.build_args(testing["data"])
-    config = {"netapi": {"username": "testUser", "password": "testPass", "auth": "pam"}}
+    config = {
+        "netapi": {"username": "testUser", "password": "testPass", "auth": "pam"},
+        "cache_dir": str(tmp_path_factory.mktemp("cache")),
+    }
     testClass = Guajillo(
         url="http://test.com:8000", parser=cli, config=config, console=Console()
     )
@@ -123,6 +133,24 @@ def test_init():
         )
 
 
+def test_client_settings():
+    settings = client_settings({})
+    assert settings["http2"] is True
+    assert settings["limits"].max_connections == 20
+    assert settings["timeout"].read == 30.0
+    settings = client_settings(
+        {"http": {"http2": False, "max_connections": 50, "timeout": 5}}
+    )
+    assert settings["http2"] is False
+    assert settings["limits"].max_connections == 50
+    assert settings["limits"].keepalive_expiry == 30.0
+    assert settings["timeout"].read == 5
+    stream = client_settings({"http": {"stream_timeout": 60}}, stream=True)
+    assert stream["limits"].max_connections == 1
+    assert stream["timeout"].read == 60
+    assert stream["timeout"].connect == 10.0
+
+
 @pytest.mark.asyncio
 async def test_login(httpx_mock, build_conn):
     return_response = {
@@ -148,6 +176,119 @@ async def test_login(httpx_mock, build_conn):
         response = await testClass.login()
 
 
+@pytest.mark.asyncio
+async def test_login_token_cache(httpx_mock, build_conn):
+    return_response = {
+        "return": [
+            {
+                "token": "fakeToken",
+                "expire": time.time() + 3600,
+                "user": "testUser",
+                "eauth": "pam",
+            }
+        ]
+    }
+    httpx_mock.add_response(url="http://test.com:8000/login", json=return_response)
+    testClass = build_conn
+    await testClass.login()
+    assert testClass.headers["X-Auth-Token"] == "fakeToken"
+    cache_file = testClass.tokens.path / "netapi.token"
+    assert oct(cache_file.stat().st_mode & 0o777) == "0o600"
+
+    # second run reuses the cached token without hitting /login
+    cached = await testClass.login()
+    assert testClass.cached_token
+    assert cached["return"][0]["token"] == "fakeToken"
+
+    # a refused cached token logs in again and retries
+    httpx_mock.add_response(url="http://test.com:8000/jobs/123", status_code=401)
+    httpx_mock.add_response(url="http://test.com:8000/login", json=return_response)
+    httpx_mock.add_response(url="http://test.com:8000/jobs/123", json={"return": []})
+    response = await testClass.job_lookup("123")
+    assert response.status_code == 200
+    assert not testClass.cached_token
+
+
+@pytest.mark.asyncio
+async def test_stream_refused_cached_token(httpx_mock, build_conn):
+    testClass = build_conn
+    login = {"token": "old", "expire": time.time() + 3600}
+    testClass.tokens.save("netapi", "http://test.com:8000", login, "testUser", "pam")
+    await testClass.login()
+    assert testClass.cached_token
+    httpx_mock.add_response(url="http://test.com:8000/events", status_code=401)
+    httpx_mock.add_response(
+        url="http://test.com:8000/login",
+        json={"return": [{"token": "new", "expire": time.time() + 3600}]},
+    )
+    httpx_mock.add_response(
+        url="http://test.com:8000/events",
+        headers={"content-type": "text/event-stream"},
+        content=b'data: {"tag": "salt/job/1/new"}\n\n',
+    )
+    seen = []
+    testClass.on_event = seen.append
+    await asyncio.wait_for(testClass.streamMon(), timeout=1)
+    assert seen == ['{"tag": "salt/job/1/new"}']
+    assert testClass.headers["X-Auth-Token"] == "new"
+    assert testClass.tokens.load("netapi", "http://test.com:8000")["token"] == "new"
+
+
+@pytest.mark.asyncio
+async def test_stream_refused_persistent_token(httpx_mock, build_conn, monkeypatch):
+    monkeypatch.setattr("guajillo.utils.conn.RECONNECT_WAIT", 0)
+    testClass = build_conn
+    httpx_mock.add_response(
+        url="http://test.com:8000/login",
+        json={"return": [{"token": "old", "expire": time.time() + 3600}]},
+    )
+    await testClass.login(force=True)
+    assert not testClass.cached_token
+    testClass.persistent = True
+    httpx_mock.add_response(
+        url="http://test.com:8000/events",
+        headers={"content-type": "text/event-stream"},
+        content=b'data: {"tag": "salt/job/1/new"}\n\n',
+    )
+    # the token expires while the stream is down
+    httpx_mock.add_response(url="http://test.com:8000/events", status_code=401)
+    httpx_mock.add_response(
+        url="http://test.com:8000/login",
+        json={"return": [{"token": "new", "expire": time.time() + 3600}]},
+    )
+    httpx_mock.add_response(
+        url="http://test.com:8000/events",
+        headers={"content-type": "text/event-stream"},
+        content=b'data: {"tag": "salt/job/2/new"}\n\n',
+    )
+    seen = []
+
+    def on_event(event):
+        seen.append(event)
+        if len(seen) == 2:
+            testClass.done.set()
+
+    testClass.on_event = on_event
+    await asyncio.wait_for(testClass.streamMon(), timeout=2)
+    assert seen == ['{"tag": "salt/job/1/new"}', '{"tag": "salt/job/2/new"}']
+    assert testClass.headers["X-Auth-Token"] == "new"
+
+
+@pytest.mark.asyncio
+async def test_check_outputer_large_highstate(build_conn):
+    testClass = build_conn
+    assert await testClass.check_outputer("state.apply", minions=100) == "highstate"
+    assert await testClass.check_outputer("state.apply", minions=101) == "compact"
+    assert await testClass.check_outputer("test.ping", minions=5000) == "boolean"
+
+
+@pytest.mark.asyncio
+@pytest.mark.buildargs_data(["-o", "highstate", "salt", "*", "state.apply"])
+async def test_check_outputer_asked_for_by_name(build_conn):
+    testClass = build_conn
+    assert await testClass.check_outputer("state.apply", minions=5000) == "highstate"
+
+
 def test__get_target_type(build_conn):
     testClass = build_conn
     assert testClass._get_target_type("-C") == "compound"
@@ -181,3 +322,180 @@ async def test_call(httpx_mock, build_conn_parm):
     )
     test = await testClass.call(build_conn_parm["expected"])
     assert test == build_conn_parm["eresponse"]
+
+
+@pytest.mark.asyncio
+@pytest.mark.buildargs_data(["salt", "*", "test.ping"])
+async def test_follow_job_from_stream(build_conn):
+    testClass = build_conn
+    testClass.bus = EventBus()
+    testClass.stream_ready.set()
+    testClass.calling = True
+    testClass._route_event(
+        json.dumps({"tag": "salt/job/123/ret/m1", "data": {"return": True}})
+    )
+    testClass.calling = False
+    job = testClass.track_job("123", "minion", "test.ping", ["m1", "m2"])
+    assert "m1" in job.results
+    testClass._route_event(json.dumps({"tag": "salt/job/123/new", "data": {}}))
+    follow = asyncio.create_task(testClass._follow_job(job, testClass._push_event, 30))
+    await asyncio.sleep(0)
+    testClass._route_event(
+        json.dumps({"tag": "salt/job/123/ret/m2", "data": {"return": True}})
+    )
+    await asyncio.wait_for(follow, timeout=1)
+    # the returns go out as deltas first
+    delta = await testClass.bus.get()
+    assert delta["meta"]["delta"]
+    final = await testClass.bus.get()
+    assert final["meta"] == {"output": "boolean", "step": "final"}
+    assert final["output"]["return"][0] == {"m1": True, "m2": True}
+
+
+@pytest.mark.asyncio
+@pytest.mark.buildargs_data(["salt", "*", "test.ping"])
+async def test_follow_job_return_during_emit(build_conn):
+    testClass = build_conn
+    testClass.stream_ready.set()
+    job = testClass.track_job("123", "minion", "test.ping", ["m1", "m2"])
+    testClass._route_event(
+        json.dumps({"tag": "salt/job/123/ret/m1", "data": {"return": True}})
+    )
+    events = []
+
+    async def emit(event, output, step, render=None, delta=False):
+        events.append((output, step))
+        if delta:
+            # the last return lands while the emit is waiting on a full bus
+            testClass._route_event(
+                json.dumps({"tag": "salt/job/123/ret/m2", "data": {"return": True}})
+            )
+            await asyncio.sleep(0)
+
+    await asyncio.wait_for(testClass._follow_job(job, emit, 30), timeout=1)
+    assert events == [("status", "normal"), ("boolean", "final")]
+
+
+@pytest.mark.asyncio
+@pytest.mark.buildargs_data(["salt", "*", "test.ping"])
+async def test_follow_job_lookup_deltas(httpx_mock, build_conn):
+    def lookup(returns):
+        return {
+            "info": [
+                {
+                    "jid": "123",
+                    "Function": "test.ping",
+                    "Minions": ["m1", "m2"],
+                    "Result": {m: {"return": True} for m in returns},
+                }
+            ],
+            "return": [{m: True for m in returns}],
+        }
+
+    httpx_mock.add_response(url="http://test.com:8000/jobs/123", json=lookup(["m1"]))
+    httpx_mock.add_response(
+        url="http://test.com:8000/jobs/123", json=lookup(["m1", "m2"])
+    )
+    testClass = build_conn
+    testClass.bus = EventBus()
+    events = []
+
+    async def emit(event, output, step, render=None, delta=False):
+        events.append((event, output, step, delta))
+
+    job = testClass.track_job("123", "minion", "test.ping", ["m1", "m2"])
+    await asyncio.wait_for(testClass._follow_job(job, emit, 30), timeout=5)
+    first, second, final = events
+    # each minion goes out as it is read from the lookup
+    assert first[3] and first[0]["return"][0] == {"m1": True}
+    assert second[3] and second[0]["return"][0] == {"m2": True}
+    assert final[1:3] == ("boolean", "final")
+    assert final[0]["return"][0] == {"m1": True, "m2": True}
+
+
+@pytest.mark.asyncio
+@pytest.mark.buildargs_data(["--stream", "salt", "*", "grains.items"])
+async def test_follow_job_streamed_lets_go_of_returns(httpx_mock, build_conn):
+    httpx_mock.add_response(
+        url="http://test.com:8000/jobs/123",
+        json={
+            "info": [
+                {
+                    "jid": "123",
+                    "Function": "grains.items",
+                    "Minions": ["m1", "m2"],
+                    "Result": {m: {"return": {"id": m}} for m in ["m1", "m2"]},
+                }
+            ],
+            "return": [{m: {"id": m} for m in ["m1", "m2"]}],
+        },
+    )
+    testClass = build_conn
+    testClass.streamed = True
+    events = []
+
+    async def emit(event, output, step, render=None, delta=False):
+        events.append((event, output, step))
+
+    job = testClass.track_job("123", "minion", "grains.items", ["m1", "m2"])
+    await asyncio.wait_for(testClass._follow_job(job, emit, 30), timeout=5)
+    *deltas, final = events
+    assert [d[0]["return"][0] for d in deltas] == [
+        {"m1": {"id": "m1"}},
+        {"m2": {"id": "m2"}},
+    ]
+    assert final[1:] == ("yaml", "final")
+    assert final[0]["info"][0]["Result"] == {"m1": {}, "m2": {}}
+    assert not job.keep_returns
+
+
+@pytest.mark.asyncio
+@pytest.mark.buildargs_data(
+    ["salt", "*", "test.ping", "--then", "salt", "*", "disk.usage"]
+)
+async def test_run_lowstate_several_jobs(httpx_mock, build_conn):
+    httpx_mock.add_response(
+        url="http://test.com:8000",
+        json={
+            "return": [
+                {"jid": "1", "minions": ["m1"]},
+                {"jid": "2", "minions": ["m1"]},
+            ]
+        },
+    )
+    testClass = build_conn
+    testClass.stream_ready.set()
+    events = []
+
+    async def emit(event, output, step, render=None, delta=False):
+        events.append((event, output, step))
+
+    params = testClass._make_params()
+    assert [lowstate["fun"] for lowstate in params] == ["test.ping", "disk.usage"]
+    run = asyncio.create_task(testClass.run_lowstate(params, emit=emit))
+    while set(testClass.jobs) != {"1", "2"}:
+        await asyncio.sleep(0)
+    for jid, returned in [("2", {"/": 10}), ("1", True)]:
+        testClass._route_event(
+            json.dumps({"tag": f"salt/job/{jid}/ret/m1", "data": {"return": returned}})
+        )
+        await asyncio.sleep(0.01)
+    await asyncio.wait_for(run, timeout=1)
+    finals = [(e["info"][0]["jid"], o, s) for e, o, s in events if o != "status"]
+    assert finals == [("2", "yaml", "job"), ("1", "boolean", "final")]
+    assert testClass.jobs == {}
+
+
+@pytest.mark.asyncio
+@pytest.mark.buildargs_data(["salt", "*", "test.ping"])
+async def test_run_lowstate_string_return(httpx_mock, build_conn):
+    httpx_mock.add_response(url="http://test.com:8000", json={"return": "blah"})
+    testClass = build_conn
+    testClass.stream_ready.set()
+    events = []
+
+    async def emit(event, output, step, render=None, delta=False):
+        events.append((event, output, step))
+
+    await testClass.run_lowstate(testClass._make_params(), emit=emit)
+    assert events == [({"return": "blah"}, "json", "final")]
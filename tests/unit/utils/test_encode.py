@@ -0,0 +1,12 @@
+import pytest
+
+from guajillo.utils import encode
+
+
+@pytest.mark.parametrize("indent", [False, True])
+def test_dumps_same_bytes_without_orjson(monkeypatch, indent):
+    pytest.importorskip("orjson")
+    obj = {"m1": True, "m2": {"/": [10, 2.5, None, "ü"]}}
+    with_orjson = encode.dumps(obj, indent=indent)
+    monkeypatch.setattr(encode, "HAVE_ORJSON", False)
+    assert encode.dumps(obj, indent=indent) == with_orjson
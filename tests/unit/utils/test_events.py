@@ -0,0 +1,66 @@
+import io
+import json
+
+import pytest
+from rich.console import Console
+
+from guajillo.exceptions import GuajilloException
+from guajillo.utils.events import EventTail, compile_filter, prefix, tag_of
+
+
+def raw(tag, **data):
+    return json.dumps({"tag": tag, "data": data})
+
+
+def tail(args, jid=None):
+    out = io.StringIO()
+    console = Console(file=out)
+    return EventTail(None, console, args, jid=jid), out
+
+
+def test_tag_of():
+    assert tag_of(raw("salt/job/1/new", fun="test.ping")) == "salt/job/1/new"
+    assert tag_of('{"data": {}, "tag": "salt/auth"}') == "salt/auth"
+    assert tag_of("not json") is None
+
+
+def test_compile_filter():
+    assert compile_filter([], []) is None
+    pattern = compile_filter(["salt/job/*/ret/*"], ["^salt/auth$"])
+    assert pattern.match("salt/job/1/ret/m1")
+    assert pattern.match("salt/auth")
+    assert not pattern.match("salt/job/1/new")
+    with pytest.raises(GuajilloException):
+        compile_filter([], ["("])
+
+
+def test_prefix():
+    assert prefix("salt/job/123/ret/m1") == "salt/job/*/ret"
+    assert prefix("salt/minion/m1/start") == "salt/minion/*/start"
+    assert prefix("salt/auth") == "salt/auth"
+
+
+def test_filters():
+    events, _ = tail(["--tag", "salt/job/*", "--minion", "m1"], jid="123")
+    assert events.matches(raw("salt/job/123/ret/m1", id="m1"))
+    assert events.matches(raw("salt/job/123/new", minions=["m1"])) is None
+    assert events.matches(raw("salt/job/123/ret/m2", id="m2")) is None
+    assert events.matches(raw("salt/job/456/ret/m1", id="m1")) is None
+    assert events.matches(raw("salt/auth", id="m1")) is None
+
+
+def test_ndjson_passes_raw_events_through():
+    events, out = tail(["--tag", "salt/job/*"])
+    lines = [raw("salt/job/1/ret/m1", id="m1"), raw("salt/auth", id="m2")]
+    for line in lines:
+        events.handle(line)
+    assert out.getvalue() == ""
+    events.flush()
+    assert out.getvalue() == lines[0] + "\n"
+    assert events.seen == 2
+    assert events.totals == {"salt/job/*/ret": 1}
+
+
+def test_unknown_option():
+    with pytest.raises(GuajilloException):
+        tail(["--nope"])
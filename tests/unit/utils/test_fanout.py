@@ -0,0 +1,114 @@
+import pytest
+from rich.console import Console
+
+from guajillo.exceptions import GuajilloException
+from guajillo.utils.bus import EventBus
+from guajillo.utils.cli import CliParse
+from guajillo.utils.fanout import FanOut, expand_profiles, profile_url
+
+CONFIG = {
+    "eu": {
+        "url": "http://eu.test:8000",
+        "username": "u",
+        "password": "p",
+        "auth": "pam",
+    },
+    "us": {
+        "url": "http://us.test:8000",
+        "username": "u",
+        "password": "p",
+        "auth": "pam",
+    },
+    "groups": {"all": ["eu", "us"]},
+    "debug": False,
+}
+
+
+def test_expand_profiles():
+    assert expand_profiles(CONFIG, "eu") == ["eu"]
+    assert expand_profiles(CONFIG, "eu, us") == ["eu", "us"]
+    assert expand_profiles(CONFIG, "all,eu") == ["eu", "us"]
+
+
+def test_profile_url():
+    assert profile_url(CONFIG, "us") == "http://us.test:8000"
+    with pytest.raises(GuajilloException):
+        profile_url(CONFIG, "apac")
+
+
+@pytest.mark.asyncio
+async def test_fanout_merges_returns(httpx_mock, tmp_path):
+    cli = CliParse()
+    cli.build_args(["-p", "all", "--timeout", "5", "salt", "*", "test.ping"])
+    config = dict(CONFIG, cache_dir=str(tmp_path))
+    for region in ["eu", "us"]:
+        url = f"http://{region}.test:8000"
+        httpx_mock.add_response(
+            url=f"{url}/login", json={"return": [{"token": region}]}
+        )
+        httpx_mock.add_response(
+            url=url, json={"return": [{"jid": region, "minions": ["m1"]}]}
+        )
+        httpx_mock.add_response(
+            url=f"{url}/jobs/{region}",
+            json={
+                "info": [
+                    {
+                        "jid": region,
+                        "Function": "test.ping",
+                        "Minions": ["m1"],
+                        "Result": {"m1": {"return": True, "success": True}},
+                    }
+                ],
+                "return": [{"m1": True}],
+            },
+        )
+    fanout = FanOut(["eu", "us"], cli, config, Console())
+    bus = EventBus()
+    await fanout.taskMan(bus)
+    event = await bus.get()
+    while event["meta"]["output"] == "status":
+        event = await bus.get()
+    assert event["meta"] == {"output": "boolean", "step": "final"}
+    assert event["output"]["return"][0] == {"eu:m1": True, "us:m1": True}
+    assert event["output"]["info"][0]["Minions"] == ["eu:m1", "us:m1"]
+
+
+@pytest.mark.asyncio
+async def test_fanout_failed_profile_on_its_own(httpx_mock, tmp_path):
+    cli = CliParse()
+    cli.build_args(["-p", "all", "--timeout", "5", "salt", "*", "test.ping"])
+    config = dict(CONFIG, cache_dir=str(tmp_path))
+    httpx_mock.add_response(url="http://eu.test:8000/login", status_code=500)
+    url = "http://us.test:8000"
+    httpx_mock.add_response(url=f"{url}/login", json={"return": [{"token": "us"}]})
+    httpx_mock.add_response(
+        url=url, json={"return": [{"jid": "us", "minions": ["m1"]}]}
+    )
+    httpx_mock.add_response(
+        url=f"{url}/jobs/us",
+        json={
+            "info": [
+                {
+                    "jid": "us",
+                    "Function": "test.ping",
+                    "Minions": ["m1"],
+                    "Result": {"m1": {"return": True, "success": True}},
+                }
+            ],
+            "return": [{"m1": True}],
+        },
+    )
+    fanout = FanOut(["eu", "us"], cli, config, Console())
+    bus = EventBus()
+    await fanout.taskMan(bus)
+    events = []
+    while not events or events[-1]["meta"]["step"] != "final":
+        event = await bus.get()
+        if event["meta"]["output"] != "status":
+            events.append(event)
+    failed, final = events
+    assert failed["meta"] == {"output": "json", "step": "job"}
+    assert "error" in failed["output"]["return"][0]["eu"]
+    assert final["meta"] == {"output": "boolean", "step": "final"}
+    assert final["output"]["return"][0] == {"us:m1": True}
@@ -0,0 +1,81 @@
+from guajillo.utils.jobs import Job, parse_tag
+
+
+def test_parse_tag():
+    assert parse_tag("salt/job/123/ret/minion1") == ("minion", "123", "minion1")
+    assert parse_tag("salt/run/123/ret") == ("master", "123", None)
+    assert parse_tag("salt/job/123/new") is None
+    assert parse_tag("salt/auth") is None
+    assert parse_tag("salt/run/123/new") is None
+
+
+def test_job_minion_returns():
+    job = Job("123", "minion", fun="test.ping", minions=["m1", "m2"])
+    assert not job.complete
+    assert job.add_event(
+        "salt/job/123/ret/m1", {"return": True, "retcode": 0, "success": True}
+    )
+    assert not job.add_event("salt/job/123/ret/m1", {"return": True})
+    assert not job.add_event("salt/job/456/ret/m2", {"return": True})
+    assert not job.complete
+    assert job.add_event("salt/job/123/ret/m2", {"return": True})
+    assert job.complete
+    lookup = job.as_lookup()
+    assert lookup["info"][0]["Function"] == "test.ping"
+    assert lookup["info"][0]["Minions"] == ["m1", "m2"]
+    assert lookup["return"][0] == {"m1": True, "m2": True}
+    assert lookup["info"][0]["Result"]["m1"]["success"] is True
+
+
+def test_job_master_return():
+    job = Job("123", "master")
+    assert not job.complete
+    assert job.add_event("salt/run/123/ret", {"fun": "runner.test.arg"})
+    assert job.complete
+    assert job.fun == "runner.test.arg"
+
+
+def test_job_merge_lookup():
+    job = Job("123", "minion", fun="test.ping", minions=["m1", "m2"])
+    job.add_event("salt/job/123/ret/m1", {"return": True})
+    job.merge_lookup(
+        {
+            "info": [
+                {
+                    "Function": "test.ping",
+                    "Minions": ["m1", "m2"],
+                    "Result": {"m2": {"return": True, "success": True}},
+                }
+            ],
+            "return": [{"m2": True}],
+        }
+    )
+    assert job.complete
+
+
+def test_job_deltas():
+    job = Job("123", "minion", fun="test.ping", minions=["m1", "m2", "m3"])
+    job.add_event("salt/job/123/ret/m1", {"return": True})
+    assert job.take_fresh() == ["m1"]
+    assert job.take_fresh() == []
+    added = job.merge_lookup(
+        {
+            "info": [
+                {
+                    "Minions": ["m1", "m2", "m3"],
+                    "Result": {
+                        "m1": {"return": False},
+                        "m2": {"return": True},
+                    },
+                }
+            ],
+            "return": [{"m1": False, "m2": True}],
+        }
+    )
+    # m1 was already known so the lookup's copy is dropped
+    assert added == ["m2"]
+    assert job.results["m1"]["return"] is True
+    delta = job.as_lookup(job.take_fresh())
+    assert delta["return"][0] == {"m2": True}
+    assert delta["info"][0]["Returned"] == 2
+    assert delta["info"][0]["Minions"] == ["m1", "m2", "m3"]
@@ -0,0 +1,79 @@
+import json
+
+import pytest
+
+from guajillo.utils.jobs import Job
+from guajillo.utils.lookup import iter_lookup
+
+RESULT = {
+    "m1": {"return": {"os": "Ubuntü", "cpus": 12, "load": -0.25e-3}, "retcode": 0},
+    "m2": {"return": [True, None, "☃"], "retcode": 0},
+}
+
+
+def body(result=RESULT):
+    info = {"jid": "123", "Function": "grains.items", "Minions": ["m1", "m2", "m3"]}
+    return json.dumps(
+        {
+            "info": [info | {"Result": result}],
+            "return": [{m: r["return"] for m, r in result.items()}],
+        },
+        ensure_ascii=False,
+    ).encode()
+
+
+async def chunks(data, size):
+    for start in range(0, len(data), size):
+        yield data[start : start + size]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("size", [1, 7, 4096])
+async def test_iter_lookup(size):
+    parts = [part async for part in iter_lookup(chunks(body(), size))]
+    assert ("info", "jid", "123") in parts
+    assert ("info", "Minions", ["m1", "m2", "m3"]) in parts
+    assert {k: v for s, k, v in parts if s == "result"} == RESULT
+    returns = {k: v for s, k, v in parts if s == "return"}
+    assert returns == {m: r["return"] for m, r in RESULT.items()}
+
+
+@pytest.mark.asyncio
+async def test_iter_lookup_runner_and_errors():
+    runner = json.dumps({"info": [{"jid": "1", "Result": {}}], "return": [5]})
+    parts = [part async for part in iter_lookup(chunks(runner.encode(), 3))]
+    assert parts == [("info", "jid", "1"), ("return", None, 5)]
+    with pytest.raises(ValueError):
+        async for _ in iter_lookup(chunks(body()[:-10], 64)):
+            pass
+
+
+@pytest.mark.asyncio
+async def test_merge_parts():
+    job = Job("123", "minion")
+    job._add_result("m1", {"return": "from the stream"})
+    job.take_fresh()
+    added = await job.merge_parts(iter_lookup(chunks(body(), 16)))
+    assert added == ["m2"]
+    assert job.fun == "grains.items"
+    assert job.results["m1"] == {"return": "from the stream"}
+    assert job.minions == ["m1", "m2", "m3"]
+    assert not job.complete
+
+
+@pytest.mark.asyncio
+async def test_merge_parts_hands_on_each_minion():
+    job = Job("123", "minion")
+    job.keep_returns = False
+    handed = []
+
+    async def on_added():
+        fresh = job.take_fresh()
+        handed.append(job.as_lookup(fresh)["return"][0])
+        job.release(fresh)
+
+    await job.merge_parts(iter_lookup(chunks(body(), 16)), on_added)
+    assert handed == [{"m1": RESULT["m1"]["return"]}, {"m2": RESULT["m2"]["return"]}]
+    # only what the final result needs to count them is left
+    assert job.results == {"m1": {"retcode": 0}, "m2": {"retcode": 0}}
+    assert job.as_lookup()["return"][0] == {"m1": None, "m2": None}
@@ -0,0 +1,97 @@
+import io
+import json
+
+import pytest
+import yaml
+from rich.console import Console
+
+from guajillo.utils.bus import EventBus, job_event
+from guajillo.utils.cli import CliParse
+from guajillo.utils.outputs import Outputs
+
+
+def lookup(returns, minions=("m1", "m2")):
+    return {
+        "info": [
+            {
+                "jid": "123",
+                "Function": "grains.item",
+                "Minions": list(minions),
+                "Result": {m: {"return": r} for m, r in returns.items()},
+            }
+        ],
+        "return": [returns],
+    }
+
+
+@pytest.mark.asyncio
+async def test_stream_renders_each_minion_once():
+    cli = CliParse()
+    cli.build_args(["--stream"])
+    console = Console(file=io.StringIO(), width=120)
+    outputs = Outputs(console, parser=cli, config={"debug": False})
+    bus = EventBus()
+    await bus.put(job_event(lookup({"m1": {"os": "a"}}), "status", "normal", "yaml"))
+    await bus.put(job_event(lookup({"m1": {"os": "a"}}), "yaml", "normal"))
+    await bus.put(
+        job_event(lookup({"m1": {"os": "a"}, "m2": {"os": "b"}}), "yaml", "final")
+    )
+    await outputs.taskMan(bus)
+    text = console.file.getvalue()
+    assert text.count("m1:") == 1
+    assert text.count("m2:") == 1
+    assert "All minions returned" in text
+    assert outputs.rendered == {("123", "m1"), ("123", "m2")}
+
+
+@pytest.mark.asyncio
+async def test_stream_falls_back_to_render():
+    cli = CliParse()
+    cli.build_args(["--stream"])
+    console = Console(file=io.StringIO(), width=120)
+    outputs = Outputs(console, parser=cli, config={"debug": False})
+    bus = EventBus()
+    await bus.put(job_event(lookup({"m1": True}), "status", "normal", "json"))
+    await bus.put(job_event(lookup({"m1": True}), "json", "final"))
+    await outputs.taskMan(bus)
+    assert json.loads(console.file.getvalue()) == {"m1": True}
+
+
+@pytest.mark.asyncio
+async def test_json_raw_when_piped():
+    cli = CliParse()
+    cli.build_args(["--stream"])
+    console = Console(file=io.StringIO(), width=20)
+    outputs = Outputs(console, parser=cli, config={"debug": False})
+    bus = EventBus()
+    await bus.put(job_event(lookup({"m1": {"os": "a"}}), "status", "normal", "json"))
+    await bus.put(
+        job_event(lookup({"m1": {"os": "a"}, "m2": {"os": "b"}}), "json", "final")
+    )
+    await outputs.taskMan(bus)
+    lines = console.file.getvalue().splitlines()
+    # not wrapped at the console width, one object per minion
+    assert [json.loads(line) for line in lines] == [
+        {"m1": {"os": "a"}},
+        {"m2": {"os": "b"}},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_json_highlighted_on_terminal():
+    console = Console(file=io.StringIO(), force_terminal=True, width=120)
+    outputs = Outputs(console)
+    await outputs.final(lookup({"m1": True}), "json")
+    assert "\x1b[" in console.file.getvalue()
+
+
+@pytest.mark.asyncio
+async def test_yaml_streams_plain_when_piped():
+    console = Console(file=io.StringIO(), width=20)
+    outputs = Outputs(console)
+    returns = {"m2": {"os": "b"}, "m1": {"os": "a", "path": "/a/very/long/path"}}
+    await outputs.final(lookup(returns), "yaml")
+    text = console.file.getvalue()
+    assert "\x1b[" not in text
+    assert yaml.safe_load(text) == returns
+    assert text.index("m1:") < text.index("m2:")
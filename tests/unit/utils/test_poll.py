@@ -0,0 +1,49 @@
+from guajillo.utils.poll import PollScheduler, poll_settings
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_backoff_and_reset():
+    clock = Clock()
+    poll = PollScheduler(60, initial=0.1, maximum=1.0, jitter=0, clock=clock)
+    assert [round(poll.next_delay(), 3) for _ in range(6)] == [
+        0.1,
+        0.2,
+        0.4,
+        0.8,
+        1.0,
+        1.0,
+    ]
+    poll.reset()
+    assert poll.next_delay() == 0.1
+
+
+def test_jitter_bounds():
+    poll = PollScheduler(60, initial=1.0, factor=1.0, jitter=0.2)
+    for _ in range(50):
+        assert 0.8 <= poll.next_delay() <= 1.2
+
+
+def test_deadline():
+    clock = Clock()
+    poll = PollScheduler(2, initial=1.0, jitter=0, clock=clock)
+    assert not poll.expired
+    clock.now += 1.5
+    assert poll.remaining == 0.5
+    assert poll.next_delay() == 0.5
+    clock.now += 0.5
+    assert poll.expired
+    assert poll.next_delay() == 0
+
+
+def test_poll_settings(caplog):
+    config = {"poll": {"initial": 0.5, "max": 10}}
+    assert poll_settings(config) == {"initial": 0.5}
+    assert "unknown [poll] setting max" in caplog.text
+    assert poll_settings({}) == {}
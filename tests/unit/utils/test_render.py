@@ -0,0 +1,74 @@
+import asyncio
+import io
+import threading
+import time
+
+import pytest
+from rich.console import Console
+
+from guajillo.utils.render import (
+    PARALLEL_OVER,
+    Renderer,
+    console_options,
+    render_minion,
+)
+
+
+@pytest.mark.asyncio
+async def test_renderer_runs_outputers_on_a_worker():
+    renderer = Renderer()
+
+    async def outputer(value):
+        await asyncio.sleep(0)
+        return value, threading.current_thread().name
+
+    value, thread = await renderer.run(lambda: renderer.complete(outputer("rendered")))
+    assert value == "rendered"
+    assert thread != threading.current_thread().name
+    await renderer.close()
+
+
+@pytest.mark.asyncio
+async def test_renderer_keeps_the_loop_free():
+    renderer = Renderer()
+    ticks = 0
+
+    async def tick():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    ticker = asyncio.create_task(tick())
+    await renderer.run(time.sleep, 0.2)
+    ticker.cancel()
+    assert ticks >= 5
+    await renderer.close()
+
+
+def test_render_minion_to_ansi():
+    console = Console(file=io.StringIO(), width=80, force_terminal=True)
+    ansi = render_minion("yaml", "m1", {"os": "Ubuntu"}, console_options(console))
+    assert "\x1b[" in ansi.decode() and "Ubuntu" in ansi.decode()
+    piped = Console(file=io.StringIO(), width=80)
+    plain = render_minion("yaml", "m1", {"os": "Ubuntu"}, console_options(piped))
+    assert plain.decode() == "m1:\n  os: Ubuntu\n"
+
+
+@pytest.mark.asyncio
+async def test_renderer_renders_many_minions_in_processes():
+    renderer = Renderer()
+    renderer.cpus = 2
+    console = Console(file=io.StringIO(), width=80)
+    returns = {f"m{n}": {"n": n} for n in range(PARALLEL_OVER + 1)}
+    assert renderer.parallel(len(returns))
+    chunks = await renderer.run(
+        lambda: list(renderer.render_minions("yaml", returns, console))
+    )
+    assert b"".join(chunks).decode().splitlines()[:4] == [
+        "m0:",
+        "  n: 0",
+        "m1:",
+        "  n: 1",
+    ]
+    await renderer.close()
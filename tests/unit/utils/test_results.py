@@ -0,0 +1,89 @@
+import os
+
+import pytest
+from rich.console import Console
+
+from guajillo.utils.bus import EventBus
+from guajillo.utils.cli import CliParse
+from guajillo.utils.conn import Guajillo
+from guajillo.utils.results import ResultCache, result_cache
+
+
+def final(jid, minions=("m1",)):
+    return {
+        "info": [
+            {
+                "jid": jid,
+                "Function": "test.ping",
+                "Minions": list(minions),
+                "Result": {m: {"return": True} for m in minions},
+            }
+        ],
+        "return": [{m: True for m in minions}],
+    }
+
+
+@pytest.mark.asyncio
+async def test_save_and_load(tmp_path):
+    cache = ResultCache(tmp_path, max_bytes=1024 * 1024)
+    assert await cache.load("123") is None
+    await cache.save("123", final("123"), "boolean")
+    assert await cache.load("123") == {"output": "boolean", "event": final("123")}
+    assert oct(os.stat(tmp_path / "123.json.gz").st_mode & 0o777) == "0o600"
+    await cache.save("eu:1,us:2", final("eu:1,us:2"), "boolean")
+    assert (tmp_path / "eu_1,us_2.json.gz").exists()
+
+
+@pytest.mark.asyncio
+async def test_evicts_least_recently_used(tmp_path):
+    minions = [f"minion{i}" for i in range(200)]
+    cache = ResultCache(tmp_path, max_bytes=1024 * 1024)
+    await cache.save("1", final("1", minions), "boolean")
+    size = (tmp_path / "1.json.gz").stat().st_size
+    cache.max_bytes = size * 2 + 1
+    await cache.save("2", final("2", minions), "boolean")
+    os.utime(tmp_path / "1.json.gz", (1, 1))
+    os.utime(tmp_path / "2.json.gz", (2, 2))
+    # loading marks it as used, so 2 is the oldest now
+    await cache.load("1")
+    await cache.save("3", final("3", minions), "boolean")
+    assert await cache.load("2") is None
+    assert await cache.load("1") is not None
+    assert await cache.load("3") is not None
+
+
+def test_result_cache_config(tmp_path):
+    assert result_cache({"results": {"cache": False}}) is None
+    cache = result_cache({"cache_dir": str(tmp_path), "results": {"max_mb": 1}})
+    assert cache.path == tmp_path / "jobs"
+    assert cache.max_bytes == 1024 * 1024
+
+
+@pytest.mark.asyncio
+async def test_jid_from_cache_then_lookup(httpx_mock, tmp_path):
+    cli = CliParse()
+    cli.build_args(["--jid", "123"])
+    config = {
+        "netapi": {"username": "u", "password": "p", "auth": "pam"},
+        "cache_dir": str(tmp_path),
+        "debug": False,
+    }
+    cache = result_cache(config)
+    await cache.save("123", final("123"), "boolean")
+    conn = Guajillo("http://test.com:8000", cli, config, console=Console())
+    bus = EventBus()
+    # nothing is mocked, any request would fail the test
+    await conn.jidMan(bus, "123", cache)
+    event = await bus.get()
+    assert event["meta"]["output"] == "boolean"
+    assert event["output"] == final("123")
+
+    httpx_mock.add_response(
+        url="http://test.com:8000/login", json={"return": [{"token": "abc"}]}
+    )
+    httpx_mock.add_response(url="http://test.com:8000/jobs/456", json=final("456"))
+    conn = Guajillo("http://test.com:8000", cli, config, console=Console())
+    await conn.jidMan(bus, "456", cache)
+    event = await bus.get()
+    assert event["meta"]["output"] == "boolean"
+    assert event["output"]["info"][0]["jid"] == "456"
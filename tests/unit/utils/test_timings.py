@@ -0,0 +1,55 @@
+import pytest
+from rich.console import Console
+
+from guajillo.utils.cli import CliParse
+from guajillo.utils.conn import Guajillo
+from guajillo.utils.timings import Timings, percentile, percentiles
+
+
+def test_percentile():
+    assert percentile([], 50) == 0.0
+    assert percentile([3.0], 99) == 3.0
+    values = [float(n) for n in range(1, 101)]
+    assert percentile(values, 50) == 50.0
+    assert percentile(values, 99) == 99.0
+    assert percentiles(reversed(values), [50, 95, 99]) == [50.0, 95.0, 99.0]
+    assert percentiles([], [50, 99]) == [0.0, 0.0]
+
+
+def test_disabled_records_nothing():
+    timings = Timings(enabled=False)
+    with timings.phase("login"):
+        pass
+    assert timings.hooks() == {}
+    assert timings.summary()["phases"] == {}
+
+
+@pytest.mark.asyncio
+async def test_requests_are_timed(httpx_mock, tmp_path):
+    cli = CliParse()
+    cli.build_args([])
+    config = {
+        "netapi": {"username": "u", "password": "p", "auth": "pam"},
+        "cache_dir": str(tmp_path),
+    }
+    timings = Timings()
+    conn = Guajillo(
+        "http://test.com:8000", cli, config, console=Console(), timings=timings
+    )
+    httpx_mock.add_response(
+        url="http://test.com:8000/login", json={"return": [{"token": "abc"}]}
+    )
+    httpx_mock.add_response(url="http://test.com:8000/jobs/1", json={"info": []})
+    with timings.phase("login"):
+        await conn.login()
+    await conn.job_lookup("1")
+    await conn.close()
+    summary = timings.summary()
+    assert summary["phases"]["login"] > 0
+    assert summary["requests"]["login"]["count"] == 1
+    assert summary["requests"]["lookup"]["count"] == 1
+    assert summary["requests"]["lookup"]["bytes"] == len(b'{"info":[]}')
+    with timings.render("yaml"):
+        pass
+    assert "yaml" in timings.summary()["render"]
+    assert timings.table().row_count == 5
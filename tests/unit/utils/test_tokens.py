@@ -0,0 +1,34 @@
+import time
+
+from guajillo.utils.tokens import TokenCache
+
+
+def test_token_cache(tmp_path):
+    cache = TokenCache(tmp_path / "guajillo")
+    assert cache.load("netapi", "http://test.com:8000") is None
+    cache.save("netapi", "http://test.com:8000", {"token": "abc"})
+    assert cache.load("netapi", "http://test.com:8000") is None
+    cache.save(
+        "netapi", "http://test.com:8000", {"token": "abc", "expire": time.time() + 600}
+    )
+    assert cache.load("netapi", "http://test.com:8000")["token"] == "abc"
+    assert cache.load("netapi", "http://other.com:8000") is None
+    assert oct((tmp_path / "guajillo").stat().st_mode & 0o777) == "0o700"
+
+
+def test_token_cache_expired(tmp_path):
+    cache = TokenCache(tmp_path)
+    cache.save(
+        "netapi", "http://test.com:8000", {"token": "abc", "expire": time.time()}
+    )
+    assert cache.load("netapi", "http://test.com:8000") is None
+    assert not (tmp_path / "netapi.token").exists()
+
+
+def test_token_cache_other_user(tmp_path):
+    cache = TokenCache(tmp_path)
+    login = {"token": "abc", "expire": time.time() + 600}
+    cache.save("netapi", "http://test.com:8000", login, "salt", "pam")
+    assert cache.load("netapi", "http://test.com:8000", "salt", "pam") is not None
+    assert cache.load("netapi", "http://test.com:8000", "other", "pam") is None
+    assert cache.load("netapi", "http://test.com:8000", "salt", "ldap") is None
@@ -0,0 +1,52 @@
+from guajillo.utils.watch import diff, flatten
+
+STATE = "file_|-motd_|-/etc/motd_|-managed"
+
+
+def event(returns, minions=("m1", "m2")):
+    return {
+        "info": [
+            {
+                "Minions": list(minions),
+                "Result": {m: {"return": r} for m, r in returns.items()},
+            }
+        ]
+    }
+
+
+def state(result=True, changes=None, duration=1.0):
+    return {
+        "result": result,
+        "changes": changes or {},
+        "comment": "ok" if result else "broken",
+        "duration": duration,
+    }
+
+
+def test_flatten():
+    entries = flatten(event({"m1": {STATE: state()}, "m2": True}))
+    assert entries[("m1", STATE)] == {"result": True, "changes": {}, "comment": "ok"}
+    assert entries[("m2", "")] is True
+    assert flatten(event({"m1": True}))[("m2", "")] is None
+    assert flatten({"return": [{}]}) == {}
+
+
+def test_diff_ignores_noise_and_finds_changes():
+    old = flatten(event({"m1": {STATE: state()}, "m2": {"os": "a", "cpus": 2}}))
+    same = flatten(
+        event({"m1": {STATE: state(duration=9.0)}, "m2": {"os": "a", "cpus": 2}})
+    )
+    assert diff(old, same) == []
+    new = flatten(event({"m1": {STATE: state(False)}, "m2": {"os": "b"}}))
+    changes = {(kind, key) for kind, key, _ in diff(old, new)}
+    assert changes == {
+        ("changed", ("m1", STATE)),
+        ("changed", ("m2", "os")),
+        ("gone", ("m2", "cpus")),
+    }
+
+
+def test_diff_minion_without_return():
+    old = flatten(event({"m1": {STATE: state()}, "m2": {STATE: state()}}))
+    new = flatten(event({"m1": {STATE: state()}}))
+    assert diff(old, new) == [("new", ("m2", ""), None)]
@@ -0,0 +1,83 @@
+import json
+
+import pytest
+import zstandard
+
+from guajillo.utils.bus import job_event
+from guajillo.utils.writer import NDJSONWriter
+
+
+def lookup(returns):
+    return {
+        "info": [
+            {
+                "jid": "123",
+                "Function": "test.ping",
+                "Minions": ["m1", "m2", "m3"],
+                "Result": {
+                    m: {"return": r, "success": True} for m, r in returns.items()
+                },
+            }
+        ],
+        "return": [returns],
+    }
+
+
+async def write(writer):
+    await writer.write_event(job_event(lookup({"m1": True}), "status", "normal"))
+    await writer.write_event(
+        job_event(lookup({"m1": True, "m2": True}), "status", "normal")
+    )
+    await writer.write_event(
+        job_event(lookup({"m1": True, "m2": True}), "boolean", "final")
+    )
+    await writer.close()
+
+
+@pytest.mark.asyncio
+async def test_writer_ndjson(tmp_path):
+    path = tmp_path / "out.json"
+    await write(NDJSONWriter(path))
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [line["type"] for line in lines] == ["return", "return", "final"]
+    assert lines[0] == {
+        "type": "return",
+        "jid": "123",
+        "minion": "m1",
+        "return": True,
+        "success": True,
+    }
+    assert lines[-1]["missing"] == ["m3"]
+
+
+@pytest.mark.asyncio
+async def test_writer_zstd(tmp_path):
+    path = tmp_path / "out.json.zst"
+    await write(NDJSONWriter(path, buffer_lines=1))
+    with open(path, "rb") as fh:
+        data = zstandard.ZstdDecompressor().stream_reader(fh).read()
+    assert len(data.decode().splitlines()) == 3
+
+
+@pytest.mark.asyncio
+async def test_writer_several_jobs(tmp_path):
+    path = tmp_path / "out.json"
+    writer = NDJSONWriter(path)
+    second = lookup({"m1": {"/": 10}, "m2": {"/": 20}})
+    second["info"][0].update({"jid": "456", "Function": "disk.usage"})
+    await writer.write_event(
+        job_event(lookup({"m1": True, "m2": True}), "boolean", "job")
+    )
+    await writer.write_event(job_event(second, "yaml", "final"))
+    await writer.close()
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [(line["type"], line["jid"]) for line in lines] == [
+        ("return", "123"),
+        ("return", "123"),
+        ("final", "123"),
+        ("return", "456"),
+        ("return", "456"),
+        ("final", "456"),
+    ]
+    assert lines[3]["return"] == {"/": 10}
+    assert lines[-1]["missing"] == ["m3"]